@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Compare the --copy-strategy options on a synthetic tree in a local temp dir.
+
+What it does:
+- Builds a source tree that looks like a packaged dataset: many small textures,
+  a few medium ones, some large EXR-sized files and a sparse file.
+- Copies the whole tree once per strategy (shutil / kernel / direct) with the
+  same thread count as --copy-jobs, then runs the batched fsync pass.
+- Verifies every copy (size + sha256) and prints wall time, throughput, fsync
+  time and the space the copy allocated (holes preserved or not).
+
+With --cold the source files are dropped from the page cache
+(POSIX_FADV_DONTNEED) before every run, closer to a first read from disk.
+Run the benchmark on the file system you pack to, e.g.:
+  python scripts/bench_copy_strategies.py --dir /mnt/scratch --large-mb 512 --cold
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from usd_asset_packager.fastcopy import COPY_STRATEGIES, copy_bytes, sync_tree
+
+
+def _write_random(path: Path, size: int) -> None:
+    block = os.urandom(min(size, 1 << 20))
+    with open(path, "wb") as fh:
+        left = size
+        while left > 0:
+            fh.write(block[:left])
+            left -= len(block)
+
+
+def build_tree(root: Path, small: int, medium: int, large: int, large_mb: int) -> List[Path]:
+    files: List[Path] = []
+    specs: List[Tuple[str, int, int]] = [
+        ("textures/small_{:04d}.png", small, 256 * 1024),
+        ("textures/medium_{:03d}.png", medium, 16 * 1024 * 1024),
+        ("textures/large_{:02d}.exr", large, large_mb * 1024 * 1024),
+    ]
+    for pattern, count, size in specs:
+        for idx in range(count):
+            path = root / pattern.format(idx)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_random(path, size)
+            files.append(path)
+    sparse = root / "caches/sparse.vdb"
+    sparse.parent.mkdir(parents=True, exist_ok=True)
+    with open(sparse, "wb") as fh:
+        fh.write(os.urandom(1 << 20))
+        fh.seek(large_mb * 1024 * 1024)
+        fh.write(os.urandom(1 << 20))
+    files.append(sparse)
+    return files
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _drop_cache(paths: List[Path]) -> None:
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        with open(path, "rb") as fh:
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def run_strategy(strategy: str, src_root: Path, files: List[Path], dst_root: Path, jobs: int,
+                 direct_min_mb: int, cold: bool, logger: logging.Logger) -> Tuple[float, float, int]:
+    if dst_root.exists():
+        shutil.rmtree(dst_root)
+    if cold:
+        _drop_cache(files)
+    targets = [dst_root / path.relative_to(src_root) for path in files]
+    for target in targets:
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        list(pool.map(lambda pair: copy_bytes(pair[0], pair[1], strategy, direct_min_mb * 1024 * 1024),
+                      zip(files, targets)))
+    copy_seconds = time.perf_counter() - start
+    fsync_seconds = float(sync_tree(dst_root, jobs, logger)["seconds"])
+
+    allocated = 0
+    for src, target in zip(files, targets):
+        if src.stat().st_size != target.stat().st_size or _sha256(src) != _sha256(target):
+            raise SystemExit(f"{strategy}: {target} differs from {src}")
+        allocated += getattr(target.stat(), "st_blocks", 0) * 512
+    return copy_seconds, fsync_seconds, allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=None, help="Where to build the temp tree (default: system temp dir)")
+    parser.add_argument("--strategies", default=",".join(COPY_STRATEGIES),
+                        help="Comma-separated strategies to compare")
+    parser.add_argument("--small", type=int, default=400, help="Number of 256 KB files")
+    parser.add_argument("--medium", type=int, default=16, help="Number of 16 MB files")
+    parser.add_argument("--large", type=int, default=2, help="Number of large files")
+    parser.add_argument("--large-mb", type=int, default=256, help="Size of each large file (and sparse file span)")
+    parser.add_argument("--direct-min-mb", type=int, default=64, help="O_DIRECT threshold for the direct strategy")
+    parser.add_argument("--jobs", type=int, default=4, help="Copy threads, as --copy-jobs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy; the best is reported")
+    parser.add_argument("--cold", action="store_true", help="Drop sources from the page cache before each run")
+    parser.add_argument("--keep", action="store_true", help="Keep the temp tree")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench_copy_strategies")
+    strategies = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    for name in strategies:
+        if name not in COPY_STRATEGIES:
+            parser.error(f"unknown strategy {name!r}; choose from {', '.join(COPY_STRATEGIES)}")
+
+    work = Path(tempfile.mkdtemp(prefix="bench_copy_", dir=args.dir))
+    try:
+        src_root = work / "src"
+        files = build_tree(src_root, args.small, args.medium, args.large, args.large_mb)
+        total = sum(path.stat().st_size for path in files)
+        print(f"tree: {len(files)} files, {total / 1e6:.1f} MB under {work}")
+        print(f"{'strategy':<10}{'copy s':>10}{'MB/s':>10}{'fsync s':>10}{'alloc MB':>12}")
+        for name in strategies:
+            best = None
+            for _ in range(max(1, args.repeat)):
+                result = run_strategy(name, src_root, files, work / f"dst_{name}", args.jobs,
+                                      args.direct_min_mb, args.cold, logger)
+                if best is None or result[0] + result[1] < best[0] + best[1]:
+                    best = result
+            copy_s, fsync_s, allocated = best
+            print(f"{name:<10}{copy_s:>10.3f}{total / 1e6 / max(copy_s, 1e-9):>10.1f}{fsync_s:>10.3f}"
+                  f"{allocated / 1e6:>12.1f}")
+    finally:
+        if args.keep:
+            print(f"kept {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
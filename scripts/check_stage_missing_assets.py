@@ -24,6 +24,11 @@ def main() -> int:
     ap.add_argument("--usd", required=True, help="Path to USD file")
     ap.add_argument("--out", default=None, help="Write JSON report to this path")
     ap.add_argument("--max-examples", type=int, default=30)
+    ap.add_argument(
+        "--defer-payloads",
+        action="store_true",
+        help="Open with Usd.Stage.LoadNone and scan payload layers at the Sdf level instead of loading them",
+    )
     args = ap.parse_args()
 
     usd_path = Path(args.usd)
@@ -32,6 +37,7 @@ def main() -> int:
 
     # Import packager scanner/resolver so we mimic the packager's view of the world.
     from usd_asset_packager.scan import scan_stage  # noqa: WPS433
+    from usd_asset_packager.sdf_scan import scan_payload_closures  # noqa: WPS433
 
     class _Logger:
         def info(self, *_a, **_k):
@@ -43,17 +49,21 @@ def main() -> int:
         def debug(self, *_a, **_k):
             pass
 
-    stage = Usd.Stage.Open(str(usd_path))
+    load_set = Usd.Stage.LoadNone if args.defer_payloads else Usd.Stage.LoadAll
+    stage = Usd.Stage.Open(str(usd_path), load_set)
     if not stage:
         raise SystemExit(f"failed to open stage: {usd_path}")
 
-    # Best-effort: load payloads so composition is closer to "what you see".
-    try:
-        stage.Load()
-    except Exception:
-        pass
+    if not args.defer_payloads:
+        # Best-effort: load payloads so composition is closer to "what you see".
+        try:
+            stage.Load()
+        except Exception:
+            pass
 
     assets = scan_stage(stage, _Logger())
+    if args.defer_payloads:
+        scan_payload_closures(stage, assets, _Logger())
 
     # Structured stats
     totals_by_type: Counter[str] = Counter()
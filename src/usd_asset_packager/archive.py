@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import mmap
+import posixpath
+import shutil
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+
+# Zip-based package formats whose members are addressed as `pkg.usdz[inner/path]`.
+PACKAGE_SUFFIXES = (".usdz", ".zip")
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_MAGIC = b"PK\x03\x04"
+
+
+def is_package_path(path: str) -> bool:
+    """True for package-relative paths such as `/a/pkg.usdz[tex/a.png]`."""
+
+    return path.endswith("]") and path.find("[") > 0
+
+
+def split_package_path(path: str) -> Tuple[str, str]:
+    """(`/a/pkg.usdz`, `tex/a.png`) for `/a/pkg.usdz[tex/a.png]`; nested packages stay in the inner part."""
+
+    i = path.index("[")
+    return path[:i], path[i + 1:-1]
+
+
+def join_package_path(package: str, inner: str) -> str:
+    return f"{package}[{inner}]"
+
+
+def inner_path(path: str) -> str:
+    """Innermost member path of a package-relative path (the path itself otherwise)."""
+
+    while is_package_path(path):
+        path = split_package_path(path)[1]
+    return path
+
+
+def is_package_file(path: str) -> bool:
+    return path.lower().endswith(PACKAGE_SUFFIXES)
+
+
+def outer_package(path: str) -> Optional[str]:
+    """Package file that holds `path` (or is `path`), if any."""
+
+    if is_package_path(path):
+        return split_package_path(path)[0]
+    return path if is_package_file(path) else None
+
+
+class ZipArchive:
+    """Central directory of one zip-based package, with members read from an mmap.
+
+    Opening reads only the end-of-central-directory record and the central
+    directory. Stored members (every member of a `.usdz`) are sliced straight
+    out of the mapping, so copying one never reads any other member or
+    extracts the archive; compressed members are streamed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._zip = zipfile.ZipFile(self._fh)
+        except Exception:
+            self._fh.close()
+            raise
+        self._infos: Dict[str, zipfile.ZipInfo] = {}
+        self._folded: Dict[str, str] = {}
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                self._infos[info.filename] = info
+                self._folded.setdefault(info.filename.casefold(), info.filename)
+
+    def find(self, member: str) -> Optional[str]:
+        """Stored name of `member` (exact match first, then case-insensitive), or None."""
+
+        if member in self._infos:
+            return member
+        return self._folded.get(member.casefold())
+
+    def size(self, member: str) -> int:
+        return self._infos[member].file_size
+
+    def _stored_range(self, info: zipfile.ZipInfo) -> Optional[Tuple[int, int]]:
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return None
+        header = _LOCAL_HEADER.unpack_from(self._mm, info.header_offset)
+        if header[0] != _LOCAL_MAGIC:
+            return None
+        name_len, extra_len = header[9], header[10]
+        start = info.header_offset + _LOCAL_HEADER.size + name_len + extra_len
+        return start, start + info.compress_size
+
+    def copy_member(self, member: str, target: Path) -> None:
+        info = self._infos[member]
+        span = self._stored_range(info)
+        with open(target, "wb") as dst:
+            if span is not None:
+                with memoryview(self._mm) as view:
+                    dst.write(view[span[0]:span[1]])
+            else:
+                with self._zip.open(info) as src:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+
+    def close(self) -> None:
+        self._zip.close()
+        self._mm.close()
+        self._fh.close()
+
+
+class ArchiveCache:
+    """LRU of open `ZipArchive`s keyed by package path; unreadable packages are cached as None.
+
+    The lock only guards the LRU itself. Member copies run outside it on a
+    pinned archive: eviction (or `clear`) of a pinned archive drops it from
+    the LRU but leaves it open until the last copy using it finishes.
+    """
+
+    def __init__(self, max_open: int = 64) -> None:
+        self.max_open = max_open
+        self._archives: "OrderedDict[str, Optional[ZipArchive]]" = OrderedDict()
+        self._pins: Dict[ZipArchive, int] = {}
+        self._retired: Set[ZipArchive] = set()
+        self._lock = threading.RLock()
+
+    def _close(self, archive: ZipArchive) -> None:
+        if archive in self._pins:
+            self._retired.add(archive)
+        else:
+            archive.close()
+
+    @contextmanager
+    def _pinned(self, path: str) -> Iterator[Optional[ZipArchive]]:
+        """`get(path)`, kept open until the block exits even if the LRU evicts it meanwhile."""
+
+        with self._lock:
+            archive = self.get(path)
+            if archive is not None:
+                self._pins[archive] = self._pins.get(archive, 0) + 1
+        try:
+            yield archive
+        finally:
+            if archive is not None:
+                with self._lock:
+                    left = self._pins.pop(archive) - 1
+                    if left:
+                        self._pins[archive] = left
+                    elif archive in self._retired:
+                        self._retired.discard(archive)
+                        archive.close()
+
+    def get(self, path: str) -> Optional[ZipArchive]:
+        with self._lock:
+            if path in self._archives:
+                self._archives.move_to_end(path)
+                return self._archives[path]
+            try:
+                archive: Optional[ZipArchive] = ZipArchive(path)
+            except (OSError, ValueError, zipfile.BadZipFile):
+                archive = None
+            self._archives[path] = archive
+            while len(self._archives) > self.max_open:
+                _old, evicted = self._archives.popitem(last=False)
+                if evicted is not None:
+                    self._close(evicted)
+            return archive
+
+    def resolve_member(self, package: str, member: str) -> Optional[str]:
+        """Package-relative path of `member` inside `package` if it exists there."""
+
+        member = posixpath.normpath(member.replace("\\", "/"))
+        if member.startswith("../") or member in ("..", ".") or member.startswith("/"):
+            return None
+        archive = self.get(package)
+        found = archive.find(member) if archive is not None else None
+        return join_package_path(package, found) if found else None
+
+    def member_size(self, path: str) -> Optional[int]:
+        package, member = split_package_path(path)
+        with self._lock:
+            archive = self.get(package)
+            if archive is None or archive.find(member) is None:
+                return None
+            return archive.size(archive.find(member))
+
+    def copy_member(self, path: str, target: Path) -> None:
+        """Write member `path` (`pkg.usdz[inner]`) to `target`; nested packages are not supported."""
+
+        package, member = split_package_path(path)
+        if is_package_path(member):
+            raise ValueError(f"nested package paths are not supported: {path}")
+        with self._pinned(package) as archive:
+            found = archive.find(member) if archive is not None else None
+            if found is None:
+                raise FileNotFoundError(path)
+            archive.copy_member(found, target)
+
+    def clear(self) -> None:
+        with self._lock:
+            for archive in self._archives.values():
+                if archive is not None:
+                    self._close(archive)
+            self._archives.clear()
+
+
+_DEFAULT_ARCHIVES = ArchiveCache()
+
+
+def default_archives() -> ArchiveCache:
+    """Process-wide archive cache shared by the resolver and the copy step."""
+
+    return _DEFAULT_ARCHIVES
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+from .gltf_deps import GLTF_DERIVED
+from .types import AssetRef, CopyAction
+
+
+CopyKey = Tuple[str, str, str]
+
+
+def copy_key(asset: AssetRef) -> CopyKey:
+    """Identity of the physical copy an occurrence needs.
+
+    Two occurrences share a copy when they would be planned to the same target
+    from the same source: same asset type and resolved source path. Textures
+    owned by an MDL module are additionally keyed by that module, since their
+    target is placed next to the module's package (see `plan_target_path`);
+    glTF buffers / images likewise by their glTF file.
+    Unresolved occurrences are re-resolved against their own layer at copy
+    time, so they are keyed by (layer, authored path) instead.
+    """
+
+    if not asset.resolved_path:
+        return asset.asset_type, "", f"{asset.layer_identifier}\n{asset.original_path}"
+    owner = ""
+    if asset.asset_type == "texture" and asset.layer_identifier.lower().endswith(".mdl"):
+        owner = asset.layer_identifier
+    elif asset.prim_path in GLTF_DERIVED:
+        owner = asset.layer_identifier
+    return asset.asset_type, asset.resolved_path, owner
+
+
+@dataclass
+class IndexedAsset:
+    """One physical source file and every scanned occurrence of it."""
+
+    key: CopyKey
+    occurrences: List[AssetRef] = field(default_factory=list)
+
+    @property
+    def primary(self) -> AssetRef:
+        return self.occurrences[0]
+
+
+class AssetIndex:
+    """Occurrences grouped by `copy_key`, in first-seen order."""
+
+    def __init__(self, assets: Iterable[AssetRef] = ()) -> None:
+        self._entries: Dict[CopyKey, IndexedAsset] = {}
+        for asset in assets:
+            self.add(asset)
+
+    def add(self, asset: AssetRef) -> IndexedAsset:
+        key = copy_key(asset)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = IndexedAsset(key=key)
+        entry.occurrences.append(asset)
+        return entry
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def occurrence_count(self) -> int:
+        return sum(len(entry.occurrences) for entry in self._entries.values())
+
+    def fan_out(self, entry: IndexedAsset, action: CopyAction) -> List[CopyAction]:
+        """Per-occurrence copy actions sharing the result of one physical copy."""
+
+        return [
+            action if asset is action.asset else
+            CopyAction(asset=asset, target_path=action.target_path, success=action.success, reason=action.reason,
+                       method=action.method)
+            for asset in entry.occurrences
+        ]
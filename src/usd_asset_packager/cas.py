@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict
+
+_CHUNK = 1 << 20
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ContentStore:
+    """Content-addressed blobs under `out_dir/.cas/<sha256>`, linked to their planned targets.
+
+    Every copied file is written once into a temporary file of the store
+    while being hashed (the source is read a single time), then either
+    becomes the blob of its digest or, if that blob already exists, is
+    dropped and counted as deduplicated. The planned target is a hardlink to
+    the blob, or a relative symlink where the file system refuses hardlinks
+    (no support, link count limit). Blobs sit inside out_dir, so the output
+    stays relocatable either way.
+
+    Safe to use from copy worker threads.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._tmp_dir = root / ".tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.blobs = 0
+        self.stored_bytes = 0
+        self.deduplicated = 0
+        self.deduplicated_bytes = 0
+        self.hardlinks = 0
+        self.symlinks = 0
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest
+
+    def _tmp(self) -> Path:
+        # a fresh name, not mkstemp: the file is created by the writer with the usual umask mode
+        return self._tmp_dir / uuid.uuid4().hex
+
+    def put_file(self, src: Path, target: Path) -> None:
+        """Store the content of `src` and link `target` to it."""
+
+        tmp = self._tmp()
+        h = hashlib.sha256()
+        try:
+            with open(src, "rb") as fin, open(tmp, "wb") as fout:
+                for chunk in iter(lambda: fin.read(_CHUNK), b""):
+                    h.update(chunk)
+                    fout.write(chunk)
+            shutil.copystat(src, tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        self._commit(tmp, h.hexdigest(), target)
+
+    def put_written(self, write: Callable[[Path], None], target: Path) -> None:
+        """Store what `write(path)` produces (e.g. an archive member) and link `target` to it."""
+
+        tmp = self._tmp()
+        try:
+            write(tmp)
+            digest = _sha256_file(tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        self._commit(tmp, digest, target)
+
+    def _commit(self, tmp: Path, digest: str, target: Path) -> None:
+        blob = self.blob_path(digest)
+        size = tmp.stat().st_size
+        with self._lock:
+            if blob.exists():
+                tmp.unlink()
+                self.deduplicated += 1
+                self.deduplicated_bytes += size
+            else:
+                os.replace(tmp, blob)
+                self.blobs += 1
+                self.stored_bytes += size
+        self._link(blob, target)
+
+    def _link(self, blob: Path, target: Path) -> None:
+        if os.path.lexists(target):
+            # never write through an existing link into a blob
+            target.unlink()
+        try:
+            os.link(blob, target)
+            hardlink = True
+        except OSError:
+            os.symlink(os.path.relpath(blob, target.parent), target)
+            hardlink = False
+        with self._lock:
+            if hardlink:
+                self.hardlinks += 1
+            else:
+                self.symlinks += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": str(self.root),
+            "blobs": self.blobs,
+            "stored_bytes": self.stored_bytes,
+            "deduplicated_files": self.deduplicated,
+            "deduplicated_bytes": self.deduplicated_bytes,
+            "hardlinks": self.hardlinks,
+            "symlinks": self.symlinks,
+        }
+
+    def close(self) -> None:
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
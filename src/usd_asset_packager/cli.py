@@ -1,9 +1,18 @@
 from __future__ import annotations
 
 import argparse
+import logging
+import sys
 from pathlib import Path
 
+from .composition_profile import REDUNDANT_ARC_MIN
+from .dep_graph import DEFAULT_GRAPH_MAX_MB, DEFAULT_GRAPH_PATH
+from .fastcopy import COPY_STRATEGIES
+from .materialize import MATERIALIZE_MODES
 from .packager import Packager
+from .scan_cache import DEFAULT_MAX_MB
+from .filters import parse_purposes
+from .variants import VARIANT_MODES
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -19,16 +28,156 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--collision-strategy", default="keep_tree", choices=["keep_tree", "hash_prefix"],
                         help="文件命名冲突策略")
     parser.add_argument("--no-convert-gltf", dest="convert_gltf", action="store_false",
-                        help="禁用 glTF/GLB -> USD 转换，仅记录但不改写")
+                        help="禁用 glTF/GLB -> USD 转换，原样复制 glTF/GLB 及其外部 buffer/image 并改写引用")
     parser.add_argument("--convert-gltf", dest="convert_gltf", action="store_true", default=True,
                         help="启用 glTF/GLB 转换（默认）")
     parser.add_argument("--converter", default="omni", choices=["omni", "fallback_gltf2usd"],
                         help="选择转换后端；omni 使用 omni.kit.asset_converter，fallback 为降级方案")
+    parser.add_argument("--scan-backend", default="stage", choices=["stage", "sdf", "usdutils"],
+                        help="扫描引擎：stage 组合 Stage 后逐属性取值；sdf 直接遍历各 layer 的 spec，仅读取 asset 类型属性；"
+                             "usdutils 使用 UsdUtils.ComputeAllDependencies/ExtractExternalReferences (C++)")
+    parser.add_argument("--scan-parity", action="store_true",
+                        help="额外运行 stage 引擎，将与所选引擎的 AssetRef 差异写入 report.json 的 scan.parity")
+    parser.add_argument("--scan-jobs", type=int, default=1,
+                        help="逐 layer 扫描使用的进程数（sdf 引擎与 --defer-payloads 的 payload 闭包；结果按 layer 顺序合并）")
+    parser.add_argument("--shard-min-mb", type=float, default=0.0,
+                        help="sdf 引擎且 --scan-jobs > 1 时，不小于该大小（MB）的 layer 按 prim 子树（以 spec 数均衡）"
+                             "拆分到各进程并行扫描；0 表示不拆分")
+    parser.add_argument("--scan-cache", action="store_true",
+                        help="启用持久化扫描缓存（SQLite），按 real path/size/mtime 复用 layer 与 MDL 的依赖扫描结果")
+    parser.add_argument("--scan-cache-dir", default=None, help="扫描缓存目录（默认 ~/.cache/usd_asset_packager）")
+    parser.add_argument("--scan-cache-max-mb", type=int, default=DEFAULT_MAX_MB,
+                        help="扫描缓存容量上限（MB），超出按 LRU 淘汰")
+    parser.add_argument("--scan-cache-hash", action="store_true",
+                        help="size/mtime 变化时再比较内容 sha256，内容相同仍视为命中")
+    parser.add_argument("--defer-payloads", action="store_true",
+                        help="以 Usd.Stage.LoadNone 打开场景，不加载 payload；payload 的 layer 闭包在 Sdf 级单独扫描")
+    parser.add_argument("--prim", dest="prims", action="append", default=[],
+                        help="只打包该 prim 子树（可重复），以 StagePopulationMask 打开并自动包含其绑定的材质；"
+                             "输出 root 为打平后的子树 layer")
+    parser.add_argument("--variants", default="selected", choices=list(VARIANT_MODES),
+                        help="variant 打包范围：selected 仅当前选中的 variant；all 在 Sdf 级枚举所有 variant spec 一并打包"
+                             "（不为每个选择重新组合 stage）")
+    parser.add_argument("--skip-inactive", action="store_true",
+                        help="不打包 inactive prim（及其子树）上的依赖")
+    parser.add_argument("--purposes", type=_purposes, default=None,
+                        help="只打包这些 purpose 的 prim 子树上的依赖，逗号分隔（如 render,default）；"
+                             "guide/proxy 等其余 purpose 的子树被跳过")
+    parser.add_argument("--skip-invisible", action="store_true",
+                        help="不打包 visibility 为 invisible 的 prim 子树上的依赖")
+    parser.add_argument("--prune-unbound-materials", action="store_true",
+                        help="不打包只被未绑定材质引用的贴图/MDL（批量 ComputeBoundMaterials + shader 连接可达性），"
+                             "裁剪的文件与字节数写入 report.json 的 scan.prune")
+    parser.add_argument("--copy-jobs", type=int, default=1,
+                        help="复制使用的线程数；唯一文件按大小从大到小调度，report.json 中的顺序与并发无关")
+    parser.add_argument("--dedup-content", action="store_true",
+                        help="内容去重：相同内容的文件只在 out_dir/.cas/<sha256> 存一份，各目标路径为其硬链接"
+                             "（不支持硬链接时为相对符号链接）；USD layer 不参与。去重字节数写入 report.json 的 copy.dedup")
+    parser.add_argument("--copy-strategy", choices=list(COPY_STRATEGIES), default="shutil",
+                        help="复制字节的方式：shutil 为 shutil.copy2；kernel 在内核中 copy_file_range/sendfile，"
+                             "保留稀疏文件的空洞并预分配目标；direct 在 kernel 基础上对不小于 64 MB 的文件使用 O_DIRECT，"
+                             "不挤占打包节点的 page cache。可用 scripts/bench_copy_strategies.py 比较")
+    parser.add_argument("--fsync", action="store_true",
+                        help="结束前对输出目录做一次批量 fsync（文件与目录），耗时写入 report.json 的 copy.fsync")
+    parser.add_argument("--materialize", choices=list(MATERIALIZE_MODES), default="copy",
+                        help="输出文件的生成方式：copy 复制；hardlink 硬链接（需同一文件系统）；reflink 写时复制克隆"
+                             "（btrfs/xfs 等）；symlink 指向源文件的绝对符号链接（仅供本机迭代，输出不可搬移）。"
+                             "无法链接时回退为复制；会被改写的 USD layer 始终复制（reflink 除外）。"
+                             "每个文件实际使用的方式写入 report.json 的 copies[].method 与 copy.materialize")
+    parser.add_argument("--dep-graph", default=None,
+                        help="crawl 生成的数据集依赖图（SQLite），仅作为共享扫描缓存（替代 --scan-cache）：场景仍会打开并组合，"
+                             "sdf 引擎从图中读取各 layer 的依赖而不遍历 spec，各引擎从图中读取 MDL 依赖；"
+                             "图中缺失或已变化的文件重新扫描并补入。不会直接由图计算场景闭包")
+    parser.add_argument("--search-root", dest="search_roots", action="append", default=[],
+                        help="数据集根目录（可重复）；无法相对 layer 解析的路径按最长路径后缀在其文件索引中查找")
+    parser.add_argument("--search-index", default=None,
+                        help="--search-root 文件索引（SQLite）路径（默认 ~/.cache/usd_asset_packager/search_index.sqlite）")
+    parser.add_argument("--search-index-rebuild", action="store_true",
+                        help="重新遍历 --search-root 重建索引（默认复用已索引的根目录）")
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING"], help="日志级别")
     return parser
 
 
+def _purposes(value: str) -> tuple[str, ...] | None:
+    try:
+        return parse_purposes(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from exc
+
+
+def build_profile_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="usd-selfpack profile-composition",
+        description="统计场景的组合开销：每个 layer 的解析耗时、被引用次数与冗余的非实例化引用",
+    )
+    parser.add_argument("--input", required=True, help="要分析的 USD（输入场景或打包后的 USD）")
+    parser.add_argument("--out", help="composition_profile.json 输出目录（默认：输入文件所在目录，即打包输出中 report.json 的位置）")
+    parser.add_argument("--redundant-min", type=int, default=REDUNDANT_ARC_MIN,
+                        help=f"非实例 prim 引用同一 layer 达到该次数即报告为冗余引用（默认 {REDUNDANT_ARC_MIN}）")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING"], help="日志级别")
+    return parser
+
+
+def build_crawl_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="usd-selfpack crawl",
+        description="遍历数据集根目录，构建/增量更新持久化依赖图（layer -> 资产，MDL -> import/资源）",
+    )
+    parser.add_argument("--root", dest="roots", action="append", required=True,
+                        help="数据集根目录（可重复）")
+    parser.add_argument("--dep-graph", default=None,
+                        help=f"依赖图（SQLite）路径（默认 {DEFAULT_GRAPH_PATH}）")
+    parser.add_argument("--jobs", type=int, default=1, help="扫描 layer 与解析 MDL 使用的进程数")
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_GRAPH_MAX_MB,
+                        help="依赖图容量上限（MB），超出按 LRU 淘汰")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING"], help="日志级别")
+    return parser
+
+
+def _console_logger(level: str) -> logging.Logger:
+    logger = logging.getLogger("usd_asset_packager")
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    if not logger.handlers:
+        sh = logging.StreamHandler(sys.stdout)
+        sh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        logger.addHandler(sh)
+    return logger
+
+
+def crawl_main(argv: list[str]) -> None:
+    from .dep_graph import crawl_dataset, open_dep_graph
+
+    args = build_crawl_parser().parse_args(argv)
+    logger = _console_logger(args.log_level)
+    graph = open_dep_graph(Path(args.dep_graph) if args.dep_graph else None, args.max_mb, logger)
+    try:
+        for root in args.roots:
+            crawl_dataset(Path(root), graph, logger, jobs=max(1, args.jobs))
+    finally:
+        graph.close()
+    logger.info("dependency graph: %s", graph.db_path)
+
+
+def profile_main(argv: list[str]) -> None:
+    from .composition_profile import profile_composition
+    from .report import write_composition_profile
+
+    args = build_profile_parser().parse_args(argv)
+    logger = _console_logger(args.log_level)
+    input_path = Path(args.input).resolve()
+    profile = profile_composition(input_path, logger, redundant_min=args.redundant_min)
+    out_path = write_composition_profile(profile, Path(args.out) if args.out else input_path.parent)
+    logger.info("composition profile written to %s", out_path)
+
+
 def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "profile-composition":
+        profile_main(argv[1:])
+        return
+    if argv and argv[0] == "crawl":
+        crawl_main(argv[1:])
+        return
     parser = build_parser()
     args = parser.parse_args(argv)
 
@@ -43,6 +192,30 @@ def main(argv: list[str] | None = None) -> None:
         log_level=args.log_level,
         convert_gltf=args.convert_gltf,
         converter=args.converter,
+        scan_backend=args.scan_backend,
+        scan_parity=args.scan_parity,
+        defer_payloads=args.defer_payloads,
+        scan_jobs=args.scan_jobs,
+        scan_cache=args.scan_cache,
+        scan_cache_dir=Path(args.scan_cache_dir) if args.scan_cache_dir else None,
+        scan_cache_max_mb=args.scan_cache_max_mb,
+        scan_cache_hash=args.scan_cache_hash,
+        search_roots=args.search_roots,
+        search_index_path=Path(args.search_index) if args.search_index else None,
+        search_index_rebuild=args.search_index_rebuild,
+        prims=args.prims,
+        variants=args.variants,
+        prune_unbound_materials=args.prune_unbound_materials,
+        skip_inactive=args.skip_inactive,
+        purposes=args.purposes,
+        skip_invisible=args.skip_invisible,
+        shard_min_mb=args.shard_min_mb,
+        dep_graph=Path(args.dep_graph) if args.dep_graph else None,
+        copy_jobs=args.copy_jobs,
+        dedup_content=args.dedup_content,
+        materialize=args.materialize,
+        copy_strategy=args.copy_strategy,
+        fsync=args.fsync,
     )
     packager.run()
 
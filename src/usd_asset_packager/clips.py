@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pxr import Sdf
+
+from .resolver import default_resolver, is_remote, resolve_with_layer
+
+
+_HASH_RUN_RE = re.compile(r"#+")
+
+
+def template_regex(template_name: str) -> "re.Pattern[str]":
+    """Regex matching file names produced by a clip template file name.
+
+    Each run of `#` stands for a (zero-padded) number; `clip.###.usd` matches
+    `clip.001.usd` and `clip.1200.usd`, and `clip.###.###.usd` matches
+    sub-frame names like `clip.001.500.usd`.
+    """
+
+    parts = _HASH_RUN_RE.split(template_name)
+    return re.compile(r"(-?\d+)".join(re.escape(p) for p in parts) + r"\Z")
+
+
+def _template_time(match: "re.Match[str]") -> float:
+    groups = match.groups()
+    if len(groups) == 1:
+        return float(groups[0])
+    return float(f"{groups[0]}.{groups[1]}")
+
+
+def expand_template(template: str, resolve_base: str, start: Optional[float], end: Optional[float],
+                    stride: Optional[float]) -> List[Tuple[str, str]]:
+    """(authored path, resolved path) of the files a clip template refers to.
+
+    The template directory is listed once (through the shared resolver cache)
+    and names are matched against the template, instead of formatting and
+    stat-ing one path per frame, so 10k-frame clip sets cost one listing plus
+    a linear regex pass. Frames outside [start, end] or off the stride grid
+    are dropped; without a time range every matching file is kept.
+    """
+
+    if not template or is_remote(template) or not resolve_base:
+        return []
+    authored_dir, name = posixpath.split(template.replace("\\", "/"))
+    if "#" not in name:
+        return []
+    directory = resolve_with_layer(resolve_base, authored_dir or ".")
+    if not directory:
+        return []
+    regex = template_regex(name)
+    found: List[Tuple[float, str]] = []
+    for entry in default_resolver().list_dir(directory):
+        m = regex.match(entry)
+        if not m:
+            continue
+        t = _template_time(m)
+        if start is not None and end is not None:
+            if t < min(start, end) - 1e-6 or t > max(start, end) + 1e-6:
+                continue
+            if stride:
+                steps = (t - start) / stride
+                if abs(steps - round(steps)) > 1e-6:
+                    continue
+        found.append((t, entry))
+    found.sort()
+    return [(posixpath.join(authored_dir, entry) if authored_dir else entry, str(Path(directory) / entry))
+            for _t, entry in found]
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def clip_set_paths(clips: Dict[str, Dict[str, object]], resolve_base: str) -> List[Tuple[str, str, Optional[str]]]:
+    """(attr name, authored path, resolved path) of every file named by a `clips` dictionary.
+
+    Covers `assetPaths`, `manifestAssetPath` and `templateAssetPath` of every
+    clip set. Attribute names are `clips:<set>:<key>` (with `[i]` for
+    `assetPaths` entries); template expansions all carry the template key.
+    """
+
+    out: List[Tuple[str, str, Optional[str]]] = []
+
+    def _resolve(path: str) -> Optional[str]:
+        return resolve_with_layer(resolve_base, path) if resolve_base else None
+
+    for set_name in sorted(clips or {}):
+        clip_set = clips[set_name]
+        if not isinstance(clip_set, dict):
+            continue
+        prefix = f"clips:{set_name}"
+        for idx, item in enumerate(clip_set.get("assetPaths") or []):
+            path = item.path if isinstance(item, Sdf.AssetPath) else str(item)
+            if path:
+                out.append((f"{prefix}:assetPaths[{idx}]", path, _resolve(path)))
+        manifest = clip_set.get("manifestAssetPath")
+        manifest_path = manifest.path if isinstance(manifest, Sdf.AssetPath) else (manifest or "")
+        if manifest_path:
+            out.append((f"{prefix}:manifestAssetPath", manifest_path, _resolve(manifest_path)))
+        template = clip_set.get("templateAssetPath")
+        if template:
+            for authored, resolved in expand_template(
+                    str(template), resolve_base, _as_float(clip_set.get("templateStartTime")),
+                    _as_float(clip_set.get("templateEndTime")), _as_float(clip_set.get("templateStride"))):
+                out.append((f"{prefix}:templateAssetPath", authored, resolved))
+    return out
+
+
+def template_target(template: str, replacements: Dict[str, str]) -> Optional[str]:
+    """Rewritten form of a clip template, derived from its rewritten clip files.
+
+    Clip files of one template are copied into a single directory, so the new
+    template is that directory joined with the unchanged template file name.
+    Returns None when no replacement belongs to the template.
+    """
+
+    authored_dir, name = posixpath.split(template.replace("\\", "/"))
+    if "#" not in name:
+        return None
+    regex = template_regex(name)
+    norm_dir = posixpath.normpath(authored_dir or ".")
+    for old, new in replacements.items():
+        old_dir, old_name = posixpath.split(old.replace("\\", "/"))
+        if posixpath.normpath(old_dir or ".") == norm_dir and regex.match(old_name):
+            new_dir = posixpath.dirname(new.replace("\\", "/"))
+            return posixpath.join(new_dir, name) if new_dir else name
+    return None
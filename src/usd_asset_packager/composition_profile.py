@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from pxr import Pcp, Sdf, Usd
+
+from .sdf_scan import stage_layers
+
+
+# A layer composed at least this many times outside instancing is reported as a redundant arc.
+REDUNDANT_ARC_MIN = 100
+
+_ARC_TYPES = {Pcp.ArcTypeReference: "reference", Pcp.ArcTypePayload: "payload"}
+
+
+def _index_nodes(node: Pcp.NodeRef) -> Tuple[int, List[Tuple[str, str]]]:
+    """(node count, [(arc type, target root layer)]) of one prim index.
+
+    Only arcs introduced at this prim are returned; ancestral nodes (the same
+    reference seen again from a child prim) are counted as nodes but not as
+    arcs.
+    """
+
+    count = 0
+    arcs: List[Tuple[str, str]] = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        arc = _ARC_TYPES.get(n.arcType)
+        if arc and not n.IsDueToAncestor():
+            arcs.append((arc, n.layerStack.identifier.rootLayer.identifier))
+        stack.extend(n.children)
+    return count, arcs
+
+
+def _layer_row(layer: Sdf.Layer) -> Dict[str, object]:
+    """Size, format, prim spec count and standalone parse time of one layer.
+
+    Parse time re-reads the file into an anonymous layer, so the stage's
+    already-open copy (and the layer registry) does not hide it.
+    """
+
+    real = layer.realPath or ""
+    row: Dict[str, object] = {
+        "identifier": layer.identifier,
+        "path": real,
+        "format": layer.GetFileFormat().formatId if layer.GetFileFormat() else "",
+        "anonymous": layer.anonymous,
+        "size_bytes": None,
+        "parse_seconds": None,
+    }
+    if real and not layer.anonymous:
+        try:
+            row["size_bytes"] = os.path.getsize(real)
+        except OSError:
+            pass
+        start = time.perf_counter()
+        try:
+            if Sdf.Layer.OpenAsAnonymous(real):
+                row["parse_seconds"] = round(time.perf_counter() - start, 6)
+        except Exception:  # noqa: BLE001
+            pass
+    paths: List[Sdf.Path] = []
+    layer.Traverse(Sdf.Path.absoluteRootPath, paths.append)
+    row["prim_specs"] = sum(1 for p in paths if p.IsPrimPath())
+    row["specs"] = len(paths)
+    return row
+
+
+def profile_composition(input_path: Path, logger: logging.Logger,
+                        redundant_min: int = REDUNDANT_ARC_MIN) -> Dict[str, object]:
+    """Open `input_path` and report where its composition time goes.
+
+    - per layer (the same inventory the scanners walk: root layer stack, then
+      used layers): format, size, prim specs, standalone parse time and how
+      many prim indices reach it through a reference / payload arc;
+    - totals: stage open time, prim indices (prototype prims included, instance
+      proxies share them) and Pcp nodes;
+    - redundant arcs: layers composed at least `redundant_min` times on prims
+      that are not instances, with the prim specs that recomposition repeats.
+    """
+
+    start = time.perf_counter()
+    stage = Usd.Stage.Open(str(input_path), Usd.Stage.LoadAll)
+    if not stage:
+        raise RuntimeError(f"无法打开 {input_path}")
+    open_seconds = time.perf_counter() - start
+
+    prims: List[Usd.Prim] = list(stage.TraverseAll())
+    prototypes = stage.GetPrototypes()
+    for prototype in prototypes:
+        prims.extend(Usd.PrimRange(prototype))
+
+    reached: Counter = Counter()
+    on_instances: Counter = Counter()
+    arc_types: Dict[str, Counter] = {}
+    pcp_nodes = 0
+    instances = 0
+    start = time.perf_counter()
+    for prim in prims:
+        is_instance = prim.IsInstance()
+        instances += is_instance
+        count, arcs = _index_nodes(prim.GetPrimIndex().rootNode)
+        pcp_nodes += count
+        for arc, layer_id in arcs:
+            reached[layer_id] += 1
+            arc_types.setdefault(layer_id, Counter())[arc] += 1
+            if is_instance:
+                on_instances[layer_id] += 1
+    walk_seconds = time.perf_counter() - start
+
+    layers: List[Dict[str, object]] = []
+    for layer in stage_layers(stage):
+        row = _layer_row(layer)
+        row["reached"] = reached.get(layer.identifier, 0)
+        row["reached_by"] = dict(arc_types.get(layer.identifier, {}))
+        row["reached_on_instances"] = on_instances.get(layer.identifier, 0)
+        layers.append(row)
+    layers.sort(key=lambda r: (-(r["parse_seconds"] or 0.0), r["identifier"]))
+
+    redundant: List[Dict[str, object]] = []
+    for row in layers:
+        repeated = row["reached"] - row["reached_on_instances"]
+        if repeated >= redundant_min:
+            redundant.append({
+                "layer": row["identifier"],
+                "reached": row["reached"],
+                "reached_on_instances": row["reached_on_instances"],
+                "repeated_prim_specs": repeated * row["prim_specs"],
+                "hint": "referencing prims are not instanceable; mark them instanceable to compose the layer once",
+            })
+    redundant.sort(key=lambda r: -r["repeated_prim_specs"])
+
+    totals = {
+        "open_seconds": round(open_seconds, 6),
+        "index_walk_seconds": round(walk_seconds, 6),
+        "layers": len(layers),
+        "parse_seconds": round(sum(r["parse_seconds"] or 0.0 for r in layers), 6),
+        "size_bytes": sum(r["size_bytes"] or 0 for r in layers),
+        "prim_specs": sum(r["prim_specs"] for r in layers),
+        "prim_indices": len(prims),
+        "pcp_nodes": pcp_nodes,
+        "instances": instances,
+        "prototypes": len(prototypes),
+    }
+    logger.info("composition: open %.3fs, %d layers (parse %.3fs), %d prim indices, %d Pcp nodes, %d redundant arcs",
+                totals["open_seconds"], totals["layers"], totals["parse_seconds"], totals["prim_indices"],
+                totals["pcp_nodes"], len(redundant))
+    for row in layers[:10]:
+        logger.info("  %-7s %10s B  parse %.4fs  prim specs %-8d reached %-6d %s", row["format"],
+                    row["size_bytes"], row["parse_seconds"] or 0.0, row["prim_specs"], row["reached"],
+                    row["identifier"])
+    return {"input": str(input_path), "totals": totals, "layers": layers, "redundant_arcs": redundant,
+            "redundant_arc_min": redundant_min}
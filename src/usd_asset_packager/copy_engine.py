@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Hashable, List, NamedTuple, Sequence
+
+
+class CopyJob(NamedTuple):
+    """One unit of copy work.
+
+    Jobs with the same `target` are run one after another by the same worker,
+    so two sources planned to one output file never write it concurrently.
+    `size` (source bytes) only orders the schedule and the progress log.
+    """
+
+    key: Hashable
+    target: str
+    size: int
+    run: Callable[[], object]
+
+
+class _Progress:
+    """Throttled "n/total files, bytes" log lines (every 5% of the files, at least 25, or 5 s)."""
+
+    def __init__(self, label: str, files: int, total_bytes: int, logger: logging.Logger) -> None:
+        self.label = label
+        self.files = files
+        self.total_bytes = total_bytes
+        self.logger = logger
+        self.done = 0
+        self.done_bytes = 0
+        self._step = max(25, files // 20)
+        self._start = self._last = time.perf_counter()
+
+    def advance(self, files: int, nbytes: int) -> None:
+        before = self.done
+        self.done += files
+        self.done_bytes += nbytes
+        now = time.perf_counter()
+        if self.done // self._step != before // self._step or now - self._last >= 5.0 or self.done == self.files:
+            self._last = now
+            elapsed = max(now - self._start, 1e-6)
+            self.logger.info("%s: %d/%d files, %.1f/%.1f MB (%.1f MB/s)", self.label, self.done, self.files,
+                             self.done_bytes / 1e6, self.total_bytes / 1e6, self.done_bytes / 1e6 / elapsed)
+
+
+def run_copy_jobs(jobs: Sequence[CopyJob], workers: int, logger: logging.Logger,
+                  label: str = "copy") -> Dict[Hashable, object]:
+    """Run `jobs` on a bounded thread pool, largest first; return results keyed by job key.
+
+    Copies are I/O bound (and `shutil` releases the GIL while reading and
+    writing), so threads overlap the latency of network file systems. Jobs
+    are grouped by target, and the groups are submitted in decreasing size so
+    the biggest files start first and the tail of the run is made of small
+    ones. With `workers <= 1` the jobs run in the given order on the calling
+    thread. Results do not depend on completion order; an exception raised by
+    a job is re-raised here.
+    """
+
+    groups: Dict[str, List[CopyJob]] = {}
+    for job in jobs:
+        groups.setdefault(job.target, []).append(job)
+    progress = _Progress(label, len(jobs), sum(job.size for job in jobs), logger)
+    results: Dict[Hashable, object] = {}
+
+    def _run_group(group: List[CopyJob]) -> List[object]:
+        return [job.run() for job in group]
+
+    if workers <= 1 or len(groups) < 2:
+        for job in jobs:
+            results[job.key] = job.run()
+            progress.advance(1, job.size)
+        return results
+
+    ordered = sorted(groups.values(), key=lambda group: -sum(job.size for job in group))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy") as pool:
+        futures = {pool.submit(_run_group, group): group for group in ordered}
+        for future in as_completed(futures):
+            group = futures[future]
+            for job, result in zip(group, future.result()):
+                results[job.key] = result
+            progress.advance(len(group), sum(job.size for job in group))
+    return results
@@ -2,15 +2,38 @@ from __future__ import annotations
 
 import hashlib
 import logging
-import shutil
+import os
+import threading
+from dataclasses import replace
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
+from .archive import default_archives, is_package_path, join_package_path, split_package_path
+from .cas import ContentStore
 from .converter import ConverterBackend
-from .resolver import resolve_with_layer, udim_tiles
+from .fastcopy import copy_bytes
+from .gltf_deps import GLTF_DERIVED, sidecar_target
+from .materialize import existing_method, link_file
+from .mdl_graph import MdlGraph
+from .prefilter import may_have_asset_paths
+from .resolver import UDIM_TOKEN, resolve_with_layer, udim_tiles
 from .types import AssetRef, CopyAction
 
 
+# Copy worker threads share target directories; creating them is serialized.
+_MKDIR_LOCK = threading.Lock()
+
+
+def ensure_parent(target: Path) -> None:
+    """Create the directory of `target` if needed (safe to call from copy worker threads)."""
+
+    parent = target.parent
+    if parent.is_dir():
+        return
+    with _MKDIR_LOCK:
+        parent.mkdir(parents=True, exist_ok=True)
+
+
 def _hash_prefix(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
 
@@ -27,14 +50,51 @@ def _target_base(asset_type: str, out_dir: Path) -> Path:
     return out_dir / "assets" / "misc"
 
 
-def plan_target_path(asset: AssetRef, out_dir: Path, collision_strategy: str, base_root: Path) -> Path:
+def _mdl_package_root(mdl_src: Path, mdl_graph: Optional[MdlGraph]) -> Path:
+    """Directory an external MDL module tree is grouped by.
+
+    Without a graph this is the module's own directory. With one, it is the
+    common directory of all modules connected through imports, so `..::`
+    imports across sibling folders survive the copy.
+    """
+
+    mdl_dir = mdl_src.resolve().parent
+    if mdl_graph is None:
+        return mdl_dir
+    return Path(mdl_graph.package_root(str(mdl_src)))
+
+
+def plan_target_path(asset: AssetRef, out_dir: Path, collision_strategy: str, base_root: Path,
+                     mdl_graph: Optional[MdlGraph] = None, convert_gltf: bool = True) -> Path:
+    if asset.prim_path in GLTF_DERIVED:
+        # glTF 的 buffer/image 按 URI 放在复制后的 glTF 旁边，glTF 本身无需改写；
+        # URI 跳出 out_dir（`../shared/buf.bin`）时放在 glTF 同目录，由 Packager 改写 .gltf（GLB 无法改写，记为失败）
+        owner = replace(asset, asset_type="glb", original_path=asset.layer_identifier,
+                        resolved_path=asset.layer_identifier, prim_path="", attr_name="")
+        owner_target = plan_target_path(owner, out_dir, collision_strategy, base_root, convert_gltf=False)
+        return (sidecar_target(owner_target, asset.original_path, out_dir)
+                or owner_target.parent / Path(asset.original_path).name)
     src = asset.resolved_path or asset.original_path
+    if is_package_path(src):
+        package, member = split_package_path(src)
+        package_target = plan_target_path(replace(asset, original_path=package, resolved_path=package),
+                                          out_dir, collision_strategy, base_root, mdl_graph, convert_gltf)
+        if asset.asset_type == "usd":
+            # 包内 layer 随整个包复制，保持包内相对引用
+            return Path(join_package_path(str(package_target), member))
+        # 其余成员单独取出，放在以包名命名的目录下
+        return package_target.with_name(package_target.name.replace(".", "_")) / member
     base = _target_base(asset.asset_type, out_dir)
-    # glb/gltf 目标改为 .usd
+    # glb/gltf 转换时目标改为 .usd
     name = Path(src).name
-    if asset.asset_type == "glb":
+    if asset.asset_type == "glb" and convert_gltf:
         name = Path(name).with_suffix(".usd").name
+    is_template_clip = asset.asset_type == "usd" and asset.attr_name.endswith(":templateAssetPath")
     if collision_strategy == "hash_prefix":
+        if is_template_clip:
+            # The rewritten template keeps its file name, so its clip files keep
+            # theirs too and share one directory per source directory.
+            return base / _hash_prefix(str(Path(src).resolve().parent)) / name
         prefix = _hash_prefix(src)
         return base / f"{prefix}_{name}"
     # keep_tree
@@ -48,9 +108,9 @@ def plan_target_path(asset: AssetRef, out_dir: Path, collision_strategy: str, ba
         # individual file, so that siblings land under the same output folder.
         if asset.asset_type == "mdl":
             try:
-                src_dir = Path(src).resolve().parent
-                prefix = _hash_prefix(str(src_dir))
-                rel = Path("external") / prefix / name
+                pkg_root = _mdl_package_root(Path(src), mdl_graph)
+                prefix = _hash_prefix(str(pkg_root))
+                rel = Path("external") / prefix / Path(src).resolve().relative_to(pkg_root)
             except Exception:
                 prefix = _hash_prefix(str(Path(src).resolve()))
                 rel = Path("external") / prefix / name
@@ -64,20 +124,27 @@ def plan_target_path(asset: AssetRef, out_dir: Path, collision_strategy: str, ba
                 mdl_src = Path(asset.layer_identifier)
                 if mdl_src.suffix.lower() == ".mdl" and mdl_src.is_absolute():
                     mdl_dir = mdl_src.resolve().parent
-                    prefix = _hash_prefix(str(mdl_dir))
+                    pkg_root = _mdl_package_root(mdl_src, mdl_graph)
+                    prefix = _hash_prefix(str(pkg_root))
                     tex_abs = Path(src).resolve()
                     rel_from_mdl = tex_abs.relative_to(mdl_dir)
                     parts = list(rel_from_mdl.parts)
                     if parts and parts[0].lower() == "textures":
                         parts = parts[1:]
                     rel_tex = Path(*parts) if parts else Path(tex_abs.name)
-                    rel = Path("external") / prefix / "textures" / rel_tex
+                    rel = Path("external") / prefix / mdl_dir.relative_to(pkg_root) / "textures" / rel_tex
                 else:
                     raise ValueError("not an mdl-owned texture")
             except Exception:
                 prefix = _hash_prefix(str(Path(src).resolve()))
                 rel = Path("external") / prefix / name
 
+        # Value clips matched by a `clips:templateAssetPath` outside base_root:
+        # bucket by source directory, not by file, so the clip files of one
+        # template stay side by side and the rewritten template matches them all.
+        elif is_template_clip:
+            src_dir = Path(src).resolve().parent
+            rel = Path("external") / _hash_prefix(str(src_dir)) / name
         # When the source is outside base_root, fall back to a stable unique
         # location to avoid basename collisions (e.g. many different instance.usd).
         #
@@ -98,15 +165,122 @@ def plan_target_path(asset: AssetRef, out_dir: Path, collision_strategy: str, ba
         else:
             prefix = _hash_prefix(str(Path(src).resolve()))
             rel = Path("external") / prefix / name
-    if asset.asset_type == "glb":
+    if asset.asset_type == "glb" and convert_gltf:
         rel = Path(rel).with_suffix(".usd")
     return base / rel
 
 
+def is_udim_pattern(asset: AssetRef) -> bool:
+    return asset.is_udim and UDIM_TOKEN in asset.original_path
+
+
+def plan_udim_copies(asset: AssetRef, out_dir: Path, collision_strategy: str, base_root: Path,
+                     mdl_graph: Optional[MdlGraph] = None) -> Tuple[Path, List[Tuple[Path, Path]]]:
+    """Target of a `<UDIM>` pattern and the (source, target) pair of each tile.
+
+    Tiles land next to the planned pattern target under their own names, so the
+    rewritten pattern keeps resolving to all of them.
+    """
+
+    target = plan_target_path(asset, out_dir, collision_strategy, base_root, mdl_graph)
+    _pattern_dir, tiles = udim_tiles(asset.resolved_path or "")
+    return target, [(Path(tile), target.parent / Path(tile).name) for tile in tiles]
+
+
+def copy_package_member(member_path: str, target: Path, logger: logging.Logger,
+                        store: Optional[ContentStore] = None) -> Tuple[bool, str, str]:
+    """Copy one member (`pkg.usdz[inner]`) out of a zip-based package without extracting the rest.
+
+    Members always need real bytes, so they are copied whatever `--materialize` asks for.
+    """
+
+    archives = default_archives()
+    try:
+        ensure_parent(target)
+        if target.is_file() and target.stat().st_size == archives.member_size(member_path):
+            return True, "already copied", "copy"
+        if store is not None:
+            store.put_written(lambda path: archives.copy_member(member_path, path), target)
+        else:
+            _unlink_stale(target)
+            archives.copy_member(member_path, target)
+        logger.info("copied %s -> %s", member_path, target)
+        return True, "", "cas" if store is not None else "copy"
+    except Exception as exc:  # noqa: BLE001
+        return False, str(exc), ""
+
+
+def _unlink_stale(target: Path) -> None:
+    """Remove an outdated target first: it may be a link into `.cas`, which must not be written through."""
+
+    if os.path.lexists(target):
+        target.unlink()
+
+
+def copy_file(src: Path, target: Path, logger: logging.Logger, store: Optional[ContentStore] = None,
+              mode: str = "copy", strategy: str = "shutil") -> Tuple[bool, str, str]:
+    """Materialize one file; returns (ok, reason, method actually used).
+
+    `mode` is one of `MATERIALIZE_MODES`; a hardlink / reflink / symlink that
+    the file system refuses falls back to a copy. Copies go to the
+    content-addressed `store` when one is given (it hashes while reading, so
+    it always copies through user space), otherwise use `strategy` (one of
+    `fastcopy.COPY_STRATEGIES`). An existing target of the
+    same size is kept (resume) unless it is a link the requested mode would
+    not produce.
+    """
+
+    try:
+        ensure_parent(target)
+
+        # Fast resume: if target already exists and looks identical, skip recopy.
+        # This is especially helpful when a long packaging run is interrupted.
+        if target.exists():
+            try:
+                if src.is_file() and target.is_file() and src.stat().st_size == target.stat().st_size:
+                    existing = existing_method(src, target)
+                    if existing == mode or (existing == "copy" and mode != "symlink"):
+                        return True, "already copied", existing
+            except Exception:
+                pass
+
+        if mode != "copy":
+            _unlink_stale(target)
+            try:
+                link_file(src, target, mode)
+                logger.info("%s %s -> %s", mode, src, target)
+                return True, "", mode
+            except OSError as exc:
+                logger.debug("%s %s -> %s failed (%s); copying instead", mode, src, target, exc)
+        if store is not None:
+            store.put_file(src, target)
+            method = "cas"
+        else:
+            _unlink_stale(target)
+            copy_bytes(src, target, strategy)
+            method = "copy"
+        logger.info("copied %s -> %s", src, target)
+        return True, "", method
+    except Exception as exc:  # noqa: BLE001
+        return False, str(exc), ""
+
+
 def copy_asset(asset: AssetRef, out_dir: Path, collision_strategy: str, base_root: Path,
                layer_real_map: dict[str, str], logger: logging.Logger,
                converter_backend: Optional[ConverterBackend] = None,
-               convert_gltf: bool = True) -> CopyAction:
+               convert_gltf: bool = True, mdl_graph: Optional[MdlGraph] = None,
+               target: Optional[Path] = None, store: Optional[ContentStore] = None,
+               materialize: str = "copy", copy_strategy: str = "shutil") -> CopyAction:
+    """Copy (or convert) one asset; `target` is its planned path if already known.
+
+    Copied USD layers are rewritten in place afterwards, so they never go to
+    the content store `store`, and are only hard/sym-linked (`materialize`)
+    when the prefilter proves they author no asset path anywhere, dictionary
+    metadata included (nothing any backend could rewrite, so the source is
+    never modified through the link). The action records
+    the method actually used.
+    """
+
     if asset.is_remote:
         return CopyAction(asset=asset, target_path=None, success=False, reason="remote source not copied")
 
@@ -119,43 +293,49 @@ def copy_asset(asset: AssetRef, out_dir: Path, collision_strategy: str, base_roo
     if not src_path:
         return CopyAction(asset=asset, target_path=None, success=False, reason="source missing")
 
-    src = Path(src_path)
-    target = plan_target_path(asset, out_dir, collision_strategy, base_root)
-    try:
-        target.parent.mkdir(parents=True, exist_ok=True)
+    mode = materialize
+    if asset.asset_type == "usd":
+        store = None
+        if mode in ("hardlink", "symlink") and may_have_asset_paths(src_path, dictionaries=True):
+            mode = "copy"
+    if target is None and not is_udim_pattern(asset):
+        target = plan_target_path(asset, out_dir, collision_strategy, base_root, mdl_graph, convert_gltf)
 
-        # Fast resume: if target already exists and looks identical, skip recopy.
-        # This is especially helpful when a long packaging run is interrupted.
-        if asset.asset_type != "glb" and target.exists():
-            try:
-                if src.is_file() and target.is_file() and src.stat().st_size == target.stat().st_size:
-                    return CopyAction(asset=asset, target_path=str(target), success=True, reason="already copied")
-            except Exception:
-                pass
+    if is_package_path(src_path):
+        if asset.asset_type == "usd":
+            package, _member = split_package_path(src_path)
+            ok, reason, method = copy_file(Path(package), Path(split_package_path(str(target))[0]), logger,
+                                           mode=mode, strategy=copy_strategy)
+        else:
+            ok, reason, method = copy_package_member(src_path, target, logger, store)
+        return CopyAction(asset=asset, target_path=str(target), success=ok, reason=reason, method=method)
 
-        if asset.asset_type == "glb":
-            if not convert_gltf:
-                return CopyAction(asset=asset, target_path=str(target), success=False,
-                                  reason="glTF conversion disabled (--no-convert-gltf)")
-            if not converter_backend or not converter_backend.available:
-                return CopyAction(asset=asset, target_path=str(target), success=False,
-                                  reason="glTF converter unavailable; enable omni.kit.asset_converter")
+    src = Path(src_path)
+    if is_udim_pattern(asset):
+        target, tiles = plan_udim_copies(asset, out_dir, collision_strategy, base_root, mdl_graph)
+        if not tiles:
+            return CopyAction(asset=asset, target_path=str(target), success=False,
+                              reason=f"UDIM tiles not found under {src.parent}")
+        methods = set()
+        for tile_src, tile_target in tiles:
+            ok, reason, method = copy_file(tile_src, tile_target, logger, store, mode, copy_strategy)
+            if not ok:
+                return CopyAction(asset=asset, target_path=str(target), success=False, reason=reason)
+            methods.add(method)
+        logger.info("copied UDIM tiles to %s", target.parent)
+        return CopyAction(asset=asset, target_path=str(target), success=True, reason="udim copied",
+                          method=",".join(sorted(methods)))
+
+    if asset.asset_type == "glb" and convert_gltf:
+        if not converter_backend or not converter_backend.available:
+            return CopyAction(asset=asset, target_path=str(target), success=False,
+                              reason="glTF converter unavailable; enable omni.kit.asset_converter")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
             ok, reason = converter_backend.convert(src, target)
-            return CopyAction(asset=asset, target_path=str(target), success=ok, reason=reason)
-        if asset.is_udim and "<UDIM>" in asset.original_path:
-            pattern_dir, tiles = udim_tiles(str(src))
-            if not tiles:
-                return CopyAction(asset=asset, target_path=str(target), success=False,
-                                  reason=f"UDIM tiles not found under {pattern_dir}")
-            for tile in tiles:
-                tile_src = Path(tile)
-                tile_target = target.parent / tile_src.name
-                tile_target.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(tile_src, tile_target)
-            logger.info("copied UDIM tiles to %s", target.parent)
-            return CopyAction(asset=asset, target_path=str(target), success=True, reason="udim copied")
-        shutil.copy2(src, target)
-        logger.info("copied %s -> %s", src, target)
-        return CopyAction(asset=asset, target_path=str(target), success=True)
-    except Exception as exc:  # noqa: BLE001
-        return CopyAction(asset=asset, target_path=str(target), success=False, reason=str(exc))
+        except Exception as exc:  # noqa: BLE001
+            ok, reason = False, str(exc)
+        return CopyAction(asset=asset, target_path=str(target), success=ok, reason=reason,
+                          method="convert" if ok else "")
+    ok, reason, method = copy_file(src, target, logger, store, mode, copy_strategy)
+    return CopyAction(asset=asset, target_path=str(target), success=ok, reason=reason, method=method)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .mdl_graph import authored_dependencies
+from .scan_cache import DEFAULT_CACHE_DIR, ScanCache
+from .sdf_scan import layer_scan_pool, scan_layer_batch
+from .search_index import walk_files
+
+
+DEFAULT_GRAPH_PATH = DEFAULT_CACHE_DIR / "dep_graph.sqlite"
+# A dataset graph is meant to hold every layer of the dataset; keep it well above the scan cache cap.
+DEFAULT_GRAPH_MAX_MB = 4096
+
+LAYER_EXTS = (".usd", ".usda", ".usdc", ".usdz")
+
+# Layers per scan batch: results are persisted (and committed) after every batch.
+_CHUNK = 256
+
+
+def open_dep_graph(db_path: Optional[Path] = None, max_mb: int = DEFAULT_GRAPH_MAX_MB,
+                   logger: Optional[logging.Logger] = None) -> ScanCache:
+    """Open the dataset dependency graph written by `crawl`.
+
+    The graph is a `ScanCache` database: "layer" entries are the layer ->
+    authored asset edges, "mdl_module" entries the MDL -> imports/resources
+    edges (authored specifiers, resolved again on load), both valid while the
+    file's size and mtime are unchanged and the entry's payload version is
+    current. When packing it is only a shared scan cache: the stage is still
+    opened and composed (rewriting, filters and masks need it), the sdf scan
+    and `MdlGraph` read their per-layer / per-module entries from it instead
+    of scanning, and a layer or module missing from it (or changed since the
+    crawl) is scanned and added. The closure of a scene is not computed from
+    the graph.
+    """
+
+    path = Path(db_path).expanduser() if db_path else DEFAULT_GRAPH_PATH
+    return ScanCache(path, max_mb * 1024 * 1024, logger=logger)
+
+
+def dataset_files(root: Path) -> Tuple[List[str], List[str]]:
+    """(USD layers, MDL modules) under `root`, as sorted real paths."""
+
+    layers: List[str] = []
+    mdls: List[str] = []
+    for path in walk_files(root):
+        lower = path.lower()
+        if lower.endswith(LAYER_EXTS):
+            layers.append(os.path.realpath(path))
+        elif lower.endswith(".mdl"):
+            mdls.append(os.path.realpath(path))
+    return sorted(set(layers)), sorted(set(mdls))
+
+
+def _mdl_module_task(path: str) -> Tuple[str, Dict[str, list]]:
+    """Parse one MDL module's authored specifiers; runs in a pool worker."""
+
+    return path, authored_dependencies(path)
+
+
+def crawl_dataset(root: Path, graph: ScanCache, logger: logging.Logger, jobs: int = 1) -> Dict[str, object]:
+    """Bring the graph up to date with every USD layer and MDL module under `root`.
+
+    Files whose size/mtime match their entry are skipped, so re-crawling a
+    dataset only scans what changed; entries of files that no longer exist
+    under `root` are removed. Layers are scanned with the sdf scan and MDL
+    modules parsed with `authored_dependencies`, both in a process pool with `jobs > 1`.
+    """
+
+    start = time.perf_counter()
+    root = Path(os.path.realpath(Path(root).expanduser()))
+    layers, mdls = dataset_files(root)
+    removed = graph.forget_missing(str(root))
+    hits_before = dict(graph.hits)
+
+    layer_errors = 0
+    with layer_scan_pool(jobs) as pool:
+        for offset in range(0, len(layers), _CHUNK):
+            chunk = layers[offset:offset + _CHUNK]
+            batch = scan_layer_batch(chunk, "", pool, graph, logger=logger)
+            for path, (_identifier, real, _refs) in zip(chunk, batch):
+                if not real:
+                    layer_errors += 1
+                    logger.warning("crawl: cannot open layer %s", path)
+            graph.commit()
+            logger.info("crawl: layers %d/%d", min(offset + _CHUNK, len(layers)), len(layers))
+
+        todo = [path for path in mdls if graph.get("mdl_module", path) is None]
+        if pool is None or len(todo) < 2:
+            parsed = [_mdl_module_task(path) for path in todo]
+        else:
+            parsed = list(pool.map(_mdl_module_task, todo, chunksize=16))
+        for path, payload in parsed:
+            graph.put("mdl_module", path, payload)
+        graph.commit()
+
+    layer_hits = graph.hits.get("layer", 0) - hits_before.get("layer", 0)
+    mdl_hits = graph.hits.get("mdl_module", 0) - hits_before.get("mdl_module", 0)
+    stats: Dict[str, object] = {
+        "root": str(root),
+        "layers": len(layers),
+        "layers_scanned": len(layers) - layer_hits,
+        "layer_errors": layer_errors,
+        "mdl_modules": len(mdls),
+        "mdl_parsed": len(todo),
+        "mdl_unchanged": mdl_hits,
+        "removed": removed,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info("crawl: %s: %d layers (%d scanned), %d MDL modules (%d parsed), %d stale entries removed in %.1fs",
+                root, len(layers), stats["layers_scanned"], len(mdls), len(todo), removed, stats["seconds"])
+    return stats
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import errno
+import logging
+import mmap
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+# How the bytes of a plain copy are moved:
+# - shutil: `shutil.copy2` (user-space buffers; the portable default);
+# - kernel: `copy_file_range` / `sendfile` in the kernel, holes preserved, target preallocated;
+# - direct: like kernel, but (non-sparse) files of at least `DIRECT_MIN_BYTES` go through O_DIRECT,
+#   bypassing the page cache of the packing node.
+COPY_STRATEGIES = ("shutil", "kernel", "direct")
+
+DIRECT_MIN_BYTES = 64 * 1024 * 1024
+
+_CHUNK = 8 * 1024 * 1024
+# O_DIRECT needs offsets, lengths and buffer addresses aligned to the logical block size;
+# 4 KiB covers the usual devices, and the mmap buffer is page aligned.
+_ALIGN = 4096
+# copy_file_range / sendfile unsupported for this pair of files: use the next mechanism.
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def _data_segments(fd: int, size: int) -> Iterator[Tuple[int, int]]:
+    """(start, end) of the data regions of `fd` (SEEK_DATA / SEEK_HOLE); the whole file if unsupported."""
+
+    if not hasattr(os, "SEEK_DATA"):
+        yield 0, size
+        return
+    pos = 0
+    while pos < size:
+        try:
+            start = os.lseek(fd, pos, os.SEEK_DATA)
+        except OSError as exc:
+            if exc.errno == errno.ENXIO:  # only a hole up to EOF
+                return
+            if pos == 0:
+                yield 0, size
+                return
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        yield start, end
+        pos = end
+
+
+def _transfer(in_fd: int, out_fd: int, start: int, end: int) -> None:
+    """Copy bytes [start, end) at the same offsets, in the kernel where possible."""
+
+    offset = start
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < end:
+                n = os.copy_file_range(in_fd, out_fd, end - offset, offset, offset)
+                if n == 0:
+                    return
+                offset += n
+            return
+        except OSError as exc:
+            if exc.errno not in _FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            os.lseek(out_fd, offset, os.SEEK_SET)
+            while offset < end:
+                n = os.sendfile(out_fd, in_fd, offset, min(end - offset, _CHUNK))
+                if n == 0:
+                    return
+                offset += n
+            return
+        except OSError as exc:
+            if exc.errno not in _FALLBACK_ERRNOS:
+                raise
+    while offset < end:
+        data = os.pread(in_fd, min(end - offset, _CHUNK), offset)
+        if not data:
+            return
+        os.pwrite(out_fd, data, offset)
+        offset += len(data)
+
+
+def _is_sparse(st: os.stat_result) -> bool:
+    blocks = getattr(st, "st_blocks", None)
+    return blocks is not None and blocks * 512 < st.st_size
+
+
+def _preallocate(fd: int, size: int) -> None:
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # not supported by the file system: the copy just allocates as it goes
+
+
+def kernel_copy(src: Path, target: Path) -> None:
+    """Copy `src` to `target` in the kernel, then copy its metadata like `shutil.copy2`.
+
+    A sparse source (fewer allocated blocks than its size) is copied region
+    by region so its holes stay holes; any other source is preallocated in
+    one `posix_fallocate` call so the target is not extended write by write.
+    """
+
+    with open(src, "rb") as fin, open(target, "wb") as fout:
+        in_fd, out_fd = fin.fileno(), fout.fileno()
+        st = os.fstat(in_fd)
+        size = st.st_size
+        if _is_sparse(st):
+            for start, end in _data_segments(in_fd, size):
+                _transfer(in_fd, out_fd, start, end)
+        else:
+            _preallocate(out_fd, size)
+            _transfer(in_fd, out_fd, 0, size)
+        os.ftruncate(out_fd, size)  # trailing hole
+    shutil.copystat(src, target)
+
+
+def direct_copy(src: Path, target: Path) -> None:
+    """Copy `src` with O_DIRECT reads and writes, so neither file fills the page cache.
+
+    The target is fully allocated (holes are not kept; `copy_bytes` sends
+    sparse sources to `kernel_copy`). Falls back to `kernel_copy` (and drops the source from the cache) where
+    the file system refuses O_DIRECT, e.g. tmpfs.
+    """
+
+    o_direct = getattr(os, "O_DIRECT", 0)
+    try:
+        if not o_direct:
+            raise OSError(errno.EINVAL, "O_DIRECT is not supported on this platform")
+        in_fd = os.open(src, os.O_RDONLY | o_direct)
+    except OSError as exc:
+        if exc.errno != errno.EINVAL:
+            raise
+        kernel_copy(src, target)
+        if hasattr(os, "posix_fadvise"):
+            with open(src, "rb") as fin:
+                os.posix_fadvise(fin.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        return
+    try:
+        size = os.fstat(in_fd).st_size
+        try:
+            out_fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | o_direct, 0o666)
+        except OSError as exc:
+            if exc.errno != errno.EINVAL:
+                raise
+            os.close(in_fd)
+            in_fd = -1
+            kernel_copy(src, target)
+            return
+        try:
+            _preallocate(out_fd, size)
+            with mmap.mmap(-1, _CHUNK) as buf:
+                view = memoryview(buf)
+                try:
+                    while True:
+                        n = os.readv(in_fd, [buf])
+                        if n <= 0:
+                            break
+                        # the tail is written padded to the block size and truncated below
+                        os.write(out_fd, view[:(n + _ALIGN - 1) // _ALIGN * _ALIGN])
+                        if n % _ALIGN:
+                            break
+                finally:
+                    view.release()
+            os.ftruncate(out_fd, size)
+        finally:
+            os.close(out_fd)
+    finally:
+        if in_fd >= 0:
+            os.close(in_fd)
+    shutil.copystat(src, target)
+
+
+def copy_bytes(src: Path, target: Path, strategy: str = "shutil", direct_min_bytes: int = DIRECT_MIN_BYTES) -> None:
+    """Copy `src` to `target` (data and metadata) with one of `COPY_STRATEGIES`."""
+
+    if strategy == "shutil":
+        shutil.copy2(src, target)
+    elif strategy == "kernel":
+        kernel_copy(src, target)
+    elif strategy == "direct":
+        st = os.stat(src)
+        if st.st_size >= direct_min_bytes and not _is_sparse(st):
+            direct_copy(src, target)
+        else:
+            kernel_copy(src, target)
+    else:
+        raise ValueError(f"unknown copy strategy: {strategy}")
+
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_paths(paths: Iterable[Path]) -> None:
+    """fsync individual files or directories written after `sync_tree` (best effort)."""
+
+    for path in paths:
+        try:
+            _fsync(str(path))
+        except OSError:
+            pass
+
+
+def sync_tree(root: Path, workers: int, logger: logging.Logger) -> Dict[str, object]:
+    """fsync every regular file under `root`, then every directory, in one pass.
+
+    Nothing in the pipeline flushes while it writes; one batched pass at the
+    end lets the file system write back many files at once (`workers`
+    threads overlap the waits), after which the output survives a crash of
+    the packing node. Symlinks are not followed.
+    """
+
+    start = time.perf_counter()
+    files: List[str] = []
+    dirs: List[str] = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        dirs.append(dirpath)
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                files.append(path)
+    errors = 0
+
+    def _one(path: str) -> bool:
+        try:
+            _fsync(path)
+            return True
+        except OSError as exc:
+            logger.warning("fsync %s failed: %s", path, exc)
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fsync") as pool:
+        errors += sum(1 for ok in pool.map(_one, files) if not ok)
+    for path in reversed(dirs):
+        try:
+            _fsync(path)
+        except OSError:
+            pass  # directories cannot be opened for fsync on every platform
+    stats: Dict[str, object] = {"files": len(files), "dirs": len(dirs), "errors": errors,
+                                "seconds": round(time.perf_counter() - start, 3)}
+    logger.info("fsync: %d files, %d directories in %.1fs", len(files), len(dirs), stats["seconds"])
+    return stats
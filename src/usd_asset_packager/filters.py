@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from pxr import Sdf, Usd, UsdGeom
+
+from .mdl_graph import MdlGraph
+from .prune import MDL_DERIVED, drop_orphaned_mdl_deps, file_bytes
+from .types import AssetRef
+
+
+PURPOSES = ("default", "render", "proxy", "guide")
+
+# Order in which a prim's skip reason is decided (first match wins in the tally).
+FILTER_NAMES = ("inactive", "purpose", "invisible")
+# Reasons a prim passes on to its whole subtree (purpose inheritance is left to ComputePurposeInfo).
+_SUBTREE_REASONS = ("inactive", "invisible")
+
+
+def parse_purposes(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """`render,default` -> ("render", "default"); None / empty -> None (no purpose filter)."""
+
+    if not value:
+        return None
+    purposes = tuple(p.strip() for p in value.split(",") if p.strip())
+    unknown = [p for p in purposes if p not in PURPOSES]
+    if unknown:
+        raise ValueError(f"unknown purpose(s) {', '.join(unknown)}; expected some of {', '.join(PURPOSES)}")
+    return purposes
+
+
+class PrimFilter:
+    """Per-prim skip decisions for `--skip-inactive` / `--purposes` / `--skip-invisible`.
+
+    The whole stage (instance proxies included, so prototype specs are seen
+    through every instance) is visited once in pre-order and each prim gets
+    at most one reason; inactive and invisible are inherited by the subtree,
+    purpose is decided per prim from its computed purpose. Purpose and
+    visibility only apply to imageable prims; shading prims are left to
+    `--prune-unbound-materials`, which then only counts bindings of prims
+    this filter keeps.
+    """
+
+    def __init__(self, stage: Usd.Stage, skip_inactive: bool = False,
+                 purposes: Optional[Sequence[str]] = None, skip_invisible: bool = False) -> None:
+        self.stage = stage
+        self.skip_inactive = skip_inactive
+        self.purposes = tuple(purposes) if purposes else None
+        self.skip_invisible = skip_invisible
+        self._reasons: Dict[Sdf.Path, Optional[str]] = {}
+        # (layer identifier, spec path) -> stage prims composed from that spec
+        self._spec_prims: Dict[Tuple[str, str], List[Sdf.Path]] = {}
+        self._root_stack_ids = {layer.identifier for layer in stage.GetLayerStack()}
+        if self.enabled:
+            self._visit()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.skip_inactive or self.purposes or self.skip_invisible)
+
+    def _visit(self) -> None:
+        predicate = Usd.TraverseInstanceProxies(Usd.PrimAllPrimsPredicate)
+        purpose_infos: Dict[Sdf.Path, UsdGeom.Imageable.PurposeInfo] = {}
+        invisible: Set[Sdf.Path] = set()
+        for prim in self.stage.Traverse(predicate):
+            path = prim.GetPath()
+            parent = path.GetParentPath()
+            # only inactive / invisible hide a whole subtree; purpose is decided per prim from the
+            # computed (inherited) purpose, so an authored `render` mesh under a default Xform is kept
+            reason = self._reasons.get(parent)
+            if reason not in _SUBTREE_REASONS:
+                reason = None
+            if prim.IsA(UsdGeom.Imageable):
+                imageable = UsdGeom.Imageable(prim)
+                parent_info = purpose_infos.get(parent)
+                info = (imageable.ComputePurposeInfo(parent_info) if parent_info is not None
+                        else imageable.ComputePurposeInfo())
+                purpose_infos[path] = info
+                if parent in invisible or imageable.GetVisibilityAttr().Get() == UsdGeom.Tokens.invisible:
+                    invisible.add(path)
+            else:
+                info = purpose_infos.get(parent)
+                if info is not None:
+                    purpose_infos[path] = info
+                if parent in invisible:
+                    invisible.add(path)
+            if reason is None:
+                if self.skip_inactive and not prim.IsActive():
+                    reason = "inactive"
+                elif self.purposes and self._purpose_filtered(prim, str(purpose_infos[path].purpose)
+                                                              if path in purpose_infos else None):
+                    reason = "purpose"
+                elif self.skip_invisible and prim.IsA(UsdGeom.Imageable) and path in invisible:
+                    reason = "invisible"
+            self._reasons[path] = reason
+            for spec in prim.GetPrimStack():
+                self._spec_prims.setdefault((spec.layer.identifier, spec.path.pathString), []).append(path)
+
+    def _purpose_filtered(self, prim: Usd.Prim, purpose: Optional[str]) -> bool:
+        """Whether `prim`'s computed `purpose` excludes it.
+
+        Geometry (boundable prims) is judged by its purpose; a transform
+        (Xform, ...) only when its computed purpose is not "default", so the
+        usual default `/World` keeps its render / proxy children reachable.
+        Scopes (Looks, Materials) and shading prims are never purpose-filtered.
+        """
+
+        if purpose is None or not prim.IsA(UsdGeom.Imageable) or prim.IsA(UsdGeom.Scope):
+            return False
+        if purpose in self.purposes:
+            return False
+        return prim.IsA(UsdGeom.Boundable) or purpose != UsdGeom.Tokens.default_
+
+    def skip_reason(self, prim: Usd.Prim) -> Optional[str]:
+        return self._reasons.get(prim.GetPath())
+
+    def includes(self, prim: Usd.Prim) -> bool:
+        return self.skip_reason(prim) is None
+
+    def _prims_for(self, asset: AssetRef, path: Sdf.Path) -> Optional[List[Sdf.Path]]:
+        """Stage prims a record at `path` (stage or layer namespace) belongs to, or None."""
+
+        layer_id = asset.layer_identifier
+        prims = self._spec_prims.get((layer_id, path.pathString))
+        if prims:
+            return prims
+        stage_path = path.StripAllVariantSelections()
+        if stage_path in self._reasons:
+            # stage engine: composed path; accept it when the prim is composed from that layer
+            if layer_id in self._root_stack_ids:
+                return [stage_path]
+            prim = self.stage.GetPrimAtPath(stage_path)
+            if prim and any(spec.layer.identifier == layer_id for spec in prim.GetPrimStack()):
+                return [stage_path]
+        return None
+
+    def record_reason(self, asset: AssetRef) -> Optional[str]:
+        """Skip reason of a record, or None to keep it.
+
+        The record's prim path is matched to stage prims through the prim
+        stacks, so both composed paths (stage engine) and spec paths of
+        referenced layers (sdf engine) work. Descendants of inactive prims
+        are not composed; they are matched through their nearest composed
+        ancestor. A spec shared by several prims (instancing, repeated
+        references) is skipped only when every prim using it is.
+        """
+
+        if not asset.prim_path.startswith("/"):
+            return None
+        try:
+            path = Sdf.Path(asset.prim_path)
+        except Exception:  # noqa: BLE001
+            return None
+        while path and path != Sdf.Path.absoluteRootPath:
+            prims = self._prims_for(asset, path)
+            if prims is not None:
+                reasons = [self._reasons.get(p) for p in prims]
+                return reasons[0] if all(reasons) else None
+            path = path.GetParentPath()
+        return None
+
+
+def apply_prim_filters(prim_filter: PrimFilter, asset_refs: List[AssetRef], mdl_graph: MdlGraph,
+                       logger: logging.Logger) -> Tuple[List[AssetRef], Dict[str, object]]:
+    """Drop records of skipped prims; return kept records and a per-filter tally.
+
+    MDL import / resource records follow the modules that own them (kept only
+    for the import closure of surviving MDLs, counted under the filter of the
+    first dropped owner). Bytes count files no kept record still needs.
+    """
+
+    kept: List[AssetRef] = []
+    dropped: Dict[str, List[AssetRef]] = {name: [] for name in FILTER_NAMES}
+    derived: List[AssetRef] = []
+    for asset in asset_refs:
+        if asset.prim_path in MDL_DERIVED:
+            derived.append(asset)
+            continue
+        reason = prim_filter.record_reason(asset)
+        if reason is None:
+            kept.append(asset)
+        else:
+            dropped[reason].append(asset)
+
+    enabled = [name for name in FILTER_NAMES if _filter_on(prim_filter, name)]
+    owned = {name: set(mdl_graph.closure(a.resolved_path for a in dropped[name]
+                                         if a.asset_type == "mdl" and a.resolved_path))
+             for name in enabled}
+    for asset in drop_orphaned_mdl_deps(kept, derived, mdl_graph):
+        reason = next((name for name in enabled if asset.layer_identifier in owned[name]), enabled[0])
+        dropped[reason].append(asset)
+
+    kept_files = {a.resolved_path for a in kept if a.resolved_path}
+    tally: Dict[str, Dict[str, int]] = {}
+    for name in enabled:
+        files = sorted({a.resolved_path for a in dropped[name] if a.resolved_path} - kept_files)
+        kept_files.update(files)  # a file is counted under one filter only
+        tally[name] = {"records": len(dropped[name]), "files": len(files),
+                       "bytes": sum(file_bytes(p) for p in files)}
+    logger.info("filters: skipped %s", ", ".join(f"{k}={v['records']} records/{v['bytes']} bytes"
+                                                for k, v in tally.items()) or "nothing")
+    stats: Dict[str, object] = {
+        "skip_inactive": prim_filter.skip_inactive,
+        "purposes": list(prim_filter.purposes) if prim_filter.purposes else None,
+        "skip_invisible": prim_filter.skip_invisible,
+        "skipped": tally,
+    }
+    keep_ids = {id(a) for a in kept}
+    return [a for a in asset_refs if id(a) in keep_ids], stats
+
+
+def _filter_on(prim_filter: PrimFilter, name: str) -> bool:
+    return {"inactive": prim_filter.skip_inactive, "purpose": bool(prim_filter.purposes),
+            "invisible": prim_filter.skip_invisible}[name]
+
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .resolver import is_remote, resolve_with_layer
+from .types import AssetRef
+
+
+# Records added for the external files of a glTF / GLB; `layer_identifier` is the owning glTF file.
+GLTF_DERIVED = ("(gltf_buffer)", "(gltf_image)")
+
+_GLB_MAGIC = b"glTF"
+_CHUNK_JSON = 0x4E4F534A  # "JSON"
+_HEADER = struct.Struct("<4sII")
+_CHUNK_HEADER = struct.Struct("<II")
+
+
+def read_gltf_json(path: Path) -> Dict[str, object]:
+    """JSON document of a `.gltf` file, or the JSON chunk of a `.glb`.
+
+    The file is memory-mapped and, for GLB, only the 12-byte header, the first
+    chunk header and the JSON chunk itself are touched: binary buffers (the
+    bulk of a multi-hundred-MB GLB) are never paged in.
+    """
+
+    with open(path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:4] != _GLB_MAGIC:
+                return json.loads(mm[:].decode("utf-8-sig"))
+            if len(mm) < _HEADER.size + _CHUNK_HEADER.size:
+                raise ValueError("truncated GLB header")
+            _magic, version, _length = _HEADER.unpack_from(mm, 0)
+            if version != 2:
+                raise ValueError(f"unsupported GLB version {version}")
+            chunk_length, chunk_type = _CHUNK_HEADER.unpack_from(mm, _HEADER.size)
+            if chunk_type != _CHUNK_JSON:
+                raise ValueError("first GLB chunk is not JSON")
+            start = _HEADER.size + _CHUNK_HEADER.size
+            if start + chunk_length > len(mm):
+                raise ValueError("truncated GLB JSON chunk")
+            return json.loads(mm[start:start + chunk_length].decode("utf-8"))
+
+
+def gltf_external_uris(doc: Dict[str, object]) -> List[Tuple[str, str]]:
+    """(attr name, uri) of every external `buffers[].uri` / `images[].uri`.
+
+    Embedded data URIs and GLB-internal buffers (no `uri`) are skipped; URIs
+    are percent-decoded to file paths.
+    """
+
+    out: List[Tuple[str, str]] = []
+    for key in ("buffers", "images"):
+        for idx, item in enumerate(doc.get(key) or []):
+            uri = item.get("uri") if isinstance(item, dict) else None
+            if not uri or uri.startswith("data:"):
+                continue
+            out.append((f"{key}[{idx}].uri", unquote(uri)))
+    return out
+
+
+def rewrite_gltf_uris(path: Path, replacements: Dict[str, str]) -> int:
+    """Point `buffers[].uri` / `images[].uri` of a copied `.gltf` at new relative paths.
+
+    `replacements` maps decoded URIs to new paths. The file is replaced
+    (written next to it, then renamed), never edited in place, so a target
+    that is a link to its source or to a content-store blob is not written
+    through. Returns the number of URIs changed.
+    """
+
+    doc = read_gltf_json(path)
+    changed = 0
+    for key in ("buffers", "images"):
+        for item in doc.get(key) or []:
+            uri = item.get("uri") if isinstance(item, dict) else None
+            if not uri or uri.startswith("data:"):
+                continue
+            new = replacements.get(unquote(uri))
+            if new is not None:
+                item["uri"] = quote(new, safe="/")
+                changed += 1
+    if changed:
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    return changed
+
+
+def expand_gltf_deps(asset_refs: List[AssetRef], logger: logging.Logger) -> None:
+    """Append the external buffers and images of every local glTF / GLB asset.
+
+    Each file is read once however many prims reference it. Sidecars are
+    recorded with the glTF file as `layer_identifier`, so they are copied
+    next to it and the glTF keeps resolving them without being edited,
+    unless a URI leaves out_dir (see `Packager._fix_gltf_sidecar_uris`).
+    """
+
+    seen: Dict[str, None] = {}
+    for asset in asset_refs:
+        if asset.asset_type == "glb" and asset.resolved_path and not asset.is_remote:
+            seen.setdefault(asset.resolved_path)
+    extra: List[AssetRef] = []
+    for gltf_path in seen:
+        try:
+            doc = read_gltf_json(Path(gltf_path))
+        except (OSError, ValueError) as exc:
+            logger.warning("glTF: cannot read %s: %s", gltf_path, exc)
+            continue
+        for attr_name, uri in gltf_external_uris(doc):
+            remote = is_remote(uri)
+            resolved = None if remote else resolve_with_layer(gltf_path, uri)
+            if attr_name.startswith("buffers"):
+                asset_type, prim_path = "other", "(gltf_buffer)"
+            else:
+                asset_type, prim_path = "texture", "(gltf_image)"
+            extra.append(AssetRef(
+                asset_type=asset_type,
+                original_path=uri,
+                resolved_path=resolved,
+                layer_identifier=gltf_path,
+                prim_path=prim_path,
+                attr_name=attr_name,
+                is_remote=remote,
+            ))
+    if extra:
+        asset_refs.extend(extra)
+    logger.info("glTF: added %d sidecar files from %d glTF/GLB assets", len(extra), len(seen))
+
+
+def sidecar_target(owner_target: Path, uri: str, out_dir: Path) -> Optional[Path]:
+    """Target of a glTF sidecar: its URI relative to the copied glTF, if that stays inside out_dir."""
+
+    # normpath, not resolve(): out_dir holds symlinked aliases that must not be followed
+    target = Path(os.path.normpath(owner_target.parent.absolute() / uri))
+    try:
+        target.relative_to(os.path.normpath(out_dir.absolute()))
+    except ValueError:
+        return None
+    return target
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+
+# How a planned target is produced from its source; anything but "copy" falls back to a copy when impossible.
+MATERIALIZE_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+# _IOW(0x94, 9, int): clone the whole source file into the destination (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+
+def reflink(src: Path, target: Path) -> None:
+    """Copy-on-write clone of `src` at `target` (Linux `FICLONE`); raises OSError where unsupported."""
+
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "reflink is not supported on this platform")
+    try:
+        with open(src, "rb") as fin, open(target, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        shutil.copystat(src, target)
+    except OSError:
+        if os.path.lexists(target):
+            target.unlink()
+        raise
+
+
+def link_file(src: Path, target: Path, mode: str) -> None:
+    """Materialize `target` from `src` without copying its bytes; raises OSError when `mode` is impossible.
+
+    - hardlink: same inode (source and target must share a file system);
+    - reflink: independent file sharing the source's extents until either is written;
+    - symlink: absolute symlink to the source (a "symlink farm" for local iteration).
+    """
+
+    if mode == "hardlink":
+        os.link(src, target)
+    elif mode == "reflink":
+        reflink(src, target)
+    elif mode == "symlink":
+        os.symlink(os.path.abspath(src), target)
+    else:
+        raise ValueError(f"unknown materialize mode: {mode}")
+
+
+def existing_method(src: Path, target: Path) -> str:
+    """How an existing `target` relates to `src`: "symlink", "hardlink" or "copy" (reflinks look like copies)."""
+
+    if target.is_symlink():
+        return "symlink"
+    try:
+        if os.path.samefile(src, target):
+            return "hardlink"
+    except OSError:
+        pass
+    return "copy"
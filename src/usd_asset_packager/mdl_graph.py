@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .resolver import resolve_with_layer
+from .scan_cache import ScanCache
+
+
+RESOURCE_EXTS = (".png", ".jpg", ".jpeg", ".tga", ".exr", ".hdr", ".dds", ".ktx2")
+
+# Standard / renderer built-in modules; never expected on disk next to a material.
+BUILTIN_MODULES = frozenset({"anno", "base", "debug", "df", "limits", "math", "scene", "state", "std", "tex"})
+
+_PUNCT = frozenset(";,{}()[]*=<>")
+
+
+def _read_source(path: str) -> str:
+    """Read and decode an MDL module in one read; the tokenizer needs the whole text anyway."""
+
+    return Path(path).read_bytes().decode("utf-8-sig", errors="replace")
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split MDL source into (kind, value) tokens.
+
+    Kinds: "ident", "scope" (`::`), "string", "punct". Comments are dropped and
+    string literals are kept whole, so `import` inside a comment or a string is
+    never mistaken for a statement. Numbers and other operators are skipped;
+    the dependency parser does not need them.
+    """
+
+    tokens: List[Tuple[str, str]] = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j + 1
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+        elif c == '"':
+            j = i + 1
+            buf: List[str] = []
+            while j < n and text[j] != '"':
+                if text[j] == "\\" and j + 1 < n:
+                    buf.append(text[j + 1])
+                    j += 2
+                    continue
+                buf.append(text[j])
+                j += 1
+            tokens.append(("string", "".join(buf)))
+            i = j + 1
+        elif text.startswith("::", i):
+            tokens.append(("scope", "::"))
+            i += 2
+        elif c.isalpha() or c == "_":
+            j = i + 1
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            tokens.append(("ident", text[i:j]))
+            i = j
+        elif c == ".":
+            # `.` / `..` only matter as relative module prefixes (`.::`, `..::`).
+            j = i
+            while j < n and text[j] == ".":
+                j += 1
+            tokens.append(("punct", text[i:j]))
+            i = j
+        elif c in _PUNCT:
+            tokens.append(("punct", c))
+            i += 1
+        else:
+            i += 1
+    return tokens
+
+
+def _split_statements(tokens: List[Tuple[str, str]]) -> Iterable[List[Tuple[str, str]]]:
+    """Yield `import ...;` and `using ... import ...;` statements (with `export` stripped)."""
+
+    i = 0
+    n = len(tokens)
+    at_start = True
+    while i < n:
+        kind, val = tokens[i]
+        if at_start and kind == "ident" and val == "export" and i + 1 < n and tokens[i + 1][1] in ("import", "using"):
+            i += 1
+            continue
+        if at_start and kind == "ident" and val in ("import", "using"):
+            j = i
+            while j < n and tokens[j] != ("punct", ";"):
+                j += 1
+            yield tokens[i:j]
+            i = j + 1
+            at_start = True
+            continue
+        at_start = (kind == "punct" and val in (";", "}"))
+        i += 1
+
+
+def _qualified_names(stmt: List[Tuple[str, str]]) -> List[List[str]]:
+    """Module-bearing qualified names of one statement, as component lists.
+
+    A leading "" / "." / ".." component marks absolute / current-dir / parent
+    relative names. `import a::b::*` yields `a::b`; `import a::b::c` yields
+    `a::b::c` and the caller also tries `a::b`; `using a::b import ...` yields
+    `a::b`.
+    """
+
+    head = stmt[0][1]
+    body = stmt[1:]
+    if head == "using":
+        for idx, tok in enumerate(body):
+            if tok == ("ident", "import"):
+                body = body[:idx]
+                break
+        groups = [body]
+    else:
+        groups = []
+        cur: List[Tuple[str, str]] = []
+        for tok in body:
+            if tok == ("punct", ","):
+                groups.append(cur)
+                cur = []
+            else:
+                cur.append(tok)
+        groups.append(cur)
+
+    names: List[List[str]] = []
+    for group in groups:
+        parts: List[str] = []
+        for kind, val in group:
+            if kind == "scope":
+                if not parts:
+                    parts.append("")
+            elif kind == "punct" and val in (".", "..") and not parts:
+                parts.append(val)
+            elif kind in ("ident", "string"):
+                parts.append(val)
+            elif kind == "punct" and val == "*":
+                parts.append("*")
+        if parts:
+            names.append(parts)
+    return names
+
+
+def authored_dependencies(path: str) -> Dict[str, list]:
+    """Dependency specifiers as authored in MDL module `path`, unresolved.
+
+    "imports" are qualified names as component lists (see `_qualified_names`),
+    "resources" texture-like string literals. This is what the scan cache
+    stores for a module; resolution against the file system is redone on load.
+    """
+
+    try:
+        text = _read_source(path)
+    except (OSError, ValueError):
+        return {"imports": [], "resources": []}
+    tokens = tokenize(text)
+    imports: List[List[str]] = []
+    for stmt in _split_statements(tokens):
+        for parts in _qualified_names(stmt):
+            if parts not in imports:
+                imports.append(parts)
+
+    resources: List[str] = []
+    for kind, val in tokens:
+        if kind != "string":
+            continue
+        raw = val.strip()
+        if not raw or not raw.lower().endswith(RESOURCE_EXTS):
+            continue
+        if raw.lower().startswith(("http://", "https://", "omniverse://", "mdl://")):
+            continue
+        if "::" in raw and "/" not in raw and "\\" not in raw:
+            continue
+        if raw not in resources:
+            resources.append(raw)
+    return {"imports": imports, "resources": resources}
+
+
+@dataclass
+class MdlModule:
+    """Direct dependencies of one MDL module file."""
+
+    path: str
+    imports: List[str] = field(default_factory=list)
+    unresolved_imports: List[str] = field(default_factory=list)
+    resources: List[str] = field(default_factory=list)
+
+
+class MdlGraph:
+    """Memoized MDL module dependency graph.
+
+    Each module is read and tokenized once. `import` / `using` statements are
+    resolved to module files:
+    - `.::a` / `..::a` relative to the importing module's directory;
+    - `::a::b` against `search_paths`, then (like Kit does for UE4 exports whose
+      siblings are imported absolutely) the importing module's directory.
+    Built-in modules (`::math`, `::df`, ...) are ignored; other names that do not
+    resolve are kept in `unresolved_imports` for the report. String literals with
+    texture-like suffixes are resolved as resources relative to the module.
+    """
+
+    def __init__(self, search_paths: Sequence[str] = (), cache: Optional[ScanCache] = None) -> None:
+        self.search_paths = [str(p) for p in search_paths]
+        self.cache = cache
+        self._modules: Dict[str, MdlModule] = {}
+        self._component_of: Dict[str, List[str]] = {}
+        self._component_count = -1
+
+    def _resolve_module(self, base_dir: Path, parts: List[str]) -> Optional[str]:
+        lead = parts[0]
+        names = [p for p in parts[1:] if p != "*"] if lead in ("", ".", "..") else [p for p in parts if p != "*"]
+        if not names:
+            return None
+        candidates: List[List[str]] = [names]
+        if parts[-1] != "*" and len(names) > 1:
+            # `import a::b::c` may import declaration `c` of module `a::b`.
+            candidates.append(names[:-1])
+
+        roots: List[Path]
+        if lead == ".":
+            roots = [base_dir]
+        elif lead == "..":
+            roots = [base_dir.parent]
+        else:
+            if names[0] in BUILTIN_MODULES or names[0] == "nvidia":
+                return None
+            roots = [Path(p) for p in self.search_paths] + [base_dir]
+        for cand in candidates:
+            rel = Path(*cand[:-1], f"{cand[-1]}.mdl")
+            for root in roots:
+                path = root / rel
+                if path.is_file():
+                    return str(path.resolve())
+            # Conservative legacy fallback: same-directory module named after the last component.
+            sibling = base_dir / f"{cand[-1]}.mdl"
+            if lead != ".." and sibling.is_file():
+                return str(sibling.resolve())
+        return None
+
+    def _parse(self, path: str) -> MdlModule:
+        return self._resolve(path, authored_dependencies(path))
+
+    def _resolve(self, path: str, authored: Dict[str, list]) -> MdlModule:
+        """Resolve the authored specifiers of module `path` against the current file system."""
+
+        module = MdlModule(path=path)
+        base_dir = Path(path).parent
+        for parts in authored["imports"]:
+            dep = self._resolve_module(base_dir, parts)
+            if dep:
+                if dep != path and dep not in module.imports:
+                    module.imports.append(dep)
+                continue
+            lead = parts[0]
+            first = parts[1] if lead in ("", ".", "..") and len(parts) > 1 else parts[0]
+            if first in BUILTIN_MODULES or first == "nvidia":
+                continue
+            spelled = "::".join(p for p in parts if p != "*")
+            if spelled not in module.unresolved_imports:
+                module.unresolved_imports.append(spelled)
+
+        for raw in authored["resources"]:
+            if raw.startswith("/"):
+                # MDL-absolute resource: relative to a search root, not the filesystem root.
+                resolved = next((str(Path(root) / raw.lstrip("/")) for root in [*self.search_paths, str(base_dir)]
+                                 if (Path(root) / raw.lstrip("/")).is_file()), None)
+            else:
+                resolved = resolve_with_layer(path, raw)
+            if resolved and os.path.isfile(resolved) and resolved not in module.resources:
+                module.resources.append(resolved)
+        return module
+
+    def module(self, path: str) -> MdlModule:
+        """Direct dependencies of `path` (memoized).
+
+        With a scan cache, the authored specifiers are persisted (not their
+        resolution), so an imported module or resource that appears after the
+        module was parsed is picked up without the `.mdl` file changing.
+        """
+
+        key = str(Path(path).resolve())
+        found = self._modules.get(key)
+        if found is not None:
+            return found
+        authored = self.cache.get("mdl_module", key) if self.cache is not None else None
+        if authored is None:
+            authored = authored_dependencies(key)
+            if self.cache is not None:
+                self.cache.put("mdl_module", key, authored)
+        module = self._resolve(key, authored)
+        self._modules[key] = module
+        return module
+
+    def closure(self, roots: Iterable[str]) -> List[str]:
+        """Modules reachable from `roots` (roots included), in BFS order."""
+
+        order: List[str] = []
+        seen = set()
+        queue = deque(str(Path(r).resolve()) for r in roots)
+        while queue:
+            path = queue.popleft()
+            if path in seen:
+                continue
+            seen.add(path)
+            order.append(path)
+            queue.extend(self.module(path).imports)
+        return order
+
+    def _components(self) -> Dict[str, List[str]]:
+        """Module -> members of its undirected import component, over every module parsed so far.
+
+        Union-find over all import edges; rebuilt only when new modules have
+        been parsed since the last call.
+        """
+
+        if self._component_count == len(self._modules):
+            return self._component_of
+        parent: Dict[str, str] = {}
+
+        def find(node: str) -> str:
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for path, module in list(self._modules.items()):
+            find(path)
+            for dep in module.imports:
+                a, b = find(path), find(dep)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        groups: Dict[str, List[str]] = {}
+        for node in parent:
+            groups.setdefault(find(node), []).append(node)
+        self._component_of = {node: groups[find(node)] for node in parent}
+        self._component_count = len(self._modules)
+        return self._component_of
+
+    def package_root(self, path: str) -> str:
+        """Common directory of every module connected to `path` through imports.
+
+        Connected means in the same undirected component of the import graph
+        of all modules parsed so far (importers of importers included), so
+        every module of one package maps to the same root. Copying a module
+        tree relative to this directory keeps relative imports (`.::`,
+        `..::`) between its modules valid.
+        """
+
+        key = str(Path(path).resolve())
+        self.closure([key])
+        members = self._components().get(key, [key])
+        dirs = sorted({str(Path(p).parent) for p in members})
+        try:
+            return os.path.commonpath(dirs)
+        except ValueError:
+            return str(Path(key).parent)
+
+    def to_dict(self) -> Dict[str, Dict[str, List[str]]]:
+        return {
+            path: {
+                "imports": module.imports,
+                "unresolved_imports": module.unresolved_imports,
+                "resources": module.resources,
+            }
+            for path, module in sorted(self._modules.items())
+        }
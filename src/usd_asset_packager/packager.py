@@ -2,19 +2,38 @@ from __future__ import annotations
 
 import logging
 import sys
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 import os
 import hashlib
+import time
 
-from pxr import Usd, UsdUtils
+from pxr import Sdf, Usd, UsdUtils
 
+from .archive import is_package_file, is_package_path, outer_package, split_package_path
+from .asset_index import AssetIndex, CopyKey
+from .cas import ContentStore
 from .converter import make_converter
-from .copy_utils import copy_asset
+from .dep_graph import open_dep_graph
+from .fastcopy import fsync_paths, sync_tree
+from .copy_engine import CopyJob, run_copy_jobs
+from .copy_utils import copy_asset, copy_file, is_udim_pattern, plan_target_path, plan_udim_copies
+from .filters import PrimFilter, apply_prim_filters
+from .gltf_deps import GLTF_DERIVED, expand_gltf_deps, rewrite_gltf_uris, sidecar_target
+from .mdl_graph import MdlGraph
 from .mdl import collect_mdl_search_paths, warn_unresolved_mdls
+from .prune import file_bytes, prune_unbound_materials
 from .report import write_mdl_env, write_report
+from .resolver import default_resolver
 from .rewrite import rewrite_layer_file_asset_paths, rewrite_layers
-from .scan import scan_stage
+from .scan import diff_scans, scan_stage
+from .scan_cache import DEFAULT_MAX_MB, ScanCache
+from .search_index import open_search_index
+from .sdf_scan import scan_payload_closures, scan_stage_layers
+from .usdutils_scan import scan_stage_usdutils
+from .variants import scan_unselected_variants, scan_variant_reference_closures, variant_stats
 from .types import AssetRef, CopyAction, PackReport
 
 
@@ -33,6 +52,30 @@ class Packager:
         log_level: str = "INFO",
         convert_gltf: bool = True,
         converter: str = "omni",
+        scan_backend: str = "stage",
+        scan_parity: bool = False,
+        defer_payloads: bool = False,
+        scan_jobs: int = 1,
+        scan_cache: bool = False,
+        scan_cache_dir: Optional[Path] = None,
+        scan_cache_max_mb: int = DEFAULT_MAX_MB,
+        scan_cache_hash: bool = False,
+        search_roots: Optional[List[str]] = None,
+        search_index_path: Optional[Path] = None,
+        search_index_rebuild: bool = False,
+        prims: Optional[List[str]] = None,
+        variants: str = "selected",
+        prune_unbound_materials: bool = False,
+        skip_inactive: bool = False,
+        purposes: Optional[Sequence[str]] = None,
+        skip_invisible: bool = False,
+        shard_min_mb: float = 0.0,
+        dep_graph: Optional[Path] = None,
+        copy_jobs: int = 1,
+        dedup_content: bool = False,
+        materialize: str = "copy",
+        copy_strategy: str = "shutil",
+        fsync: bool = False,
     ) -> None:
         self.input_path = input_path
         self.out_dir = out_dir
@@ -43,6 +86,31 @@ class Packager:
         self.flatten = flatten
         self.convert_gltf = convert_gltf
         self.converter = converter
+        self.scan_backend = scan_backend
+        self.scan_parity = scan_parity
+        self.defer_payloads = defer_payloads
+        self.scan_jobs = max(1, scan_jobs)
+        self.scan_cache = scan_cache
+        self.scan_cache_dir = scan_cache_dir
+        self.scan_cache_max_mb = scan_cache_max_mb
+        self.scan_cache_hash = scan_cache_hash
+        self.search_roots = list(search_roots or [])
+        self.search_index_path = search_index_path
+        self.search_index_rebuild = search_index_rebuild
+        self.prims = list(prims or [])
+        self.variants = variants
+        self.prune_unbound_materials = prune_unbound_materials
+        self.skip_inactive = skip_inactive
+        self.purposes = tuple(purposes) if purposes else None
+        self.skip_invisible = skip_invisible
+        self.shard_min_mb = shard_min_mb
+        self.dep_graph = dep_graph
+        self.copy_jobs = max(1, copy_jobs)
+        self.dedup_content = dedup_content
+        self.materialize = materialize
+        self.copy_strategy = copy_strategy
+        self.fsync = fsync
+        self.mdl_graph = MdlGraph()
         self.logger = self._setup_logging(log_level)
 
     def _setup_logging(self, level: str) -> logging.Logger:
@@ -68,14 +136,26 @@ class Packager:
             # flatten 需要完整资产树
             self.copy_usd_deps = True
 
+        if self.prims and not self.copy_usd_deps:
+            self.logger.info("--prim 输出为打平的子树 root layer，需要本地化引用，自动启用 copy_usd_deps")
+            self.copy_usd_deps = True
+
         # 通过 Usd.Stage.Open 打开场景，利用 USD resolver
-        stage = Usd.Stage.Open(str(self.input_path))
-        if not stage:
-            raise RuntimeError(f"无法打开 {self.input_path}")
+        # defer_payloads：不加载 payload（LoadNone），payload 的依赖由 Sdf 级扫描补全
+        load_set = Usd.Stage.LoadNone if self.defer_payloads else Usd.Stage.LoadAll
+        stage = self._open_stage(load_set)
 
         report = PackReport()
-
-        assets = scan_stage(stage, self.logger)
+        if self.prims:
+            report.scan["population_mask"] = [str(p) for p in stage.GetPopulationMask().GetPaths()]
+        # 解析缓存按次运行有效：源文件在同一次打包中视为不变
+        resolver = default_resolver()
+        resolver.clear()
+        # search_roots：无法相对 layer 解析的路径按最长后缀在数据集根目录索引中查找
+        resolver.search_index = open_search_index(self.search_roots, self.search_index_path,
+                                                  self.search_index_rebuild, self.logger)
+
+        assets = self._scan(stage, report)
         report.assets = assets
 
         # GLB 依赖检查：如果发现 GLB 且位于非 root layer stack，强制要求 copy_usd_deps
@@ -106,22 +186,46 @@ class Packager:
         if not self.dry_run:
             base_root = self.input_path.parent
             converter_backend = make_converter(self.converter, self.logger) if self.convert_gltf else None
+            # 同一物理文件只规划/复制一次，结果分发给其所有引用位置（供改写与报告）
+            index = AssetIndex(asset for asset in assets if self._should_copy(asset))
+            # dedup_content：内容相同的文件只存一份（out_dir/.cas/<sha256>），各目标路径为其硬链接
+            dedup = self.dedup_content
+            if dedup and self.materialize != "copy":
+                self.logger.warning("--dedup-content only applies to --materialize copy; ignored with %s",
+                                    self.materialize)
+                dedup = False
+            store = ContentStore(self.out_dir / ".cas") if dedup else None
+            copy_start = time.perf_counter()
+            try:
+                results, tile_count = self._copy_unique(index, base_root, layer_real_map, converter_backend, store)
+            finally:
+                if store is not None:
+                    store.close()
+            copy_seconds = time.perf_counter() - copy_start
             for asset in assets:
-                if asset.asset_type in ("texture", "mdl"):
-                    action = copy_asset(asset, self.out_dir, self.collision_strategy, base_root, layer_real_map,
-                                        self.logger, converter_backend, self.convert_gltf)
-                elif asset.asset_type == "glb":
-                    # glb 必须转换为 usd 才能参与 rewrite/flatten
-                    action = copy_asset(asset, self.out_dir, self.collision_strategy, base_root, layer_real_map,
-                                        self.logger, converter_backend, self.convert_gltf)
-                elif asset.asset_type == "usd" and self.copy_usd_deps:
-                    action = copy_asset(asset, self.out_dir, self.collision_strategy, base_root, layer_real_map,
-                                        self.logger, converter_backend, self.convert_gltf)
-                else:
+                action = results.get(id(asset))
+                if action is None:
                     action = CopyAction(asset=asset, target_path=None, success=False, reason="copy skipped")
                 copy_actions.append(action)
                 if action.success and action.target_path:
                     copy_targets[id(asset)] = action.target_path
+            if not self.convert_gltf:
+                self._fix_gltf_sidecar_uris(copy_actions, report)
+            report.copy = {"unique_files": len(index), "occurrences": index.occurrence_count,
+                           "udim_tiles": tile_count, "jobs": self.copy_jobs, "strategy": self.copy_strategy,
+                           "seconds": round(copy_seconds, 3)}
+            self.logger.info("copy: %d unique files for %d asset occurrences in %.1fs (jobs=%d)", len(index),
+                             index.occurrence_count, copy_seconds, self.copy_jobs)
+            methods = Counter(results[id(entry.primary)].method or "failed" for entry in index
+                              if id(entry.primary) in results)
+            report.copy["materialize"] = {"mode": self.materialize, "methods": dict(sorted(methods.items()))}
+            if self.materialize != "copy":
+                self.logger.info("materialize %s: %s", self.materialize,
+                                 ", ".join(f"{name}={count}" for name, count in sorted(methods.items())))
+            if store is not None:
+                report.copy["dedup"] = store.stats()
+                self.logger.info("content store: %d blobs (%d bytes), %d duplicate files (%d bytes) deduplicated",
+                                 store.blobs, store.stored_bytes, store.deduplicated, store.deduplicated_bytes)
             report.copies = copy_actions
         else:
             self.logger.info("dry-run 模式：不复制文件、不改写 USD")
@@ -138,7 +242,7 @@ class Packager:
             return hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
 
         for layer in stage.GetLayerStack():
-            if not layer.realPath:
+            if not layer.realPath or is_package_path(layer.realPath):
                 continue
             try:
                 rel = Path(layer.realPath).resolve().relative_to(base_root.resolve())
@@ -175,18 +279,19 @@ class Packager:
                 if cp.asset.original_path and cp.asset.original_path.startswith("/"):
                     usd_layer_out[cp.asset.original_path] = Path(cp.target_path)
 
+            assets_by_layer: Dict[str, List[AssetRef]] = {}
+            for asset in assets:
+                if id(asset) in copy_targets:
+                    assets_by_layer.setdefault(asset.layer_identifier, []).append(asset)
+
             # 对每个 copied USD layer，按该 layer 中扫描到的引用构建 replacements，然后用 UsdUtils 修改该文件
             extra_rewrites = 0
             for src_layer_id, out_layer_path in usd_layer_out.items():
-                # 仅处理存在于输出的 USD 文件
-                if not out_layer_path.exists():
+                # 仅处理存在于输出的 USD 文件；usdz 等包内 layer 不做改写
+                if not out_layer_path.exists() or is_package_file(str(out_layer_path)):
                     continue
                 replacements: Dict[str, str] = {}
-                for asset in assets:
-                    if asset.layer_identifier != src_layer_id:
-                        continue
-                    if id(asset) not in copy_targets:
-                        continue
+                for asset in assets_by_layer.get(src_layer_id, []):
                     target_abs = copy_targets[id(asset)]
                     rel_path = os.path.relpath(target_abs, start=out_layer_path.parent)
                     # 多个位置可能引用同一路径；保持第一次映射即可
@@ -202,6 +307,10 @@ class Packager:
             if extra_rewrites:
                 report.warnings.append(f"rewrote asset paths in copied USD deps: {extra_rewrites}")
 
+        # --prim：输出 root 为打平后的子树（仅包含 mask 内 prim 的意见）
+        if not self.dry_run and self.prims:
+            self._export_masked_root(stage, layer_new_path, load_set, report)
+
         # flatten 层级：将改写后的 root 打平成单一 layer（纹理仍为外部相对路径）
         if not self.dry_run and self.flatten != "none":
             root_layer_path = layer_new_path.get(stage.GetRootLayer().identifier)
@@ -224,10 +333,251 @@ class Packager:
         if not self.dry_run:
             write_mdl_env(report.mdl_paths, self.out_dir)
 
+        report.resolver = resolver.stats()
+        self.logger.info("resolver: %s", report.resolver)
+        if resolver.search_index is not None:
+            resolver.search_index.close()
+            resolver.search_index = None
+        if not self.dry_run and self.fsync:
+            # 一次批量 fsync 输出目录；report.json 随后单独 fsync
+            report.copy["fsync"] = sync_tree(self.out_dir, self.copy_jobs, self.logger)
         write_report(report, self.out_dir)
+        if not self.dry_run and self.fsync:
+            fsync_paths([self.out_dir / "report.json", self.out_dir])
         self.logger.info("packaging finished; report at %s", self.out_dir / "report.json")
         return report
 
+    def _open_stage(self, load_set) -> Usd.Stage:
+        """Open the input, restricted to the `--prim` subtrees when given.
+
+        The population mask is expanded along relationships and attribute
+        connections, so bound materials (`material:binding`) and their shader
+        networks are packed with the subtrees that use them.
+        """
+
+        if not self.prims:
+            stage = Usd.Stage.Open(str(self.input_path), load_set)
+            if not stage:
+                raise RuntimeError(f"无法打开 {self.input_path}")
+            return stage
+        mask = Usd.StagePopulationMask()
+        for prim_path in self.prims:
+            mask.Add(Sdf.Path(prim_path))
+        stage = Usd.Stage.OpenMasked(str(self.input_path), mask, load_set)
+        if not stage:
+            raise RuntimeError(f"无法打开 {self.input_path}")
+        stage.ExpandPopulationMask()
+        for prim_path in self.prims:
+            if not stage.GetPrimAtPath(prim_path):
+                self.logger.warning("--prim %s not found in %s", prim_path, self.input_path)
+        self.logger.info("population mask: %s", stage.GetPopulationMask())
+        return stage
+
+    def _export_masked_root(self, stage: Usd.Stage, layer_new_path: Dict[str, Path], load_set,
+                            report: PackReport) -> None:
+        """Replace the exported root layer stack by the flattened masked stage.
+
+        `Usd.Stage.Flatten` anchors every asset path to an absolute path; the
+        ones pointing into out_dir are made relative to the new root again so
+        the output stays relocatable.
+        """
+
+        root_id = stage.GetRootLayer().identifier
+        root_path = layer_new_path.get(root_id)
+        if not root_path or not root_path.exists():
+            self.logger.warning("无法定位 root layer 以导出 --prim 子树")
+            return
+        packaged = Usd.Stage.OpenMasked(str(root_path), stage.GetPopulationMask(), load_set)
+        flat = packaged.Flatten()
+        out_root = str(self.out_dir.resolve())
+
+        def _relativize(asset_path: str) -> str:
+            if os.path.isabs(asset_path):
+                real = os.path.realpath(asset_path)
+                if real == out_root or real.startswith(out_root + os.sep):
+                    return os.path.relpath(asset_path, start=root_path.parent)
+            return asset_path
+
+        UsdUtils.ModifyAssetPaths(flat, _relativize)
+        flat.Export(str(root_path))
+        # Sublayers are flattened into the root; their exports would only carry unmasked opinions.
+        for layer_id, path in layer_new_path.items():
+            if layer_id != root_id and path.exists():
+                path.unlink()
+        report.scan["masked_root"] = str(root_path)
+        self.logger.info("exported masked subtree root -> %s", root_path)
+
+    def _copy_unique(self, index: AssetIndex, base_root: Path, layer_real_map: Dict[str, str],
+                     converter_backend, store: Optional[ContentStore] = None) -> Tuple[Dict[int, CopyAction], int]:
+        """Copy each index entry once and return per-occurrence actions keyed by id(asset).
+
+        Targets are planned on this thread; the copies themselves (UDIM patterns
+        expanded into one job per tile) run on `copy_jobs` threads, largest
+        file first (`copy_engine.run_copy_jobs`), each materialized as
+        `materialize` asks. glTF conversions stay on this thread. Returns the
+        actions and the number of distinct tiles.
+        """
+
+        actions: Dict[CopyKey, CopyAction] = {}
+        jobs: List[CopyJob] = []
+        conversions: List[Tuple[CopyKey, AssetRef, Optional[Path]]] = []
+        tile_jobs: Dict[Path, Tuple[CopyKey, Path]] = {}
+        for entry in index:
+            primary = entry.primary
+            if is_udim_pattern(primary) and primary.resolved_path and not primary.is_remote:
+                target, tiles = plan_udim_copies(primary, self.out_dir, self.collision_strategy, base_root,
+                                                 self.mdl_graph)
+                if not tiles:
+                    actions[entry.key] = CopyAction(asset=primary, target_path=str(target), success=False,
+                                                    reason=f"UDIM tiles not found under {Path(primary.resolved_path).parent}")
+                    continue
+                actions[entry.key] = CopyAction(asset=primary, target_path=str(target), success=True,
+                                                reason="udim copied")
+                for tile_src, tile_target in tiles:
+                    tile_jobs.setdefault(tile_target, (entry.key, tile_src))
+                continue
+            target = None
+            if not primary.is_remote and (primary.resolved_path or primary.layer_identifier in layer_real_map):
+                target = plan_target_path(primary, self.out_dir, self.collision_strategy, base_root,
+                                          self.mdl_graph, self.convert_gltf)
+            if primary.asset_type == "glb" and self.convert_gltf:
+                conversions.append((entry.key, primary, target))
+                continue
+            jobs.append(CopyJob(entry.key, str(target), file_bytes(primary.resolved_path),
+                                partial(copy_asset, primary, self.out_dir, self.collision_strategy, base_root,
+                                        layer_real_map, self.logger, converter_backend, self.convert_gltf,
+                                        self.mdl_graph, target, store, self.materialize,
+                                        self.copy_strategy)))
+        entry_jobs = len(jobs)
+        for tile_target, (key, tile_src) in tile_jobs.items():
+            jobs.append(CopyJob(("tile", str(tile_target)), str(tile_target), file_bytes(str(tile_src)),
+                                partial(copy_file, tile_src, tile_target, self.logger, store, self.materialize,
+                                        self.copy_strategy)))
+
+        results_by_key = run_copy_jobs(jobs, self.copy_jobs, self.logger)
+        for job in jobs[:entry_jobs]:
+            actions[job.key] = results_by_key[job.key]
+        for key, primary, target in conversions:
+            actions[key] = copy_asset(primary, self.out_dir, self.collision_strategy, base_root, layer_real_map,
+                                      self.logger, converter_backend, self.convert_gltf, self.mdl_graph, target)
+        tile_methods: Dict[CopyKey, set] = {}
+        for tile_target, (key, tile_src) in tile_jobs.items():
+            ok, reason, method = results_by_key[("tile", str(tile_target))]
+            tile_methods.setdefault(key, set()).add(method)
+            if not ok and actions[key].success:
+                action = actions[key]
+                actions[key] = CopyAction(asset=action.asset, target_path=action.target_path, success=False,
+                                          reason=f"UDIM tile {tile_src.name}: {reason}")
+        for key, methods in tile_methods.items():
+            if actions[key].success:
+                actions[key].method = ",".join(sorted(methods))
+
+        results: Dict[int, CopyAction] = {}
+        for entry in index:
+            for occ_action in index.fan_out(entry, actions[entry.key]):
+                results[id(occ_action.asset)] = occ_action
+        return results, len(tile_jobs)
+
+    def _should_copy(self, asset: AssetRef) -> bool:
+        if asset.resolved_path and is_package_path(asset.resolved_path):
+            # 包内 layer 引用同一包的成员：随包整体复制，包内路径保持有效（也无法改写）
+            if outer_package(asset.layer_identifier) == split_package_path(asset.resolved_path)[0]:
+                return False
+        # glb 必须转换为 usd 才能参与 rewrite/flatten
+        if asset.asset_type in ("texture", "mdl", "glb"):
+            return True
+        if asset.prim_path in GLTF_DERIVED:
+            return True
+        return asset.asset_type == "usd" and self.copy_usd_deps
+
+    def _scan(self, stage: Usd.Stage, report: PackReport) -> List[AssetRef]:
+        """按 scan_backend 选择扫描引擎；scan_parity 时额外运行 stage 引擎并把差异写入报告。"""
+
+        cache = None
+        if self.dep_graph:
+            # crawl 生成的数据集依赖图与扫描缓存同构，这里只作为扫描缓存使用（stage 照常打开与组合）：
+            # layer/MDL 的依赖直接读图，变化或缺失的文件增量补入
+            if self.scan_cache:
+                self.logger.info("--dep-graph replaces --scan-cache as the scan cache")
+            if self.scan_backend != "sdf":
+                self.logger.info("--dep-graph serves per-layer records to the sdf backend only; "
+                                 "the %s backend uses it for MDL modules", self.scan_backend)
+            cache = open_dep_graph(self.dep_graph, logger=self.logger)
+        elif self.scan_cache:
+            cache = ScanCache.open_default(self.scan_cache_dir, self.scan_cache_max_mb, self.scan_cache_hash,
+                                           self.logger)
+        self.mdl_graph = MdlGraph(cache=cache)
+        if self.prims and self.scan_backend == "usdutils":
+            # ComputeAllDependencies walks the files, not the masked stage.
+            self.logger.info("--prim: usdutils backend cannot honour the population mask; using the sdf backend")
+            self.scan_backend = "sdf"
+        try:
+            if self.scan_backend == "sdf":
+                shard_stats: Dict[str, object] = {}
+                assets = scan_stage_layers(stage, self.logger, jobs=self.scan_jobs, cache=cache,
+                                           mdl_graph=self.mdl_graph, variants=self.variants,
+                                           shard_min_bytes=int(self.shard_min_mb * 1024 * 1024),
+                                           shard_stats=shard_stats)
+                if shard_stats:
+                    report.scan["shards"] = shard_stats
+            elif self.scan_backend == "usdutils":
+                assets = scan_stage_usdutils(stage, self.logger, cache=cache, mdl_graph=self.mdl_graph)
+            else:
+                assets = scan_stage(stage, self.logger, cache=cache, mdl_graph=self.mdl_graph)
+            if self.scan_jobs > 1 and self.scan_backend != "sdf" and not self.defer_payloads:
+                self.logger.info("--scan-jobs only applies to the sdf backend and payload closures; scanning serially")
+            if self.shard_min_mb and (self.scan_backend != "sdf" or self.scan_jobs <= 1):
+                self.logger.info("--shard-min-mb only applies to the sdf backend with --scan-jobs > 1")
+            report.scan["backend"] = self.scan_backend
+            report.scan["jobs"] = self.scan_jobs
+            if self.variants == "all":
+                # 未选中的 variant：在 Sdf 级枚举 variant spec，不为每个选择重新组合 stage
+                if self.scan_backend == "stage":
+                    scan_unselected_variants(stage, assets, self.logger, cache=cache, mdl_graph=self.mdl_graph)
+                scan_variant_reference_closures(stage, assets, self.logger, jobs=self.scan_jobs, cache=cache,
+                                                mdl_graph=self.mdl_graph)
+            elif self.scan_backend == "usdutils":
+                self.logger.info("--variants selected: usdutils backend extracts every variant's paths; packing all")
+            report.scan["variants"] = variant_stats(stage, assets, self.variants)
+            if self.defer_payloads:
+                scan_payload_closures(stage, assets, self.logger, jobs=self.scan_jobs, cache=cache,
+                                      mdl_graph=self.mdl_graph)
+                report.scan["defer_payloads"] = True
+        finally:
+            if cache is not None:
+                # The graph outlives the scan (copy planning uses it); stop persisting to a closed cache.
+                self.mdl_graph.cache = None
+                cache.close()
+                report.scan["cache"] = cache.stats()
+                self.logger.info("scan cache: hits=%s misses=%s evictions=%d",
+                                 dict(cache.hits), dict(cache.misses), cache.evictions)
+        prim_filter = PrimFilter(stage, self.skip_inactive, self.purposes, self.skip_invisible)
+        if prim_filter.enabled:
+            assets, report.scan["filters"] = apply_prim_filters(prim_filter, assets, self.mdl_graph, self.logger)
+        if self.prune_unbound_materials:
+            assets, report.scan["prune"] = prune_unbound_materials(
+                stage, assets, self.mdl_graph, self.logger,
+                prim_filter=prim_filter.includes if prim_filter.enabled else None)
+        if not self.convert_gltf:
+            # 不转换时原样复制 glTF/GLB，其外部 buffer/image 一并复制
+            expand_gltf_deps(assets, self.logger)
+        report.mdl_graph = self.mdl_graph.to_dict()
+
+        if self.scan_parity:
+            if self.scan_backend == "stage":
+                self.logger.info("scan parity skipped: backend is already the stage reference")
+            else:
+                reference = scan_stage(stage, self.logger)
+                parity = diff_scans(assets, reference)
+                parity["reference"] = "stage"
+                report.scan["parity"] = parity
+                self.logger.info(
+                    "scan parity (%s vs stage): matched=%d only_in_backend=%d only_in_reference=%d",
+                    self.scan_backend, parity["matched"], len(parity["only_in_backend"]),
+                    len(parity["only_in_reference"]),
+                )
+        return assets
+
     def _ensure_mdl_dir_texture_aliases(self, copy_actions: List[CopyAction]) -> None:
         """Ensure each copied MDL directory has a `Textures` alias.
 
@@ -267,6 +617,40 @@ class Packager:
             except Exception as exc:  # noqa: BLE001
                 self.logger.debug("failed to create MDL Textures alias %s -> %s: %s", link, candidate, exc)
 
+    def _fix_gltf_sidecar_uris(self, copy_actions: List[CopyAction], report: PackReport) -> None:
+        """Repoint copied glTF files at sidecars whose URI left out_dir.
+
+        Such sidecars are copied next to their glTF (`plan_target_path`); a
+        `.gltf` gets the new relative URI written into its copy, a `.glb`
+        cannot be edited, so those sidecar copies are marked failed and warned
+        about.
+        """
+
+        owners = {cp.asset.resolved_path: cp.target_path for cp in copy_actions
+                  if cp.asset.asset_type == "glb" and cp.success and cp.target_path and cp.asset.resolved_path}
+        replacements: Dict[str, Dict[str, str]] = {}
+        for cp in copy_actions:
+            if cp.asset.prim_path not in GLTF_DERIVED or not cp.success or not cp.target_path:
+                continue
+            owner_target = owners.get(cp.asset.layer_identifier)
+            if owner_target is None or sidecar_target(Path(owner_target), cp.asset.original_path, self.out_dir):
+                continue
+            if owner_target.lower().endswith(".gltf"):
+                rel = os.path.relpath(cp.target_path, Path(owner_target).parent).replace(os.sep, "/")
+                replacements.setdefault(owner_target, {})[cp.asset.original_path] = rel
+                continue
+            cp.success = False
+            cp.reason = f"URI {cp.asset.original_path} leaves out_dir and GLB {owner_target} cannot be rewritten"
+            self.logger.warning("glTF: %s", cp.reason)
+            report.warnings.append(f"glTF sidecar not reachable from packed GLB: {cp.reason}")
+        for owner_target, mapping in replacements.items():
+            try:
+                changed = rewrite_gltf_uris(Path(owner_target), mapping)
+                self.logger.info("glTF: rewrote %d sidecar URI(s) in %s", changed, owner_target)
+            except (OSError, ValueError) as exc:
+                self.logger.warning("glTF: cannot rewrite %s: %s", owner_target, exc)
+                report.warnings.append(f"glTF sidecar URIs not rewritten in {owner_target}: {exc}")
+
     def _ensure_output_aliases(self) -> None:
         """Ensure common case/structure aliases exist in output.
 
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Optional, Set
+
+
+# Tokens without which a crate file cannot hold a record the scanners produce:
+# asset-typed attributes (typeName), references / payloads, sublayers and value clips.
+ASSET_TOKENS = frozenset({b"asset", b"asset[]", b"references", b"payload", b"subLayers", b"clips"})
+
+# Value-clip templates (`clips = { ... string templateAssetPath = "./clip.###.usd" }`)
+# are plain strings, not `@`-delimited asset paths, so text layers look for these too.
+TEXT_TOKENS = (b"@", b"clips")
+
+_CRATE_MAGIC = b"PXR-USDC"
+_USDA_MAGIC = b"#usda"
+_BOOTSTRAP = struct.Struct("<8s8Bq")
+_SECTION = struct.Struct("<16sqq")
+_U64 = struct.Struct("<Q")
+_I32 = struct.Struct("<i")
+
+
+def _lz4_block(src: memoryview, out_size: int) -> bytes:
+    """Decode one raw LZ4 block (the format `TfFastCompression` writes)."""
+
+    out = bytearray()
+    i, n = 0, len(src)
+    while i < n:
+        token = src[i]
+        i += 1
+        lit = token >> 4
+        if lit == 15:
+            while True:
+                b = src[i]
+                i += 1
+                lit += b
+                if b != 255:
+                    break
+        out += src[i:i + lit]
+        i += lit
+        if i >= n:
+            break
+        offset = src[i] | (src[i + 1] << 8)
+        i += 2
+        match = token & 15
+        if match == 15:
+            while True:
+                b = src[i]
+                i += 1
+                match += b
+                if b != 255:
+                    break
+        match += 4
+        start = len(out) - offset
+        if start < 0 or offset == 0:
+            raise ValueError("corrupt LZ4 block")
+        if offset >= match:
+            out += out[start:start + match]
+        else:
+            # overlapping match: the last `offset` bytes repeat
+            pattern = bytes(out[start:])
+            out += (pattern * (match // offset + 1))[:match]
+        if len(out) > out_size:
+            raise ValueError("LZ4 block larger than expected")
+    return bytes(out)
+
+
+def _fast_decompress(src: memoryview, out_size: int) -> bytes:
+    """Inverse of `TfFastCompression::CompressToBuffer`: a chunk count byte, then LZ4 block(s)."""
+
+    chunks = src[0]
+    if chunks == 0:
+        return _lz4_block(src[1:], out_size)
+    out = bytearray()
+    i = 1
+    for _ in range(chunks):
+        (size,) = _I32.unpack_from(src, i)
+        i += _I32.size
+        out += _lz4_block(src[i:i + size], out_size - len(out))
+        i += size
+    return bytes(out)
+
+
+def crate_tokens(mm: mmap.mmap) -> Optional[Set[bytes]]:
+    """Token table of a crate (`.usdc`) file, read from its TOKENS section only.
+
+    Only the bootstrap header, the table of contents and the TOKENS section
+    are touched; no spec, path or value data is read. Returns None when the
+    file is not a crate or its layout is not understood.
+    """
+
+    if len(mm) < _BOOTSTRAP.size or mm[:8] != _CRATE_MAGIC:
+        return None
+    _magic, major, minor, _patch, *_rest, toc = _BOOTSTRAP.unpack_from(mm, 0)
+    if not 0 < toc < len(mm):
+        return None
+    (count,) = _U64.unpack_from(mm, toc)
+    section = None
+    for idx in range(count):
+        name, start, size = _SECTION.unpack_from(mm, toc + _U64.size + idx * _SECTION.size)
+        if name.rstrip(b"\0") == b"TOKENS":
+            section = (start, size)
+            break
+    if section is None or section[0] + section[1] > len(mm):
+        return None
+    start, size = section
+    with memoryview(mm) as view:
+        data = view[start:start + size]
+        (num_tokens,) = _U64.unpack_from(data, 0)
+        if (major, minor) < (0, 4):
+            (raw_size,) = _U64.unpack_from(data, 8)
+            blob = bytes(data[16:16 + raw_size])
+        else:
+            raw_size, comp_size = _U64.unpack_from(data, 8)[0], _U64.unpack_from(data, 16)[0]
+            blob = _fast_decompress(data[24:24 + comp_size], raw_size)
+        del data
+    tokens = blob.split(b"\0")
+    if len(tokens) < num_tokens:
+        return None
+    return set(tokens[:num_tokens])
+
+
+def may_have_asset_paths(path: str, dictionaries: bool = False) -> bool:
+    """False only when `path` provably authors no asset path the sdf scan would record.
+
+    Covers the record kinds of `sdf_scan.scan_layer`: asset-typed attribute
+    values (defaults and time samples), references, payloads, sublayers and
+    value clips. Asset paths held only in dictionary metadata (`assetInfo`,
+    `customData`) are not looked for in crate files (the usdutils backend does
+    see them), so this is only meant to skip opening layers in the sdf scan,
+    never to skip a rewrite. With `dictionaries=True` dictionary metadata is
+    covered too: only text layers can then be proven free, since every asset
+    value of a `.usda` file is `@`-delimited wherever it is authored.
+
+    - `.usda` (text): every asset path is `@`-delimited and clip templates sit
+      in a `clips` dictionary, so a layer with neither an `@` nor `clips`
+      (`TEXT_TOKENS`) has none; the file is memory-mapped and searched, not
+      parsed.
+    - `.usdc` (crate): asset values, references, payloads, sublayers and clips
+      all need one of `ASSET_TOKENS` in the token table.
+    - `.usd` is sniffed by its magic; anything else (`.usdz`, unknown formats,
+      unreadable or malformed files) is assumed to have asset paths.
+    """
+
+    lower = path.lower()
+    if not lower.endswith((".usd", ".usda", ".usdc")):
+        return True
+    try:
+        with open(path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                head = mm[:8]
+                if head.startswith(_USDA_MAGIC):
+                    return any(mm.find(token) >= 0 for token in TEXT_TOKENS)
+                if head == _CRATE_MAGIC:
+                    if dictionaries:
+                        return True
+                    tokens = crate_tokens(mm)
+                    return tokens is None or not tokens.isdisjoint(ASSET_TOKENS)
+    except (OSError, ValueError, IndexError, struct.error):
+        return True
+    return True
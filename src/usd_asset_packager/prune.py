@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pxr import Sdf, Usd, UsdGeom, UsdShade
+
+from .archive import default_archives, is_package_path
+from .mdl_graph import MdlGraph
+from .types import AssetRef
+
+
+MATERIAL_PURPOSES = (UsdShade.Tokens.allPurpose, UsdShade.Tokens.full, UsdShade.Tokens.preview)
+
+# Records added by MDL expansion; kept or dropped with the modules that own them.
+MDL_DERIVED = ("(mdl_import)", "(mdl_resource)")
+
+
+def bound_materials(stage: Usd.Stage, prim_filter: Optional[Callable[[Usd.Prim], bool]] = None) -> Set[Sdf.Path]:
+    """Paths of the materials bound to any gprim / geom subset, for every material purpose.
+
+    Bindings are resolved in bulk with `ComputeBoundMaterials`, which shares
+    the binding-relationship and collection caches across all prims. With
+    `prim_filter`, only bindings of prims it accepts count.
+    """
+
+    prims = [p for p in stage.Traverse(Usd.TraverseInstanceProxies())
+             if (p.IsA(UsdGeom.Gprim) or p.IsA(UsdGeom.Subset)) and (prim_filter is None or prim_filter(p))]
+    found: Set[Sdf.Path] = set()
+    if not prims:
+        return found
+    for purpose in MATERIAL_PURPOSES:
+        materials, _rels = UsdShade.MaterialBindingAPI.ComputeBoundMaterials(prims, purpose)
+        for material in materials:
+            prim = material.GetPrim()
+            if prim:
+                found.add(prim.GetPath())
+    return found
+
+
+def reachable_shading_prims(stage: Usd.Stage, roots: Set[Sdf.Path]) -> Set[Sdf.Path]:
+    """Prims of the shading networks of `roots`.
+
+    Every prim under a root is included, and connection sources of inputs and
+    outputs are followed, so node graphs and shaders living outside the bound
+    material (shared graphs) are reached as well.
+    """
+
+    reachable: Set[Sdf.Path] = set()
+    queue = deque(roots)
+    while queue:
+        path = queue.popleft()
+        if path in reachable:
+            continue
+        prim = stage.GetPrimAtPath(path)
+        if not prim:
+            continue
+        for sub in Usd.PrimRange(prim):
+            sub_path = sub.GetPath()
+            if sub_path != path and sub_path in reachable:
+                continue
+            reachable.add(sub_path)
+            connectable = UsdShade.ConnectableAPI(sub)
+            for port in [*connectable.GetInputs(), *connectable.GetOutputs()]:
+                sources, _invalid = port.GetConnectedSources()
+                for source in sources:
+                    source_path = source.source.GetPrim().GetPath()
+                    if source_path not in reachable:
+                        queue.append(source_path)
+    return reachable
+
+
+def _shading_owner(stage: Usd.Stage, path: Sdf.Path) -> Optional[Sdf.Path]:
+    """Nearest Material / NodeGraph / Shader prim at or above `path`, if any."""
+
+    prim = stage.GetPrimAtPath(path)
+    while prim and prim.GetPath() != Sdf.Path.absoluteRootPath:
+        if prim.IsA(UsdShade.Material) or prim.IsA(UsdShade.NodeGraph) or prim.IsA(UsdShade.Shader):
+            return prim.GetPath()
+        prim = prim.GetParent()
+    return None
+
+
+def _record_prim_path(asset: AssetRef) -> Optional[Sdf.Path]:
+    if not asset.prim_path.startswith("/"):
+        return None
+    try:
+        return Sdf.Path(asset.prim_path).StripAllVariantSelections()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def file_bytes(path: Optional[str]) -> int:
+    if not path:
+        return 0
+    if is_package_path(path):
+        return default_archives().member_size(path) or 0
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def drop_orphaned_mdl_deps(kept: List[AssetRef], derived: List[AssetRef], mdl_graph: MdlGraph) -> List[AssetRef]:
+    """Move MDL import / resource records still needed by a kept MDL into `kept`; return the rest.
+
+    A derived record is needed when its owning module is in the import
+    closure of the MDL records in `kept`.
+    """
+
+    roots = {str(Path(a.resolved_path).resolve()) for a in kept if a.asset_type == "mdl" and a.resolved_path}
+    modules = set(mdl_graph.closure(sorted(roots))) if roots else set()
+    orphaned: List[AssetRef] = []
+    for asset in derived:
+        (kept if asset.layer_identifier in modules else orphaned).append(asset)
+    return orphaned
+
+
+def prune_unbound_materials(stage: Usd.Stage, asset_refs: List[AssetRef], mdl_graph: MdlGraph,
+                            logger: logging.Logger,
+                            prim_filter: Optional[Callable[[Usd.Prim], bool]] = None,
+                            ) -> Tuple[List[AssetRef], Dict[str, object]]:
+    """Drop textures / MDLs reachable only from materials nothing is bound to.
+
+    A record is pruned when its prim belongs to a shading network (a Material,
+    NodeGraph or Shader prim or a descendant) that is not reachable from any
+    bound material. MDL import / resource records are then kept only for the
+    modules in the import closure of the surviving MDLs. Records whose prim is
+    not a stage prim (referenced-layer spec paths, layer-level records) are
+    kept. `prim_filter` restricts which prims' bindings count (see
+    `filters.PrimFilter`). Returns the kept records and statistics for the
+    report; pruned bytes count files no kept record still needs.
+    """
+
+    bound = bound_materials(stage, prim_filter)
+    reachable = reachable_shading_prims(stage, bound)
+    owners: Dict[Sdf.Path, Optional[Sdf.Path]] = {}
+
+    kept: List[AssetRef] = []
+    dropped: List[AssetRef] = []
+    derived: List[AssetRef] = []
+    for asset in asset_refs:
+        if asset.prim_path in MDL_DERIVED:
+            derived.append(asset)
+            continue
+        path = _record_prim_path(asset)
+        if path is None or asset.asset_type not in ("texture", "mdl"):
+            kept.append(asset)
+            continue
+        if path not in owners:
+            owners[path] = _shading_owner(stage, path)
+        owner = owners[path]
+        if owner is None or owner in reachable:
+            kept.append(asset)
+        else:
+            dropped.append(asset)
+
+    dropped.extend(drop_orphaned_mdl_deps(kept, derived, mdl_graph))
+
+    kept_files = {a.resolved_path for a in kept if a.resolved_path}
+    pruned_files = sorted({a.resolved_path for a in dropped if a.resolved_path} - kept_files)
+    stats = {
+        "bound_materials": sorted(str(p) for p in bound),
+        "pruned_records": len(dropped),
+        "pruned_files": len(pruned_files),
+        "pruned_bytes": sum(file_bytes(p) for p in pruned_files),
+    }
+    logger.info("prune: %d bound materials; dropped %d records / %d files (%d bytes) of unbound materials",
+                len(bound), len(dropped), len(pruned_files), stats["pruned_bytes"])
+    keep_ids = {id(a) for a in kept}
+    return [a for a in asset_refs if id(a) in keep_ids], stats
@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from .types import PackReport
 
@@ -21,6 +21,15 @@ def write_report(report: PackReport, out_dir: Path) -> Path:
     return path
 
 
+def write_composition_profile(profile: Dict[str, object], out_dir: Path) -> Path:
+    """写出 `profile-composition` 的结果（与 report.json 同目录）。"""
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / "composition_profile.json"
+    path.write_text(json.dumps(profile, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
 def write_mdl_env(mdl_paths: List[str], out_dir: Path) -> Path:
     env_dir = out_dir / "env"
     env_dir.mkdir(parents=True, exist_ok=True)
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
 import os
+import posixpath
 import re
+import threading
+from collections import Counter, OrderedDict
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .archive import default_archives, is_package_file, is_package_path, split_package_path
+
+if TYPE_CHECKING:
+    from .search_index import SearchIndex
 
 REMOTE_PREFIXES = ("omniverse://", "http://", "https://", "s3://")
 UDIM_TOKEN = "<UDIM>"
 UDIM_RE = re.compile(r"1\d{3}")
+# A tile number inside a file name: 1001-1999, not part of a longer digit run.
+_UDIM_TILE_RE = re.compile(r"(?<!\d)(1(?!000)\d{3})(?!\d)")
 
 
 def is_remote(path: str) -> bool:
@@ -18,18 +28,141 @@ def is_udim_path(path: str) -> bool:
     return UDIM_TOKEN in path or bool(UDIM_RE.search(Path(path).name))
 
 
-def resolve_with_layer(layer_path: str, asset_path: str) -> Optional[str]:
-    """将 USD 中的 asset path 解析为本地绝对路径。
+class Resolver:
+    """Memoized local resolution of authored asset paths.
 
-    - 以 layer 所在目录为基准处理相对路径。
-    - 远程路径直接返回 None，交由上层处理。
+    Shared by scan and copy so repeated lookups (thousands of `./Textures/...`
+    from the same few folders) touch the filesystem once:
+    - results are memoized per (base_dir, asset_path), misses included
+      (negative cache);
+    - the case-insensitive fallback reads each directory once and keeps a
+      case-folded name -> real name map of it.
+    Both caches are LRU-bounded. Sources are assumed not to change during a
+    run; call `clear()` between runs in the same process.
+
+    With a `search_index` (`--search-root`), paths that do not resolve next to
+    their layer fall back to a longest-suffix match over the indexed roots.
+
+    Layers inside a package (`pkg.usdz`, `pkg.usdz[dir/layer.usda]`) anchor
+    relative paths inside the package, and package-relative authored paths
+    (`./vendor.usdz[tex/a.png]`) resolve to members; both are looked up in the
+    archive's central directory (`archive.default_archives()`), never by
+    extracting it. Results are package-relative paths.
     """
 
-    if not asset_path:
-        return None
-    if is_remote(asset_path):
-        return None
-    def _resolve_case_insensitive(base: Path, rel: Path) -> Optional[Path]:
+    def __init__(self, max_results: int = 1 << 16, max_dirs: int = 1 << 12) -> None:
+        self.max_results = max_results
+        self.max_dirs = max_dirs
+        self._results: "OrderedDict[Tuple[str, str], Optional[str]]" = OrderedDict()
+        self._listings: "OrderedDict[str, Optional[Tuple[frozenset, Dict[str, str]]]]" = OrderedDict()
+        self._udim_dirs: "OrderedDict[str, Dict[Tuple[str, str], List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters: Counter[str] = Counter()
+        self.search_index: Optional["SearchIndex"] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._listings.clear()
+            self._udim_dirs.clear()
+            self.counters.clear()
+        default_archives().clear()
+
+    def stats(self) -> Dict[str, object]:
+        c = self.counters
+        lookups = c["hits"] + c["negative_hits"] + c["misses"]
+        listings = c["listing_hits"] + c["listing_misses"]
+        return {
+            "lookups": lookups,
+            "hits": c["hits"],
+            "negative_hits": c["negative_hits"],
+            "misses": c["misses"],
+            "hit_rate": round((c["hits"] + c["negative_hits"]) / lookups, 4) if lookups else 0.0,
+            "listing_hits": c["listing_hits"],
+            "listing_misses": c["listing_misses"],
+            "listing_hit_rate": round(c["listing_hits"] / listings, 4) if listings else 0.0,
+            **({"search_index": self.search_index.stats()} if self.search_index is not None else {}),
+        }
+
+    def _listing(self, directory: Path) -> Optional[Tuple[frozenset, Dict[str, str]]]:
+        """(entry names, case-folded name -> real name) of `directory`; None if it cannot be listed."""
+
+        key = str(directory)
+        with self._lock:
+            if key in self._listings:
+                self._listings.move_to_end(key)
+                self.counters["listing_hits"] += 1
+                return self._listings[key]
+        listing: Optional[Tuple[frozenset, Dict[str, str]]]
+        try:
+            with os.scandir(directory) as it:
+                names = [ent.name for ent in it]
+            folded: Dict[str, str] = {}
+            for name in names:
+                folded.setdefault(name.casefold(), name)
+            listing = (frozenset(names), folded)
+        except OSError:
+            listing = None
+        with self._lock:
+            self.counters["listing_misses"] += 1
+            self._listings[key] = listing
+            if len(self._listings) > self.max_dirs:
+                self._listings.popitem(last=False)
+        return listing
+
+    def list_dir(self, directory: str) -> List[str]:
+        """Sorted entry names of `directory` from the listing cache (empty if unreadable)."""
+
+        listing = self._listing(Path(directory))
+        return sorted(listing[0]) if listing else []
+
+    def _udim_index(self, directory: Path) -> Dict[Tuple[str, str], List[str]]:
+        """(name before tile, name after tile) -> sorted tile file names, for one directory.
+
+        Built once per directory from its cached listing; every position where a
+        1001-1999 tile number can sit is indexed, so `tex.<UDIM>.png` matches
+        exactly `tex.1001.png`, ... and never `mytex.1001.png` or `tex.1001.png.bak`.
+        """
+
+        key = str(directory)
+        with self._lock:
+            if key in self._udim_dirs:
+                self._udim_dirs.move_to_end(key)
+                return self._udim_dirs[key]
+        index: Dict[Tuple[str, str], List[str]] = {}
+        listing = self._listing(directory)
+        for name in sorted(listing[0]) if listing else ():
+            for m in _UDIM_TILE_RE.finditer(name):
+                index.setdefault((name[:m.start()], name[m.end():]), []).append(name)
+        with self._lock:
+            self._udim_dirs[key] = index
+            if len(self._udim_dirs) > self.max_dirs:
+                self._udim_dirs.popitem(last=False)
+        return index
+
+    def udim_tiles(self, path_with_udim: str) -> List[str]:
+        """Absolute paths of the existing tiles of a `<UDIM>` pattern path, sorted."""
+
+        p = Path(path_with_udim)
+        before, _, after = p.name.partition(UDIM_TOKEN)
+        names = self._udim_index(p.parent).get((before, after), [])
+        return [str(p.parent / name) for name in names if (p.parent / name).is_file()]
+
+    def _resolve_udim(self, base_dir: Path, asset_path: str) -> Optional[str]:
+        """Resolve a `<UDIM>` pattern: its directory must resolve and hold at least one tile."""
+
+        rel = Path(asset_path)
+        parent = str(rel.parent)
+        if parent in ("", ".") and not rel.is_absolute():
+            directory: Optional[str] = str(base_dir.resolve())
+        else:
+            directory = self._resolve_uncached(base_dir, parent)
+        if not directory:
+            return None
+        pattern = str(Path(directory) / rel.name)
+        return pattern if self.udim_tiles(pattern) else None
+
+    def _resolve_case_insensitive(self, base: Path, rel: Path) -> Optional[Path]:
         """Resolve a relative path against base, case-insensitively per segment.
 
         This helps with upstream assets authored with inconsistent casing (e.g. "Textures" vs "textures")
@@ -43,48 +176,126 @@ def resolve_with_layer(layer_path: str, asset_path: str) -> Optional[str]:
             if part == "..":
                 cur = cur.parent
                 continue
+            listing = self._listing(cur)
+            if listing is None:
+                return None
+            names, folded = listing
             # Prefer exact match first.
-            exact = cur / part
-            if exact.exists():
-                cur = exact
+            if part in names:
+                cur = cur / part
                 continue
-            if not cur.is_dir():
+            match = folded.get(part.casefold())
+            if match is None:
                 return None
+            cur = cur / match
+        return cur if cur.exists() else None
+
+    def _resolve_uncached(self, base_dir: Path, asset_path: str) -> Optional[str]:
+        if UDIM_TOKEN in asset_path:
+            return self._resolve_udim(base_dir, asset_path)
+        # Sdf.AssetPath 可能带有 assetPath 和 resolvedPath，这里仅做文件存在性检查。
+        # If asset_path is relative, try direct then case-insensitive.
+        if not Path(asset_path).is_absolute():
             try:
-                folded = part.casefold()
-                match = None
-                with os.scandir(cur) as it:
-                    for ent in it:
-                        if ent.name.casefold() == folded:
-                            match = ent.path
-                            break
-                if match is None:
-                    return None
-                cur = Path(match)
+                candidate = (base_dir / asset_path).expanduser().resolve()
             except Exception:
-                return None
-        return cur if cur.exists() else None
+                candidate = None
+            if candidate and candidate.exists():
+                return str(candidate)
+            ci = self._resolve_case_insensitive(base_dir, Path(asset_path))
+            if ci and ci.exists():
+                return str(ci.resolve())
+        else:
+            candidate = Path(asset_path).expanduser()
+            if candidate.exists():
+                return str(candidate.resolve())
+        return None
 
-    # Sdf.AssetPath 可能带有 assetPath 和 resolvedPath，这里仅做文件存在性检查。
-    base_dir = Path(layer_path).parent
-    # If asset_path is relative, try direct then case-insensitive.
-    if not Path(asset_path).is_absolute():
-        try:
-            candidate = (base_dir / asset_path).expanduser().resolve()
-        except Exception:
-            candidate = None
-        if candidate and candidate.exists():
-            return str(candidate)
-        ci = _resolve_case_insensitive(base_dir, Path(asset_path))
-        if ci and ci.exists():
-            return str(ci.resolve())
-    else:
-        candidate = Path(asset_path).expanduser()
-        if candidate.exists():
-            return str(candidate.resolve())
+    def _resolve_packaged(self, base_dir: Path, anchor: Optional[Tuple[str, str]], asset_path: str) -> Optional[str]:
+        """Resolve inside a package: from a packaged layer, or a package-relative authored path."""
+
+        archives = default_archives()
+        if is_package_path(asset_path):
+            package, member = split_package_path(asset_path)
+            if anchor is not None and not Path(package).is_absolute():
+                return None  # a package nested in a package
+            package_file = self._resolve_uncached(base_dir, package)
+            return archives.resolve_member(package_file, member) if package_file else None
+        if anchor is None or Path(asset_path).is_absolute():
+            return self._resolve_uncached(base_dir, asset_path)
+        package, inner_dir = anchor
+        if is_package_path(package):
+            return None
+        return archives.resolve_member(package, posixpath.join(inner_dir, asset_path.replace("\\", "/")))
+
+    def resolve(self, layer_path: str, asset_path: str) -> Optional[str]:
+        """Memoized `resolve_with_layer`."""
+
+        if not asset_path or is_remote(asset_path):
+            return None
+        anchor = _package_anchor(layer_path)
+        if anchor is not None:
+            package, inner_dir = anchor
+            base_dir = Path(package).parent
+            key = (f"{package}[{inner_dir}]", asset_path)
+        else:
+            base_dir = Path(layer_path).parent
+            key = (str(base_dir), asset_path)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                found = self._results[key]
+                self.counters["hits" if found is not None else "negative_hits"] += 1
+                return found
+        if anchor is not None or is_package_path(asset_path):
+            found = self._resolve_packaged(base_dir, anchor, asset_path)
+        else:
+            found = self._resolve_uncached(base_dir, asset_path)
+        if found is None and anchor is None and self.search_index is not None:
+            # SQLite query plus stats: outside the lock, which every resolve of every thread takes
+            found = self.search_index.lookup(asset_path)
+        with self._lock:
+            self.counters["misses"] += 1
+            self._results[key] = found
+            if len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return found
+
+
+def _package_anchor(layer_path: str) -> Optional[Tuple[str, str]]:
+    """(package, directory inside it) relative paths of a packaged layer are anchored at; None otherwise."""
+
+    if is_package_path(layer_path):
+        package, inner = split_package_path(layer_path)
+        if is_package_path(inner):
+            # nested package: keep the nesting in the package part so lookups fail cleanly
+            return layer_path, ""
+        return package, posixpath.dirname(inner)
+    if is_package_file(layer_path):
+        return layer_path, ""
     return None
 
 
+_DEFAULT_RESOLVER = Resolver()
+
+
+def default_resolver() -> Resolver:
+    """Process-wide resolver used by `resolve_with_layer`."""
+
+    return _DEFAULT_RESOLVER
+
+
+def resolve_with_layer(layer_path: str, asset_path: str) -> Optional[str]:
+    """将 USD 中的 asset path 解析为本地绝对路径。
+
+    - 以 layer 所在目录为基准处理相对路径。
+    - 远程路径直接返回 None，交由上层处理。
+    - 结果（含未命中）由进程级 `Resolver` 缓存，见 `default_resolver()`。
+    """
+
+    return _DEFAULT_RESOLVER.resolve(layer_path, asset_path)
+
+
 def compute_relative(from_path: Path, to_path: Path) -> str:
     """计算 from_path 所在目录到目标的相对路径。"""
 
@@ -92,18 +303,10 @@ def compute_relative(from_path: Path, to_path: Path) -> str:
 
 
 def udim_tiles(path_with_udim: str) -> Tuple[str, list[str]]:
-    """给定包含 <UDIM> 的路径，扫描同目录下符合 1xxx 的 tile。
+    """给定包含 <UDIM> 的路径，返回同目录下与之精确匹配（前缀 + 1001-1999 + 后缀）的 tile。
 
-    返回 (pattern_dir, tiles)。若目录不存在或无匹配，tiles 为空。
+    返回 (pattern_dir, tiles)。若目录不存在或无匹配，tiles 为空。目录索引由
+    `default_resolver()` 缓存，同目录的多个 UDIM 引用共享一次目录列举。
     """
 
-    p = Path(path_with_udim)
-    directory = p.parent
-    tiles: list[str] = []
-    if not directory.exists():
-        return str(directory), tiles
-    prefix = p.name.replace(UDIM_TOKEN, "")
-    for file in directory.iterdir():
-        if file.is_file() and prefix in file.name and UDIM_RE.search(file.name):
-            tiles.append(str(file))
-    return str(directory), sorted(tiles)
+    return str(Path(path_with_udim).parent), _DEFAULT_RESOLVER.udim_tiles(path_with_udim)
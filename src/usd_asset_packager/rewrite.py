@@ -3,11 +3,12 @@ from __future__ import annotations
 import logging
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pxr import Sdf, Usd
 from pxr import UsdUtils
 
+from .clips import template_target
 from .types import AssetRef, RewriteAction
 
 
@@ -22,6 +23,9 @@ def rewrite_layer_file_asset_paths(layer_path: Path, replacements: Dict[str, str
     - replacements: mapping from original authored asset path string to new string.
     """
 
+    # No byte-level prefilter here: replacements come from the scan of this
+    # layer, which proves it authors paths the prefilter may not see
+    # (e.g. asset values in assetInfo/customData, found by UsdUtils).
     if not replacements:
         return 0
     layer = Sdf.Layer.FindOrOpen(str(layer_path))
@@ -33,7 +37,7 @@ def rewrite_layer_file_asset_paths(layer_path: Path, replacements: Dict[str, str
 
     def _fn(asset_path: str) -> str:
         nonlocal changed
-        new_val = replacements.get(asset_path)
+        new_val = _replacement_for(asset_path, replacements)
         if new_val and new_val != asset_path:
             changed += 1
             return new_val
@@ -47,6 +51,15 @@ def rewrite_layer_file_asset_paths(layer_path: Path, replacements: Dict[str, str
     return changed
 
 
+def _replacement_for(asset_path: str, replacements: Dict[str, str]) -> Optional[str]:
+    """Replacement of an authored path; clip templates (`clip.###.usd`) follow their clip files."""
+
+    new_val = replacements.get(asset_path)
+    if new_val is None and "#" in asset_path:
+        new_val = template_target(asset_path, replacements)
+    return new_val
+
+
 def _get_list_items(list_op: Sdf.ListOp, kind: str):
     getter = getattr(list_op, f"Get{kind}Items", None)
     if getter:
@@ -69,6 +82,25 @@ def _layer_by_identifier(stage: Usd.Stage) -> Dict[str, Sdf.Layer]:
     return mapping
 
 
+def _needs_layer_rewrite(asset: AssetRef) -> bool:
+    """True when the record cannot be rewritten through the composed stage.
+
+    That is the case for records without a composed-stage prim path, for
+    value-clip paths (dictionary metadata) and for time-sampled values.
+    """
+
+    if asset.prim_path == "(layer)":
+        return True
+    if asset.attr_name.startswith("clips:") or ".timeSamples[" in asset.attr_name:
+        return True
+    if not asset.prim_path.startswith("/"):
+        return False
+    try:
+        return Sdf.Path(asset.prim_path).ContainsPrimVariantSelection()
+    except Exception:  # noqa: BLE001
+        return False
+
+
 def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[int, str],
                    layer_new_path: Dict[str, Path], logger: logging.Logger) -> List[RewriteAction]:
     """根据复制结果改写 USD 里的 asset path，并把 layer 导出到新的路径。
@@ -79,6 +111,10 @@ def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[
 
     layer_map = _layer_by_identifier(stage)
     rewrites: List[RewriteAction] = []
+    # Records that cannot be addressed through the composed stage (e.g. opinions
+    # authored inside a variant, as reported by the sdf scan engine) are
+    # rewritten per layer via UsdUtils.ModifyAssetPaths right before export.
+    layer_replacements: Dict[str, Dict[str, str]] = {}
 
     # 先改 subLayerPaths
     for layer_id, layer_obj in layer_map.items():
@@ -125,6 +161,14 @@ def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[
         if not new_layer_path:
             continue
         rel_path = os.path.relpath(target_abs, start=new_layer_path.parent)
+        if _needs_layer_rewrite(asset):
+            layer_replacements.setdefault(asset.layer_identifier, {}).setdefault(asset.original_path, rel_path)
+            rewrites.append(
+                RewriteAction(layer_identifier=asset.layer_identifier, prim_path=asset.prim_path,
+                              attr_name=asset.attr_name, before=asset.original_path, after=rel_path,
+                              success=True, reason="layer-level rewrite"),
+            )
+            continue
         prim = stage.GetPrimAtPath(asset.prim_path)
         if not prim:
             rewrites.append(
@@ -170,10 +214,15 @@ def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[
 
             try:
                 new_op = Sdf.ReferenceListOp() if meta_name == "references" else Sdf.PayloadListOp()
-                _set_list_items(new_op, "Explicit", _replace(_get_list_items(list_op, "Explicit")))
-                _set_list_items(new_op, "Added", _replace(_get_list_items(list_op, "Added")))
-                _set_list_items(new_op, "Prepended", _replace(_get_list_items(list_op, "Prepended")))
-                _set_list_items(new_op, "Appended", _replace(_get_list_items(list_op, "Appended")))
+                # Setting any non-explicit item list clears an explicit list op, so
+                # explicit ops (`references = @x@`) only get their explicit items.
+                if getattr(list_op, "isExplicit", False):
+                    _set_list_items(new_op, "Explicit", _replace(_get_list_items(list_op, "Explicit")))
+                else:
+                    _set_list_items(new_op, "Added", _replace(_get_list_items(list_op, "Added")))
+                    _set_list_items(new_op, "Prepended", _replace(_get_list_items(list_op, "Prepended")))
+                    _set_list_items(new_op, "Appended", _replace(_get_list_items(list_op, "Appended")))
+                    _set_list_items(new_op, "Deleted", _get_list_items(list_op, "Deleted"))
                 prim.SetMetadata(meta_name, new_op)
                 rewrites.append(
                     RewriteAction(layer_identifier=asset.layer_identifier, prim_path=asset.prim_path,
@@ -205,7 +254,7 @@ def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[
                 if isinstance(val, Sdf.AssetPath):
                     attr.Set(Sdf.AssetPath(rel_path))
                     success = True
-                elif isinstance(val, list) and val and isinstance(val[0], Sdf.AssetPath):
+                elif isinstance(val, (list, Sdf.AssetPathArray)) and len(val) and isinstance(val[0], Sdf.AssetPath):
                     new_list = []
                     for item in val:
                         if item.path == asset.original_path:
@@ -229,6 +278,16 @@ def rewrite_layers(stage: Usd.Stage, assets: List[AssetRef], copy_targets: Dict[
                               success=False, reason=str(exc)),
             )
 
+    for layer_id, replacements in layer_replacements.items():
+        layer_obj = layer_map.get(layer_id)
+        if not layer_obj:
+            continue
+
+        def _fn(asset_path: str, _replacements: Dict[str, str] = replacements) -> str:
+            return _replacement_for(asset_path, _replacements) or asset_path
+
+        UsdUtils.ModifyAssetPaths(layer_obj, _fn)
+
     # 导出各 layer 到新路径
     for layer_id, new_path in layer_new_path.items():
         layer_obj = layer_map.get(layer_id)
@@ -1,126 +1,19 @@
 from __future__ import annotations
 
 import logging
-import re
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from pxr import Sdf, Usd, UsdShade
 
+from .archive import inner_path
+from .clips import clip_set_paths
+from .mdl_graph import MdlGraph
 from .resolver import is_remote, is_udim_path, resolve_with_layer
+from .scan_cache import ScanCache
 from .types import AssetRef
 
 
-_MDL_IMPORT_RE = re.compile(r"^\s*import\s+([^;]+);", re.MULTILINE)
-_MDL_USING_IMPORT_RE = re.compile(r"^\s*using\s+([^\s;]+)\s+import\b", re.MULTILINE)
-_MDL_RESOURCE_STR_RE = re.compile(
-    r"(?P<q>['\"])(?P<path>[^'\"\r\n]+\.(?:png|jpg|jpeg|tga|exr|hdr|dds|ktx2))(?P=q)",
-    re.IGNORECASE,
-)
-
-
-def _scan_mdl_import_deps(mdl_file: str) -> List[str]:
-    """Extract MDL module file dependencies from `import ...;` statements.
-
-    Returns absolute file paths for modules that exist next to `mdl_file`.
-    This is intentionally conservative (only same-directory modules) to
-    avoid pulling in Isaac/Kit built-ins.
-    """
-
-    p = Path(mdl_file)
-    try:
-        text = p.read_text(encoding="utf-8", errors="replace")
-    except Exception:
-        return []
-
-    specs: List[str] = []
-    for m in _MDL_IMPORT_RE.finditer(text):
-        specs.append((m.group(1) or "").strip())
-    for m in _MDL_USING_IMPORT_RE.finditer(text):
-        specs.append((m.group(1) or "").strip())
-
-    deps: List[str] = []
-    for spec in specs:
-        if not spec:
-            continue
-        # Keep only the first token (drop `::*`, `as`, etc)
-        token = spec.split()[0]
-        # Strip common suffixes/prefixes
-        token = token.rstrip(";")
-        if token.endswith("::*"):
-            token = token[: -len("::*")]
-        token = token.lstrip(".")
-        token = token.lstrip(":")
-        # Module name is the last component after '::'
-        name = token.split("::")[-1].strip()
-        # Some imports may be quoted (rare) or include invalid chars.
-        name = name.strip('"\'')
-        if not name:
-            continue
-        dep_path = p.parent / f"{name}.mdl"
-        if dep_path.is_file():
-            deps.append(str(dep_path))
-    # De-dup while preserving order
-    seen = set()
-    out: List[str] = []
-    for d in deps:
-        if d in seen:
-            continue
-        seen.add(d)
-        out.append(d)
-    return out
-
-
-def _scan_mdl_resource_deps(mdl_file: str) -> List[str]:
-    """Extract file resource dependencies referenced by an MDL module.
-
-    Currently focuses on texture-like resources (png/jpg/exr/etc) referenced via
-    string literals, e.g. texture_2d("./Textures/white.png").
-
-    Returns absolute file paths for resources that exist on disk.
-    """
-
-    p = Path(mdl_file)
-    try:
-        text = p.read_text(encoding="utf-8", errors="replace")
-    except Exception:
-        return []
-
-    deps: List[str] = []
-    for m in _MDL_RESOURCE_STR_RE.finditer(text):
-        raw = (m.group("path") or "").strip()
-        if not raw:
-            continue
-        lower = raw.lower()
-        # Ignore remote/builtin-like references.
-        if lower.startswith(("http://", "https://", "omniverse://", "mdl://")):
-            continue
-        if "::" in raw and "/" not in raw and "\\" not in raw:
-            # Likely a module symbol, not a file path.
-            continue
-
-        cand = (p.parent / raw)
-        if not cand.is_file():
-            # Common upstream issue: MDL uses './Textures' but folder is 'textures' on Linux.
-            raw2 = raw.replace("/Textures/", "/textures/").replace("./Textures/", "./textures/")
-            cand2 = (p.parent / raw2)
-            if cand2.is_file():
-                cand = cand2
-
-        if cand.is_file():
-            deps.append(str(cand.resolve()))
-
-    # De-dup while preserving order
-    seen = set()
-    out: List[str] = []
-    for d in deps:
-        if d in seen:
-            continue
-        seen.add(d)
-        out.append(d)
-    return out
-
-
 def _gather_refs_from_listop(listop) -> List[object]:
     """Best-effort extraction of items from USD list-op objects.
 
@@ -171,6 +64,20 @@ def _gather_refs_from_listop(listop) -> List[object]:
     return items
 
 
+def _iter_asset_path_values(val) -> List[str]:
+    """Return the authored path strings held by an asset / asset[] value.
+
+    `asset[]` values come back as `Sdf.AssetPathArray` from modern USD builds and
+    as plain lists from older ones; both are handled here.
+    """
+
+    if isinstance(val, Sdf.AssetPath):
+        return [val.path]
+    if isinstance(val, (list, tuple, Sdf.AssetPathArray)):
+        return [item.path for item in val if isinstance(item, Sdf.AssetPath)]
+    return []
+
+
 def _record_asset(asset_refs: List[AssetRef], asset_type: str, asset_path: str, resolved: str | None,
                   layer_id: str, prim_path: str, attr_name: str) -> None:
     asset_refs.append(
@@ -187,7 +94,40 @@ def _record_asset(asset_refs: List[AssetRef], asset_type: str, asset_path: str,
     )
 
 
-def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
+_ASSET_VALUE_TYPES = (Sdf.ValueTypeNames.Asset, Sdf.ValueTypeNames.AssetArray)
+
+
+def time_sample_asset_paths(layer: Sdf.Layer, spec_path: Sdf.Path, attr_name: str) -> List[tuple]:
+    """(record attr name, authored path) of the asset values time-sampled on one attribute spec.
+
+    Samples are read at the Sdf level (`ListTimeSamplesForPath` /
+    `QueryTimeSample`) so nothing is composed or interpolated. Record names
+    are `<attr>.timeSamples[<time>]`, plus `[i]` for `asset[]` entries.
+    """
+
+    out: List[tuple] = []
+    for t in layer.ListTimeSamplesForPath(spec_path):
+        val = layer.QueryTimeSample(spec_path, t)
+        name = f"{attr_name}.timeSamples[{t:g}]"
+        if isinstance(val, Sdf.AssetPath):
+            if val.path:
+                out.append((name, val.path))
+            continue
+        for idx, path in enumerate(_iter_asset_path_values(val)):
+            if path:
+                out.append((f"{name}[{idx}]", path))
+    return out
+
+
+def record_clip_assets(asset_refs: List[AssetRef], clips, resolve_base: str, layer_id: str, prim_path: str) -> None:
+    """Record the files named by a `clips` dictionary as USD dependencies."""
+
+    for attr_name, authored, resolved in clip_set_paths(clips, resolve_base):
+        _record_asset(asset_refs, "usd", authored, resolved, layer_id, prim_path, attr_name)
+
+
+def scan_stage(stage: Usd.Stage, logger: logging.Logger, cache: Optional[ScanCache] = None,
+               mdl_graph: Optional[MdlGraph] = None) -> List[AssetRef]:
     """扫描整个 Stage 的依赖与材质。
 
     - 使用 Usd.Stage.Open / Traverse 来遍历 prim。
@@ -195,18 +135,22 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
     - 通过属性值中出现的 Sdf.AssetPath / 字符串捕获贴图、MDL、USD 引用。
     """
 
-    asset_refs: List[AssetRef] = []
+    asset_refs = scan_composed_prims(stage)
+    expand_mdl_deps(asset_refs, logger, cache, mdl_graph)
+    collect_used_layers(stage, asset_refs, logger)
+    logger.info("scan completed: %d assets", len(asset_refs))
+    return asset_refs
 
-    # Some scenes rely on resolver search paths, so authored reference strings
-    # (e.g. "../../models/.../instance.usd") may not be directly resolvable via
-    # simple path joins. However, once the stage opens successfully, USD knows
-    # the resolved file-backed layers that are actually used by the composed
-    # stage.
-    #
-    # We record these used file-backed layers as USD dependencies so that
-    # `--copy-usd-deps` can produce a self-contained output even when we cannot
-    # deterministically resolve the authored reference strings.
-    layer_stack_ids = {layer.identifier for layer in stage.GetLayerStack()}
+
+def scan_composed_prims(stage: Usd.Stage) -> List[AssetRef]:
+    """Collect subLayer / reference / payload / attribute asset paths from the composed stage.
+
+    This is the original (default) scan engine: every prim is composed and every
+    attribute value is fetched, so the authoring layer has to be recovered from
+    the prim / property stacks.
+    """
+
+    asset_refs: List[AssetRef] = []
 
     # 1) layer subLayers
     for layer in stage.GetLayerStack():
@@ -243,6 +187,14 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
                 "references",
             )
 
+        # value clips: recorded per authoring spec, the composed dictionary loses the layer
+        if prim.HasAuthoredMetadata("clips"):
+            for prim_spec in prim_stack:
+                if prim_spec.HasInfo("clips"):
+                    record_clip_assets(asset_refs, prim_spec.GetInfo("clips"),
+                                       prim_spec.layer.realPath or prim.GetStage().GetRootLayer().realPath,
+                                       prim_spec.layer.identifier, prim.GetPath().pathString)
+
         payload_meta_name = "payload" if prim.GetMetadata("payload") else "payloads"
         payload_listop = prim.GetMetadata(payload_meta_name)
         for payload in _gather_refs_from_listop(payload_listop):
@@ -262,6 +214,8 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
         # 3) 材质网络与通用 asset 属性
         for attr in prim.GetAttributes():
             val = attr.Get()
+            if attr.GetTypeName() in _ASSET_VALUE_TYPES:
+                _record_attr_time_samples(asset_refs, prim, attr)
             if val is None:
                 continue
             prop_stack = []
@@ -274,38 +228,81 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
             layer_real = prop_layer.realPath if prop_layer else ""
             resolve_base = layer_real or prim.GetStage().GetRootLayer().realPath
             layer_id_for_record = layer_id or prim.GetStage().GetRootLayer().identifier
+            # Opinions authored inside a variant keep their spec path so they are
+            # rewritten in the variant, not overridden on the prim.
+            prim_path = prim.GetPath().pathString
+            if prop_stack and prop_stack[0].path.ContainsPrimVariantSelection():
+                prim_path = prop_stack[0].path.GetPrimOrPrimVariantSelectionPath().pathString
             # asset or asset[]
             if isinstance(val, Sdf.AssetPath):
                 asset_path = val.path
                 asset_type = _guess_asset_type(prim, attr, asset_path)
                 resolved = resolve_with_layer(resolve_base, asset_path)
                 _record_asset(asset_refs, asset_type, asset_path, resolved, layer_id_for_record,
-                              prim.GetPath().pathString, attr.GetName())
-            elif isinstance(val, list) and val and isinstance(val[0], Sdf.AssetPath):
-                for idx, ap in enumerate(val):
-                    asset_type = _guess_asset_type(prim, attr, ap.path)
-                    resolved = resolve_with_layer(resolve_base, ap.path)
-                    _record_asset(asset_refs, asset_type, ap.path, resolved, layer_id_for_record,
-                                  prim.GetPath().pathString, f"{attr.GetName()}[{idx}]")
-
-    # 4) MDL module dependencies (imports) for locally-resolved MDL files.
-    # This closes a common gap where USD references only the top-level .mdl, but
-    # that .mdl imports siblings like OmniUe4Base/OmniUe4Function.
-    extra: List[AssetRef] = []
+                              prim_path, attr.GetName())
+            else:
+                for idx, path in enumerate(_iter_asset_path_values(val)):
+                    asset_type = _guess_asset_type(prim, attr, path)
+                    resolved = resolve_with_layer(resolve_base, path)
+                    _record_asset(asset_refs, asset_type, path, resolved, layer_id_for_record,
+                                  prim_path, f"{attr.GetName()}[{idx}]")
+
+    return asset_refs
+
+
+def _record_attr_time_samples(asset_refs: List[AssetRef], prim: Usd.Prim, attr: Usd.Attribute) -> None:
+    try:
+        prop_stack = attr.GetPropertyStack()
+    except Exception:
+        return
+    root_real = prim.GetStage().GetRootLayer().realPath
+    for spec in prop_stack:
+        resolve_base = spec.layer.realPath or root_real
+        for attr_name, path in time_sample_asset_paths(spec.layer, spec.path, attr.GetName()):
+            _record_asset(asset_refs, _guess_asset_type(prim, attr, path), path,
+                          resolve_with_layer(resolve_base, path) if resolve_base else None,
+                          spec.layer.identifier, prim.GetPath().pathString, attr_name)
+
+
+def expand_mdl_deps(asset_refs: List[AssetRef], logger: logging.Logger,
+                    cache: Optional[ScanCache] = None, mdl_graph: Optional[MdlGraph] = None) -> None:
+    """Append MDL import / resource dependencies of the scanned MDL assets in place.
+
+    The transitive import closure of every locally-resolved MDL is walked via
+    `MdlGraph`, so chains like Wood.mdl -> OmniUe4Base -> OmniUe4Function are
+    followed to the end. Each dependency is recorded once, with the importing
+    (or resource-owning) module as its layer identifier; those records are only
+    used for copy/report, not for USD rewrite.
+    """
+
+    graph = mdl_graph if mdl_graph is not None else MdlGraph(cache=cache)
+
+    roots: List[str] = []
     for asset in asset_refs:
-        if asset.asset_type != "mdl":
-            continue
-        if not asset.resolved_path:
+        if asset.asset_type != "mdl" or not asset.resolved_path:
             continue
-        for dep_abs in _scan_mdl_import_deps(asset.resolved_path):
-            # Record as an MDL asset with a non-stage layer identifier; it's only
-            # used for copy/report, not for USD rewrite.
+        root = str(Path(asset.resolved_path).resolve())
+        if root not in roots:
+            roots.append(root)
+    if not roots:
+        return
+
+    modules = graph.closure(roots)
+
+    # 4) MDL module dependencies (imports), transitively.
+    extra: List[AssetRef] = []
+    recorded = set(roots)
+    for module_path in modules:
+        for dep_abs in graph.module(module_path).imports:
+            if dep_abs in recorded:
+                continue
+            recorded.add(dep_abs)
             _record_asset(
                 extra,
                 "mdl",
                 dep_abs,
                 dep_abs,
-                layer_id=asset.resolved_path,
+                layer_id=module_path,
                 prim_path="(mdl_import)",
                 attr_name="mdl_import",
             )
@@ -313,31 +310,17 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
         asset_refs.extend(extra)
         logger.info("scan: added %d mdl import deps", len(extra))
 
-    # 5) MDL resource dependencies (textures referenced inside MDL code).
-    # We scan all locally-resolved MDL files, including imported siblings.
-    mdl_paths: List[str] = []
-    for asset in asset_refs:
-        if asset.asset_type != "mdl" or not asset.resolved_path:
-            continue
-        mdl_paths.append(asset.resolved_path)
-    # De-dup while preserving order
-    seen_mdl = set()
-    uniq_mdl_paths: List[str] = []
-    for mp in mdl_paths:
-        if mp in seen_mdl:
-            continue
-        seen_mdl.add(mp)
-        uniq_mdl_paths.append(mp)
-
+    # 5) MDL resource dependencies (textures referenced inside MDL code),
+    # for every module of the closure including imported ones.
     mdl_tex_extra: List[AssetRef] = []
-    for mp in uniq_mdl_paths:
-        for dep_abs in _scan_mdl_resource_deps(mp):
+    for module_path in modules:
+        for dep_abs in graph.module(module_path).resources:
             _record_asset(
                 mdl_tex_extra,
                 "texture",
                 dep_abs,
                 dep_abs,
-                layer_id=mp,
+                layer_id=module_path,
                 prim_path="(mdl_resource)",
                 attr_name="mdl_resource",
             )
@@ -345,14 +328,29 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
         asset_refs.extend(mdl_tex_extra)
         logger.info("scan: added %d mdl resource deps", len(mdl_tex_extra))
 
+def collect_used_layers(stage: Usd.Stage, asset_refs: List[AssetRef], logger: logging.Logger) -> None:
+    """Append file-backed layers used by the composed stage as USD dependencies.
+
+    Some scenes rely on resolver search paths, so authored reference strings
+    (e.g. "../../models/.../instance.usd") may not be directly resolvable via
+    simple path joins. However, once the stage opens successfully, USD knows
+    the resolved file-backed layers that are actually used by the composed
+    stage.
+
+    We record these used file-backed layers as USD dependencies so that
+    `--copy-usd-deps` can produce a self-contained output even when we cannot
+    deterministically resolve the authored reference strings.
+    """
+
+    layer_stack_ids = {layer.identifier for layer in stage.GetLayerStack()}
+
     # 6) referenced/payloaded file-backed layers actually used by the stage
     # NOTE: `GetUsedLayers()` includes sublayers and referenced layers; we skip
     # anything already in the root layer stack (those are exported separately).
     used_layer_extra: List[AssetRef] = []
     try:
-        for layer in stage.GetUsedLayers():
-            if not layer:
-                continue
+        # GetUsedLayers() is a set; sort so records (and report.json) do not depend on its order
+        for layer in sorted((l for l in stage.GetUsedLayers() if l), key=lambda l: l.identifier):
             if layer.identifier in layer_stack_ids:
                 continue
             real = getattr(layer, "realPath", None)
@@ -366,26 +364,124 @@ def scan_stage(stage: Usd.Stage, logger: logging.Logger) -> List[AssetRef]:
         asset_refs.extend(used_layer_extra)
         logger.info("scan: added %d used USD layers", len(used_layer_extra))
 
-    logger.info("scan completed: %d assets", len(asset_refs))
-    return asset_refs
+
+def restrict_to_population_mask(stage: Usd.Stage, asset_refs: List[AssetRef]) -> List[AssetRef]:
+    """Drop root-layer-stack records authored on prims outside the stage's population mask.
+
+    Spec-level engines read whole layers; on a masked stage only the masked
+    subtrees (and their ancestors) are packed. Records of referenced layers
+    are kept: their namespace is not the stage's, and `GetUsedLayers()` of a
+    masked stage already excludes layers only unmasked prims pull in.
+    """
+
+    mask = stage.GetPopulationMask()
+    if mask.IncludesSubtree(Sdf.Path.absoluteRootPath):
+        return asset_refs
+    layer_stack_ids = {layer.identifier for layer in stage.GetLayerStack()}
+    kept: List[AssetRef] = []
+    for asset in asset_refs:
+        if asset.layer_identifier in layer_stack_ids and asset.prim_path.startswith("/"):
+            try:
+                prim_path = Sdf.Path(asset.prim_path).StripAllVariantSelections()
+            except Exception:  # noqa: BLE001
+                prim_path = None
+            if prim_path is not None and not mask.Includes(prim_path):
+                continue
+        kept.append(asset)
+    return kept
+
+
+SpecKey = Tuple[str, str]
+
+
+def composed_specs(stage: Usd.Stage) -> Set[SpecKey]:
+    """(layer identifier, spec path) of every prim spec the composed stage uses.
+
+    Prim stacks come from the stage's single composition, so variant specs in
+    this set are exactly the selected ones, in every layer (referenced layers
+    included), without recomposing anything.
+    """
+
+    specs: Set[SpecKey] = set()
+    for prim in stage.TraverseAll():
+        for spec in prim.GetPrimStack():
+            specs.add((spec.layer.identifier, spec.path.pathString))
+    return specs
+
+
+def restrict_to_selected_variants(stage: Usd.Stage, asset_refs: List[AssetRef],
+                                  specs: Optional[Set[SpecKey]] = None) -> List[AssetRef]:
+    """Drop records authored inside variants that the composed stage does not select.
+
+    Only records carrying a spec path with a variant selection (the sdf
+    engine's) are affected; a record is kept when its prim spec is part of
+    the composition.
+    """
+
+    if not any("{" in a.prim_path for a in asset_refs):
+        return asset_refs
+    specs = composed_specs(stage) if specs is None else specs
+    return [a for a in asset_refs
+            if "{" not in a.prim_path or (a.layer_identifier, a.prim_path) in specs]
+
+
+def asset_ref_key(asset: AssetRef) -> tuple:
+    """Backend-independent identity of a record, used for parity checks.
+
+    Prim paths are deliberately excluded: the composed scan reports stage
+    paths, the sdf scan reports spec paths and the usdutils scan none at all.
+    """
+
+    return (asset.asset_type, asset.original_path, asset.resolved_path, asset.layer_identifier)
+
+
+def diff_scans(candidate: List[AssetRef], reference: List[AssetRef]) -> Dict[str, object]:
+    """Compare two scan results as sets of `asset_ref_key`."""
+
+    cand = {asset_ref_key(a) for a in candidate}
+    ref = {asset_ref_key(a) for a in reference}
+    fields = ("asset_type", "original_path", "resolved_path", "layer_identifier")
+
+    def _rows(keys) -> List[Dict[str, object]]:
+        return [dict(zip(fields, key)) for key in sorted(keys, key=lambda k: tuple(str(x) for x in k))]
+
+    return {
+        "matched": len(cand & ref),
+        "only_in_backend": _rows(cand - ref),
+        "only_in_reference": _rows(ref - cand),
+    }
 
 
 def _guess_asset_type(prim: Usd.Prim, attr: Usd.Attribute | None, asset_path: str) -> str:
     """简单推测资产类型，仅用于报告分类。"""
 
-    lower = asset_path.lower()
-    if lower.endswith((".usd", ".usda", ".usdc")):
+    def _shader_id() -> str | None:
+        # Shader 类型辅助判断
+        if prim.IsA(UsdShade.Shader):
+            return UsdShade.Shader(prim).GetIdAttr().Get()
+        return None
+
+    return guess_asset_type_for_path(asset_path, attr.GetName() if attr else "", _shader_id)
+
+
+def guess_asset_type_for_path(asset_path: str, attr_name: str = "",
+                              shader_id: Callable[[], str | None] | None = None) -> str:
+    """Classify an asset path without needing a composed prim.
+
+    `shader_id` is a lazy callback so that callers only pay for looking up
+    `info:id` when the suffix alone is not conclusive.
+    """
+
+    lower = inner_path(asset_path).lower()
+    if lower.endswith((".usd", ".usda", ".usdc", ".usdz")):
         return "usd"
     if lower.endswith((".glb", ".gltf")):
         return "glb"
-    if lower.endswith(".mdl") or (attr and "mdl" in attr.GetName().lower()):
+    if lower.endswith(".mdl") or "mdl" in attr_name.lower():
+        return "mdl"
+    sid = shader_id() if shader_id else None
+    if sid and "mdl" in sid.lower():
         return "mdl"
-    # Shader 类型辅助判断
-    if prim.IsA(UsdShade.Shader):
-        shader = UsdShade.Shader(prim)
-        shader_id = shader.GetIdAttr().Get()
-        if shader_id and "mdl" in shader_id.lower():
-            return "mdl"
     # 纹理常见后缀
     if lower.endswith((".png", ".jpg", ".jpeg", ".tga", ".exr", ".hdr", ".ktx2", ".dds")):
         return "texture"
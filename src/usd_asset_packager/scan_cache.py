@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .resolver import is_remote, is_udim_path, resolve_with_layer
+from .types import AssetRef
+
+
+DEFAULT_CACHE_DIR = Path("~/.cache/usd_asset_packager").expanduser()
+DEFAULT_MAX_MB = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, path)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+# Payload format / scanner version per kind; bump when the producer changes what it records,
+# so entries of unchanged files written by an older scanner become misses:
+# - layer 2: clip / time-sample records, variant handling, prefiltered layers cached as [].
+# - layer 3: text layers whose only dependency is a clip template are no longer prefiltered to [].
+# - mdl_module 2: authored import specifiers and resource strings (resolved on load).
+PAYLOAD_VERSIONS = {"layer": 3, "mdl_module": 2}
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ScanCache:
+    """Persistent per-file scan results (SQLite) keyed by file fingerprint.
+
+    An entry is keyed by (kind, real path) and is valid while the file's size
+    and mtime are unchanged. With `use_hash`, a size/mtime mismatch falls back
+    to comparing a sha256 of the content, so touched or re-copied but otherwise
+    identical files still hit. An entry written with another
+    `PAYLOAD_VERSIONS` value of its kind is a miss. The database is capped at
+    `max_bytes` of payload and evicts least-recently-used entries beyond that.
+
+    Kinds used by the packager:
+    - "layer": authored asset paths of one USD layer (sdf scan records).
+    - "mdl_module": authored imports / resources of one MDL module (`mdl_graph`).
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 use_hash: bool = False, logger: Optional[logging.Logger] = None) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.use_hash = use_hash
+        self._logger = logger or logging.getLogger("usd_asset_packager")
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.evictions = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "version" not in columns:
+            # databases from before payload versions: every entry becomes a miss
+            self._conn.execute("ALTER TABLE entries ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    @classmethod
+    def open_default(cls, cache_dir: Optional[Path] = None, max_mb: int = DEFAULT_MAX_MB,
+                     use_hash: bool = False, logger: Optional[logging.Logger] = None) -> "ScanCache":
+        base = Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+        return cls(base / "scan_cache.sqlite", max_mb * 1024 * 1024, use_hash, logger)
+
+    def _stat(self, path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            real = os.path.realpath(path)
+            st = os.stat(real)
+        except OSError:
+            return None
+        return real, st.st_size, st.st_mtime_ns
+
+    def get(self, kind: str, path: str):
+        """Return the cached payload for `path`, or None on a miss."""
+
+        fp = self._stat(path)
+        if fp is None:
+            self.misses[kind] += 1
+            return None
+        real, size, mtime_ns = fp
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, digest, payload, version FROM entries WHERE kind = ? AND path = ?", (kind, real)
+        ).fetchone()
+        if row is None or row[4] != PAYLOAD_VERSIONS.get(kind, 0):
+            self.misses[kind] += 1
+            return None
+        c_size, c_mtime, c_digest, payload, _version = row
+        if (c_size, c_mtime) != (size, mtime_ns):
+            if not (self.use_hash and c_digest and c_size == size and _file_digest(real) == c_digest):
+                self.misses[kind] += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET mtime_ns = ? WHERE kind = ? AND path = ?", (mtime_ns, kind, real)
+            )
+        self._conn.execute(
+            "UPDATE entries SET last_used = ? WHERE kind = ? AND path = ?", (time.time(), kind, real)
+        )
+        self.hits[kind] += 1
+        return json.loads(payload)
+
+    def put(self, kind: str, path: str, payload) -> None:
+        fp = self._stat(path)
+        if fp is None:
+            return
+        real, size, mtime_ns = fp
+        digest = _file_digest(real) if self.use_hash else ""
+        text = json.dumps(payload, ensure_ascii=False)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (kind, path, size, mtime_ns, digest, payload, nbytes, last_used, version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, real, size, mtime_ns, digest, text, len(text.encode("utf-8")), time.time(),
+             PAYLOAD_VERSIONS.get(kind, 0)),
+        )
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the payload total fits `max_bytes`."""
+
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT kind, path, nbytes FROM entries ORDER BY last_used ASC").fetchall()
+        for kind, path, nbytes in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE kind = ? AND path = ?", (kind, path))
+            total -= nbytes
+            self.evictions += 1
+
+    def forget_missing(self, root: str) -> int:
+        """Delete entries of files under directory `root` that no longer exist; return how many."""
+
+        prefix = os.path.join(os.path.realpath(root), "")
+        rows = self._conn.execute(
+            "SELECT kind, path FROM entries WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        gone = [(kind, path) for kind, path in rows if not os.path.exists(path)]
+        self._conn.executemany("DELETE FROM entries WHERE kind = ? AND path = ?", gone)
+        return len(gone)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        try:
+            self.evict()
+            self._conn.commit()
+        finally:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": str(self.db_path),
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "evictions": self.evictions,
+        }
+
+
+def layer_refs_to_payload(asset_refs: List[AssetRef]) -> List[List[str]]:
+    """Serialize sdf scan records of one layer; resolution is redone on load."""
+
+    return [[a.asset_type, a.original_path, a.prim_path, a.attr_name] for a in asset_refs]
+
+
+def layer_refs_from_payload(payload: List[List[str]], layer_id: str, resolve_base: str) -> List[AssetRef]:
+    """Rebuild records cached by `layer_refs_to_payload`.
+
+    Only the authored data is cached: whether a referenced file exists may have
+    changed since, so paths are resolved again against the layer location.
+    """
+
+    out: List[AssetRef] = []
+    for asset_type, original_path, prim_path, attr_name in payload:
+        resolved = resolve_with_layer(resolve_base, original_path) if resolve_base else None
+        out.append(
+            AssetRef(
+                asset_type=asset_type,
+                original_path=original_path,
+                resolved_path=resolved,
+                layer_identifier=layer_id,
+                prim_path=prim_path,
+                attr_name=attr_name,
+                is_remote=is_remote(original_path),
+                is_udim=is_udim_path(original_path),
+            )
+        )
+    return out
@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pxr import Sdf, Usd
+
+from .mdl_graph import MdlGraph
+from .prefilter import may_have_asset_paths
+from .resolver import resolve_with_layer
+from .scan import (
+    _gather_refs_from_listop,
+    _iter_asset_path_values,
+    _record_asset,
+    collect_used_layers,
+    expand_mdl_deps,
+    guess_asset_type_for_path,
+    record_clip_assets,
+    restrict_to_population_mask,
+    restrict_to_selected_variants,
+    time_sample_asset_paths,
+)
+from .scan_cache import ScanCache, layer_refs_from_payload, layer_refs_to_payload
+from .types import AssetRef
+
+
+_ASSET_TYPE_NAMES = (Sdf.ValueTypeNames.Asset, Sdf.ValueTypeNames.AssetArray)
+
+
+def _listop_items(listop) -> List[object]:
+    """Items of a single-layer list op, de-duplicated while preserving order.
+
+    `_gather_refs_from_listop` probes several getters that overlap (e.g.
+    `GetAddedOrExplicitItems` and `GetPrependedItems`), which is fine for the
+    composed scan but would double-count authored specs here.
+    """
+
+    out: List[object] = []
+    for item in _gather_refs_from_listop(listop):
+        if item not in out:
+            out.append(item)
+    return out
+
+
+def _shader_id_lookup(layer: Sdf.Layer, prim_path: Sdf.Path):
+    def _lookup() -> Optional[str]:
+        spec = layer.GetAttributeAtPath(prim_path.AppendProperty("info:id"))
+        if spec is None or not spec.HasDefaultValue():
+            return None
+        val = spec.default
+        return str(val) if val else None
+
+    return _lookup
+
+
+def scan_layer(layer: Sdf.Layer, fallback_real_path: str = "",
+               root: Sdf.Path = Sdf.Path.absoluteRootPath) -> List[AssetRef]:
+    """Collect asset references authored in a single layer by walking its specs.
+
+    Unlike the composed scan, no prim is composed and only attribute specs whose
+    `typeName` is `asset` / `asset[]` have their value read, so heavy geometry
+    arrays (points / normals / indices) are never pulled into Python. The
+    authoring layer of every record is `layer` itself.
+
+    `fallback_real_path` is used as resolve base for anonymous layers (e.g. the
+    session layer), mirroring the composed scan falling back to the root layer.
+    `root` restricts the walk to one spec subtree (e.g. a variant); sublayers
+    are only recorded for a whole-layer scan.
+    """
+
+    resolve_base = layer.realPath or fallback_real_path
+    asset_refs = sublayer_records(layer, resolve_base) if root == Sdf.Path.absoluteRootPath else []
+    spec_paths: List[Sdf.Path] = []
+    layer.Traverse(root, spec_paths.append)
+    asset_refs.extend(scan_spec_paths(layer, spec_paths, resolve_base))
+    return asset_refs
+
+
+def sublayer_records(layer: Sdf.Layer, resolve_base: str) -> List[AssetRef]:
+    asset_refs: List[AssetRef] = []
+    for sub in layer.subLayerPaths:
+        resolved = resolve_with_layer(resolve_base, sub) if resolve_base else None
+        _record_asset(asset_refs, "usd", sub, resolved, layer.identifier, "(subLayer)", "subLayerPaths")
+    return asset_refs
+
+
+def scan_spec_paths(layer: Sdf.Layer, spec_paths: Iterable[Sdf.Path], resolve_base: str) -> List[AssetRef]:
+    """Records authored on the given specs of `layer` (prim metadata and asset-typed attributes).
+
+    The per-spec part of `scan_layer`; prim shards (`shard_scan.py`) call it
+    on their own spec ranges.
+    """
+
+    asset_refs: List[AssetRef] = []
+    layer_id = layer.identifier
+
+    def _resolve(asset_path: str) -> Optional[str]:
+        if not asset_path or not resolve_base:
+            return None
+        return resolve_with_layer(resolve_base, asset_path)
+
+    for path in spec_paths:
+        if path.IsPrimPath() or path.IsPrimVariantSelectionPath():
+            prim_spec = layer.GetPrimAtPath(path)
+            if prim_spec is None:
+                continue
+            if prim_spec.HasInfo("clips"):
+                record_clip_assets(asset_refs, prim_spec.GetInfo("clips"), resolve_base, layer_id, path.pathString)
+            for meta_name in ("references", "payload"):
+                if not prim_spec.HasInfo(meta_name):
+                    continue
+                for item in _listop_items(prim_spec.GetInfo(meta_name)):
+                    asset_path = getattr(item, "assetPath", "") or ""
+                    if not asset_path:
+                        # Internal reference/payload: no external file involved.
+                        continue
+                    _record_asset(asset_refs, guess_asset_type_for_path(asset_path), asset_path,
+                                  _resolve(asset_path), layer_id, path.pathString, meta_name)
+            continue
+
+        if not path.IsPropertyPath():
+            continue
+        attr_spec = layer.GetAttributeAtPath(path)
+        if attr_spec is None or attr_spec.typeName not in _ASSET_TYPE_NAMES:
+            continue
+        values: List[Tuple[str, str]] = []
+        if attr_spec.HasDefaultValue():
+            val = attr_spec.default
+            if isinstance(val, Sdf.AssetPath):
+                values = [(attr_spec.name, val.path)]
+            else:
+                values = [(f"{attr_spec.name}[{idx}]", p) for idx, p in enumerate(_iter_asset_path_values(val))]
+        values.extend(time_sample_asset_paths(layer, path, attr_spec.name))
+        if not values:
+            continue
+        prim_path = path.GetPrimOrPrimVariantSelectionPath()
+        shader_id = _shader_id_lookup(layer, prim_path)
+        for attr_name, asset_path in values:
+            if not asset_path:
+                continue
+            asset_type = guess_asset_type_for_path(asset_path, attr_spec.name, shader_id)
+            _record_asset(asset_refs, asset_type, asset_path, _resolve(asset_path), layer_id,
+                          prim_path.pathString, attr_name)
+
+    return asset_refs
+
+
+def _scan_layer_task(identifier: str, fallback_real_path: str = "") -> Tuple[str, str, List[AssetRef]]:
+    """Open a layer by identifier and scan it; runs in-process or in a pool worker.
+
+    Returns (identifier, realPath, records). The identifier of the opened layer
+    is returned so the caller can detect aliases of already-scanned layers.
+    """
+
+    try:
+        layer = Sdf.Layer.FindOrOpen(identifier)
+    except Exception:  # noqa: BLE001
+        layer = None
+    if not layer:
+        return identifier, "", []
+    return layer.identifier, layer.realPath or "", scan_layer(layer, fallback_real_path)
+
+
+@contextlib.contextmanager
+def layer_scan_pool(jobs: int) -> Iterator[Optional[ProcessPoolExecutor]]:
+    """Process pool for per-layer scans, or None when scanning serially.
+
+    Workers are spawned rather than forked: the parent has already initialised
+    USD (and its thread pool), which is not fork-safe.
+    """
+
+    if jobs <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield pool
+
+
+def scan_layer_batch(identifiers: List[str], fallback_real_path: str,
+                      pool: Optional[ProcessPoolExecutor],
+                      cache: Optional[ScanCache] = None, shard_min_bytes: int = 0, shards: int = 1,
+                      shard_stats: Optional[Dict[str, object]] = None,
+                      logger: Optional[logging.Logger] = None) -> List[Tuple[str, str, List[AssetRef]]]:
+    """Scan layers, returning results in the order of `identifiers`.
+
+    `Executor.map` yields in submission order, so the merged output does not
+    depend on which worker finishes first. With a `cache`, layers whose file
+    fingerprint is unchanged are served from it and only misses are scanned.
+    With a pool and `shard_min_bytes`, files at least that large are split
+    into `shards` prim shards that use the whole pool (`shard_scan.py`).
+    Files the byte-level prefilter proves free of asset paths are never
+    opened with Sdf.
+    """
+
+    results: List[Optional[Tuple[str, str, List[AssetRef]]]] = [None] * len(identifiers)
+    pending: List[int] = []
+    prefiltered = 0
+    for idx, identifier in enumerate(identifiers):
+        if not os.path.isfile(identifier):
+            pending.append(idx)
+            continue
+        if cache is not None:
+            payload = cache.get("layer", identifier)
+            if payload is not None:
+                results[idx] = (identifier, identifier,
+                                layer_refs_from_payload(payload, identifier, identifier))
+                continue
+        if not may_have_asset_paths(identifier):
+            results[idx] = (identifier, identifier, [])
+            prefiltered += 1
+            if cache is not None:
+                cache.put("layer", identifier, [])
+            continue
+        pending.append(idx)
+    if prefiltered and logger is not None:
+        logger.info("prefilter: %d of %d layers author no asset paths; not opened", prefiltered, len(identifiers))
+
+    sharded: Dict[int, Tuple[str, str, List[AssetRef]]] = {}
+    if pool is not None and shard_min_bytes > 0 and shards > 1:
+        # shard_scan builds on this module, hence the local import
+        from .shard_scan import scan_layer_sharded
+
+        for idx in pending:
+            identifier = identifiers[idx]
+            if os.path.isfile(identifier) and os.path.getsize(identifier) >= shard_min_bytes:
+                sharded[idx] = scan_layer_sharded(identifier, fallback_real_path, pool, shards, logger, shard_stats)
+    todo_idx = [idx for idx in pending if idx not in sharded]
+    todo = [identifiers[idx] for idx in todo_idx]
+    if pool is None or len(todo) < 2:
+        scanned = [_scan_layer_task(identifier, fallback_real_path) for identifier in todo]
+    else:
+        scanned = list(pool.map(_scan_layer_task, todo, [fallback_real_path] * len(todo)))
+    scanned_by_idx = dict(zip(todo_idx, scanned))
+    scanned_by_idx.update(sharded)
+    for idx in pending:
+        result = scanned_by_idx[idx]
+        results[idx] = result
+        _opened_id, real, layer_refs = result
+        if pool is not None:
+            # Workers resolve without the parent's search index; retry their misses here.
+            base = real or fallback_real_path
+            for asset in layer_refs:
+                if not asset.resolved_path and not asset.is_remote and base:
+                    asset.resolved_path = resolve_with_layer(base, asset.original_path)
+        if cache is not None and real and os.path.isfile(identifiers[idx]):
+            cache.put("layer", identifiers[idx], layer_refs_to_payload(layer_refs))
+    return [r for r in results if r is not None]
+
+
+def scan_layer_closure(seed_paths: Iterable[str], skip_identifiers: Iterable[str] = (),
+                       pool: Optional[ProcessPoolExecutor] = None,
+                       cache: Optional[ScanCache] = None) -> Tuple[List[AssetRef], List[str]]:
+    """Scan the layers reachable from `seed_paths` without composing a stage.
+
+    Sublayers, references and payloads found in each scanned layer are followed
+    breadth-first; layers whose identifier is in `skip_identifiers` (typically
+    the ones already scanned as part of the stage) are neither scanned nor
+    followed. Each BFS level is scanned as one batch, in parallel when `pool`
+    is given. Returns the asset records and the real paths of scanned layers.
+    """
+
+    seen = set(skip_identifiers)
+    asset_refs: List[AssetRef] = []
+    layer_paths: List[str] = []
+    frontier: List[str] = []
+    for path in seed_paths:
+        if path not in seen:
+            seen.add(path)
+            frontier.append(path)
+
+    while frontier:
+        next_frontier: List[str] = []
+        for path, (identifier, real, layer_refs) in zip(frontier, scan_layer_batch(frontier, "", pool, cache)):
+            if identifier != path:
+                if identifier in seen:
+                    continue
+                seen.add(identifier)
+            if not real and not layer_refs:
+                continue
+            asset_refs.extend(layer_refs)
+            if real:
+                layer_paths.append(real)
+            for asset in layer_refs:
+                dep = asset.resolved_path
+                if asset.asset_type == "usd" and dep and not asset.is_remote and dep not in seen:
+                    seen.add(dep)
+                    next_frontier.append(dep)
+        frontier = next_frontier
+    return asset_refs, layer_paths
+
+
+def scan_unused_layer_closures(stage: Usd.Stage, seeds: List[str], asset_refs: List[AssetRef],
+                               logger: logging.Logger, what: str, jobs: int = 1,
+                               cache: Optional[ScanCache] = None, mdl_graph: Optional[MdlGraph] = None) -> None:
+    """Append the dependencies of layers the composed stage does not use.
+
+    The layer closure of each seed is scanned at the Sdf level, skipping the
+    layers already used by the stage; MDL dependencies are expanded and the
+    scanned layers are recorded as used layers so `--copy-usd-deps` packs them.
+    """
+
+    if not seeds:
+        return
+    used_ids = {layer.identifier for layer in stage.GetUsedLayers() if layer}
+    with layer_scan_pool(jobs) as pool:
+        extra, layers = scan_layer_closure(seeds, skip_identifiers=used_ids, pool=pool, cache=cache)
+    expand_mdl_deps(extra, logger, cache, mdl_graph)
+    for real in layers:
+        _record_asset(extra, "usd", real, real, "(usedLayer)", "(usedLayer)", "usedLayer")
+    asset_refs.extend(extra)
+    logger.info("scan: added %d assets from %d %s layers", len(extra), len(layers), what)
+
+
+def scan_payload_closures(stage: Usd.Stage, asset_refs: List[AssetRef], logger: logging.Logger,
+                          jobs: int = 1, cache: Optional[ScanCache] = None,
+                          mdl_graph: Optional[MdlGraph] = None) -> None:
+    """Append the dependencies of payloads that the stage did not load.
+
+    Intended for stages opened with `Usd.Stage.LoadNone`: the payload arcs are
+    still visible in the `payload` metadata already recorded by the scan, but
+    their layers are not part of `GetUsedLayers()`. Each payload's layer closure
+    is scanned at the Sdf level and its layers are recorded as used layers, so
+    `--copy-usd-deps` still packs them.
+    """
+
+    seeds: List[str] = []
+    for asset in asset_refs:
+        if asset.attr_name in ("payload", "payloads") and asset.resolved_path and not asset.is_remote:
+            if asset.resolved_path not in seeds:
+                seeds.append(asset.resolved_path)
+    scan_unused_layer_closures(stage, seeds, asset_refs, logger, "unloaded payload", jobs, cache, mdl_graph)
+
+
+def stage_layers(stage: Usd.Stage) -> List[Sdf.Layer]:
+    """Root layer stack followed by the remaining used layers, in a stable order."""
+
+    layers: List[Sdf.Layer] = []
+    seen = set()
+    for layer in stage.GetLayerStack():
+        if layer.identifier not in seen:
+            seen.add(layer.identifier)
+            layers.append(layer)
+    extra = [layer for layer in stage.GetUsedLayers() if layer and layer.identifier not in seen]
+    layers.extend(sorted(extra, key=lambda layer: layer.identifier))
+    return layers
+
+
+def scan_stage_layers(stage: Usd.Stage, logger: logging.Logger, jobs: int = 1,
+                      cache: Optional[ScanCache] = None, mdl_graph: Optional[MdlGraph] = None,
+                      variants: str = "all", shard_min_bytes: int = 0,
+                      shard_stats: Optional[Dict[str, object]] = None) -> List[AssetRef]:
+    """Spec-level equivalent of `scan.scan_stage`.
+
+    Every layer used by the stage is scanned independently with `scan_layer`;
+    MDL dependencies and used layers are then appended exactly like the
+    composed scan does. With `jobs > 1` file-backed layers without unsaved
+    edits are scanned in a process pool; results are merged in layer order.
+
+    Layers hold every variant's opinions; with `variants="selected"` records
+    of variants the stage does not select are dropped before MDL expansion.
+    File-backed layers of at least `shard_min_bytes` are split into prim
+    shards across the pool (see `shard_scan.scan_layer_sharded`).
+    """
+
+    root_real = stage.GetRootLayer().realPath
+    layers = stage_layers(stage)
+    # Anonymous / dirty layers only exist in this process' memory.
+    local = [layer for layer in layers if layer.anonymous or layer.dirty or not layer.realPath]
+    remote_ids = [layer.identifier for layer in layers if layer not in local]
+
+    per_layer: Dict[str, List[AssetRef]] = {}
+    with layer_scan_pool(jobs) as pool:
+        batch = scan_layer_batch(remote_ids, root_real, pool, cache,
+                                  shard_min_bytes=shard_min_bytes, shards=jobs, shard_stats=shard_stats, logger=logger)
+        for identifier, (_opened_id, _real, layer_refs) in zip(remote_ids, batch):
+            per_layer[identifier] = layer_refs
+    for layer in local:
+        per_layer[layer.identifier] = scan_layer(layer, root_real)
+
+    asset_refs: List[AssetRef] = []
+    for layer in layers:
+        asset_refs.extend(per_layer.get(layer.identifier, []))
+    asset_refs = restrict_to_population_mask(stage, asset_refs)
+    if variants == "selected":
+        before = len(asset_refs)
+        asset_refs = restrict_to_selected_variants(stage, asset_refs)
+        if before != len(asset_refs):
+            logger.info("sdf scan: dropped %d records of unselected variants", before - len(asset_refs))
+    logger.info("sdf scan: %d authored asset paths in %d layers (jobs=%d)", len(asset_refs), len(layers), jobs)
+
+    expand_mdl_deps(asset_refs, logger, cache, mdl_graph)
+    collect_used_layers(stage, asset_refs, logger)
+    logger.info("scan completed: %d assets", len(asset_refs))
+    return asset_refs
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .scan_cache import DEFAULT_CACHE_DIR
+
+
+# Bump when the tables change; an index of another version is dropped and rebuilt.
+_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    files INTEGER NOT NULL,
+    built_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    root TEXT NOT NULL,
+    dir TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    root TEXT NOT NULL,
+    dir TEXT NOT NULL,
+    rkey TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_rkey ON files (rkey);
+CREATE INDEX IF NOT EXISTS files_root ON files (root);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS dirs_root ON dirs (root);
+"""
+
+_BATCH = 10000
+# Rows fetched per suffix probe; entries of files deleted since the last refresh are skipped.
+_PROBE_ROWS = 8
+
+
+def _components(path: str) -> List[str]:
+    """Meaningful, case-folded components of an authored or on-disk path.
+
+    Relative markers (`.`, `..`), empty segments and drive letters are dropped:
+    `../../models/Chair/instance.usd` -> ["models", "chair", "instance.usd"].
+    """
+
+    parts = path.replace("\\", "/").split("/")
+    return [p.casefold() for p in parts if p not in ("", ".", "..") and not p.endswith(":")]
+
+
+def _rkey(components: Sequence[str]) -> str:
+    """Reversed components joined by "/", with a trailing "/" (basename first).
+
+    A path ends with a suffix iff its key starts with the suffix's key, so a
+    suffix lookup is a range scan on the `files_rkey` index.
+    """
+
+    return "/".join(reversed(components)) + "/"
+
+
+def walk_files(root: Path) -> Iterator[str]:
+    """Every regular file under `root`, symlinked directories not followed; unreadable entries are skipped."""
+
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for ent in it:
+                    try:
+                        if ent.is_dir(follow_symlinks=False):
+                            stack.append(ent.path)
+                        elif ent.is_file():
+                            yield ent.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class SearchIndex:
+    """Persistent filename/suffix index over dataset roots (SQLite).
+
+    Each root is walked once and its files are stored under their reversed,
+    case-folded path components; later opens only re-list directories whose
+    mtime changed, and files deleted in between are skipped by every lookup. An authored path that does not resolve next
+    to its layer is matched against the index by its longest path suffix:
+    `../../models/chair/instance.usd` prefers `<root>/.../models/chair/instance.usd`
+    over any other `instance.usd`. Every probe is an index range scan, so a
+    lookup costs O(log n) per probed suffix length and the suffix length is
+    binary-searched.
+
+    When several files share the longest matching suffix nothing is returned
+    (counted as ambiguous); a match on the basename alone is counted and
+    logged as a warning.
+    """
+
+    def __init__(self, db_path: Path, roots: Sequence[str], logger: Optional[logging.Logger] = None) -> None:
+        self.db_path = db_path
+        self.roots = [str(Path(r).expanduser().resolve()) for r in roots]
+        self._logger = logger or logging.getLogger("usd_asset_packager")
+        self.counters: Counter[str] = Counter()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # `_conn` builds the index; lookups come from scan/copy worker threads concurrently and each
+        # thread reads through its own connection (`_reader`), so they never wait on one another.
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS dirs; "
+                                     "DROP TABLE IF EXISTS roots;")
+            self._conn.execute(f"PRAGMA user_version = {_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._root_filter = "root IN (%s)" % ",".join("?" * len(self.roots)) if self.roots else "0"
+
+    @classmethod
+    def open_default(cls, roots: Sequence[str], db_path: Optional[Path] = None,
+                     logger: Optional[logging.Logger] = None) -> "SearchIndex":
+        path = Path(db_path).expanduser() if db_path else DEFAULT_CACHE_DIR / "search_index.sqlite"
+        return cls(path, roots, logger)
+
+    def _list_dir(self, directory: str) -> Tuple[List[str], List[str]]:
+        """(files, subdirectories) of one directory, symlinked directories not followed."""
+
+        files: List[str] = []
+        subdirs: List[str] = []
+        try:
+            with os.scandir(directory) as it:
+                for ent in it:
+                    try:
+                        if ent.is_dir(follow_symlinks=False):
+                            subdirs.append(ent.path)
+                        elif ent.is_file():
+                            files.append(ent.path)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
+
+    def _index_dir(self, root: str, directory: str, mtime_ns: int) -> List[str]:
+        """(Re)index the files directly in `directory`; return its subdirectories."""
+
+        files, subdirs = self._list_dir(directory)
+        self._conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+        for offset in range(0, len(files), _BATCH):
+            self._conn.executemany("INSERT INTO files (root, dir, rkey, path) VALUES (?, ?, ?, ?)",
+                                   [(root, directory, _rkey(_components(p)), p) for p in files[offset:offset + _BATCH]])
+        self._conn.execute("INSERT OR REPLACE INTO dirs (root, dir, parent, mtime_ns) VALUES (?, ?, ?, ?)",
+                           (root, directory, os.path.dirname(directory), mtime_ns))
+        return subdirs
+
+    def _refresh(self, root: str, full: bool) -> Tuple[int, int]:
+        """Bring `root` up to date; return (directories re-listed, directories checked).
+
+        A directory's mtime changes when entries are added, removed or renamed
+        in it, so only directories whose mtime differs from the stored one are
+        listed again (new subdirectories are indexed recursively, vanished ones
+        dropped with their files); the others cost one `stat`. `full` lists
+        every directory.
+        """
+
+        known: Dict[str, int] = {}
+        children: Dict[str, List[str]] = {}
+        for directory, parent, mtime_ns in self._conn.execute(
+                "SELECT dir, parent, mtime_ns FROM dirs WHERE root = ?", (root,)).fetchall():
+            known[directory] = mtime_ns
+            children.setdefault(parent, []).append(directory)
+        relisted = 0
+        checked = 0
+        seen = set()
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            checked += 1
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue  # vanished: dropped below with everything not seen
+            seen.add(directory)
+            if full or known.get(directory) != mtime_ns:
+                relisted += 1
+                stack.extend(self._index_dir(root, directory, mtime_ns))
+            else:
+                # unchanged listing: its subdirectories are the stored ones
+                stack.extend(children.get(directory, ()))
+        for directory in known:
+            if directory not in seen:
+                # removed (or no longer reachable): drop its files
+                self._conn.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self._conn.execute("DELETE FROM dirs WHERE dir = ?", (directory,))
+        return relisted, checked
+
+    def build(self, rebuild: bool = False) -> Dict[str, int]:
+        """Index every root, refreshing already indexed ones by directory mtime; return files per root.
+
+        `rebuild` lists every directory again.
+        """
+
+        counts: Dict[str, int] = {}
+        for root in self.roots:
+            start = time.perf_counter()
+            indexed = self._conn.execute("SELECT 1 FROM roots WHERE root = ?", (root,)).fetchone() is not None
+            relisted, checked = self._refresh(root, full=rebuild or not indexed)
+            total = self._conn.execute("SELECT COUNT(*) FROM files WHERE root = ?", (root,)).fetchone()[0]
+            self._conn.execute("INSERT OR REPLACE INTO roots (root, files, built_at) VALUES (?, ?, ?)",
+                               (root, total, time.time()))
+            self._conn.commit()
+            counts[root] = total
+            self._logger.info("search index: %d files under %s (%d of %d directories re-listed, %.1fs)",
+                              total, root, relisted, checked, time.perf_counter() - start)
+        return counts
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection to the index."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def _probe(self, components: Sequence[str], length: int) -> List[str]:
+        """Up to two existing indexed files ending with the last `length` components."""
+
+        prefix = _rkey(components[-length:])
+        upper = prefix[:-1] + chr(ord("/") + 1)
+        rows = self._reader().execute(
+            f"SELECT path FROM files WHERE rkey >= ? AND rkey < ? AND {self._root_filter} ORDER BY path LIMIT ?",
+            (prefix, upper, *self.roots, _PROBE_ROWS),
+        ).fetchall()
+        found: List[str] = []
+        for (path,) in rows:
+            if os.path.isfile(path):
+                found.append(path)
+                if len(found) == 2:
+                    break
+            else:
+                self._count("stale")
+        return found
+
+    def lookup(self, asset_path: str) -> Optional[str]:
+        """Existing indexed file whose path ends with the longest suffix of `asset_path`, if any.
+
+        Refused (None, with a warning) when several files share that longest
+        suffix; accepted with a warning when only the basename matched
+        although the authored path names directories.
+        """
+
+        components = _components(asset_path)
+        self._count("lookups")
+        if not components:
+            self._count("misses")
+            return None
+        best = self._probe(components, 1)
+        if not best:
+            self._count("misses")
+            return None
+        lo, hi = 1, len(components)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            found = self._probe(components, mid)
+            if found:
+                lo, best = mid, found
+            else:
+                hi = mid - 1
+        if len(best) > 1:
+            self._count("ambiguous")
+            self._logger.warning("search index: %s matches several files on its last %d component(s) "
+                                 "(%s, %s, ...); not resolved", asset_path, lo, best[0], best[1])
+            return None
+        self._count("hits")
+        if lo == 1 and len(components) > 1:
+            self._count("basename_only")
+            self._logger.warning("search index: %s resolved by file name only to %s", asset_path, best[0])
+        return best[0]
+
+    def stats(self) -> Dict[str, object]:
+        return {"path": str(self.db_path), "roots": self.roots, **{k: self.counters[k] for k in
+                                                                 ("lookups", "hits", "misses", "ambiguous", "basename_only", "stale")}}
+
+    def close(self) -> None:
+        with self._lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._conn.close()
+
+
+def open_search_index(roots: Iterable[str], db_path: Optional[Path], rebuild: bool,
+                      logger: logging.Logger) -> Optional[SearchIndex]:
+    """Open (building missing roots) the index for `roots`; None when no root is given."""
+
+    roots = [r for r in roots if r]
+    if not roots:
+        return None
+    index = SearchIndex.open_default(roots, db_path, logger)
+    index.build(rebuild=rebuild)
+    return index
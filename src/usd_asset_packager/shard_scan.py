@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from pxr import Sdf
+
+from .sdf_scan import _scan_layer_task, scan_spec_paths, sublayer_records
+from .types import AssetRef
+
+
+# (prim spec path, whole subtree?) -- a header unit covers only the prim, its properties and variants
+ShardUnit = Tuple[str, bool]
+
+# Subtrees heavier than total / (shards * _SPLIT_FACTOR) are split into their children.
+_SPLIT_FACTOR = 4
+
+# Prim specs visited to estimate the weights of one set of sibling units.
+_PLAN_BUDGET = 4096
+
+
+def _estimate_specs(spec: Sdf.PrimSpec, budget: int) -> float:
+    """Estimated spec count of the subtree of `spec`, visiting about `budget` prim specs.
+
+    Each visited prim counts itself and its properties (spec counts
+    approximate scan cost far better than prim counts: one prim with 200
+    primvars costs as much as 200 bare Xforms). Children are sampled evenly
+    when there are more than the budget allows and the sample is scaled up;
+    once the budget is spent, unvisited children are assumed to weigh as
+    much as their parent. Variant prim specs count towards the prim owning
+    the variant set, as in the scan.
+    """
+
+    weight = 1.0 + len(spec.properties)
+    variants = [variant.primSpec for vset in spec.variantSets.values() for variant in vset.variants.values()]
+    children = spec.nameChildren
+    count = len(children)
+    budget -= 1
+    if variants:
+        share = max(1, budget // (len(variants) + 1))
+        weight += sum(_estimate_specs(variant, share) for variant in variants)
+        budget -= share * len(variants)
+    if not count:
+        return weight
+    if budget <= 0:
+        return weight + count * weight
+    sample = min(count, budget)
+    share = max(1, budget // sample)
+    step = count / sample
+    sampled = sum(_estimate_specs(children[int(idx * step)], share) for idx in range(sample))
+    return weight + sampled * count / sample
+
+
+def plan_shards(layer: Sdf.Layer, shards: int) -> Tuple[List[List[ShardUnit]], Dict[str, int]]:
+    """Partition a layer's prim specs into `shards` balanced lists of units.
+
+    Root prims are the initial units. The heaviest unit is split while it
+    exceeds total / (shards * 4) specs: its prim (properties and variants
+    included) becomes a header unit and each child subtree a unit of its own,
+    so one giant `/World` still spreads over every worker. Units are then
+    assigned longest-processing-time first (heaviest unit to the currently
+    lightest shard).
+
+    Weights are sampled estimates (`_estimate_specs`), not a traversal of
+    the layer: every set of sibling units shares a budget of
+    `_PLAN_BUDGET` visited prim specs, so planning costs a few
+    milliseconds per split instead of a walk over every spec, which
+    would run serially before any worker starts.
+    """
+
+    roots = list(layer.rootPrims)
+    share = max(1, _PLAN_BUDGET // max(1, len(roots)))
+    heap = [(-_estimate_specs(spec, share), spec.path.pathString, spec.path) for spec in roots]
+    total = -sum(item[0] for item in heap)
+    target = max(1.0, total / (max(1, shards) * _SPLIT_FACTOR))
+    heapq.heapify(heap)
+    units: List[Tuple[float, str, bool]] = []
+    while heap:
+        neg_weight, path_str, path = heapq.heappop(heap)
+        spec = layer.GetPrimAtPath(path)
+        children = list(spec.nameChildren) if spec and -neg_weight > target else []
+        if children:
+            share = max(1, _PLAN_BUDGET // len(children))
+            child_weights = [(-_estimate_specs(child, share), child.path.pathString, child.path) for child in children]
+            # the header unit: whatever the children do not account for (properties, variants)
+            units.append((max(1.0, -neg_weight + sum(item[0] for item in child_weights)), path_str, False))
+            for item in child_weights:
+                heapq.heappush(heap, item)
+        else:
+            units.append((-neg_weight, path_str, True))
+
+    units.sort(key=lambda u: (-u[0], u[1]))
+    loads = [(0.0, idx) for idx in range(max(1, shards))]
+    assignment: List[List[ShardUnit]] = [[] for _ in loads]
+    for weight, path_str, whole in units:
+        load, idx = heapq.heappop(loads)
+        assignment[idx].append((path_str, whole))
+        heapq.heappush(loads, (load + weight, idx))
+    shard_loads = [load for load, _idx in loads]
+    stats = {"specs": round(total), "units": len(units), "shards": sum(1 for a in assignment if a),
+             "max_shard_specs": round(max(shard_loads)), "min_shard_specs": round(min(shard_loads))}
+    return [a for a in assignment if a], stats
+
+
+def _unit_spec_paths(layer: Sdf.Layer, path: Sdf.Path, whole: bool) -> List[Sdf.Path]:
+    paths: List[Sdf.Path] = []
+    if whole:
+        layer.Traverse(path, paths.append)
+        return paths
+    spec = layer.GetPrimAtPath(path)
+    if spec is None:
+        return paths
+    paths.append(path)
+    paths.extend(prop.path for prop in spec.properties)
+    for vset in spec.variantSets.values():
+        for variant in vset.variants.values():
+            layer.Traverse(variant.primSpec.path, paths.append)
+    return paths
+
+
+def _scan_shard_task(identifier: str, fallback_real_path: str,
+                     units: List[ShardUnit]) -> List[Tuple[str, List[AssetRef]]]:
+    """Scan one shard's units of a layer; runs in a pool worker. Returns (unit path, records) per unit."""
+
+    layer = Sdf.Layer.FindOrOpen(identifier)
+    if not layer:
+        return []
+    resolve_base = layer.realPath or fallback_real_path
+    return [(path, scan_spec_paths(layer, _unit_spec_paths(layer, Sdf.Path(path), whole), resolve_base))
+            for path, whole in units]
+
+
+def scan_layer_sharded(identifier: str, fallback_real_path: str, pool: ProcessPoolExecutor, shards: int,
+                       logger: Optional[logging.Logger] = None,
+                       shard_stats: Optional[Dict[str, object]] = None) -> Tuple[str, str, List[AssetRef]]:
+    """`_scan_layer_task` for one huge layer, split into prim shards scanned by `pool`.
+
+    Every worker opens the layer itself and walks only its units' spec
+    ranges; results are merged in namespace order of the units, so the
+    output does not depend on the plan or on worker timing.
+    """
+
+    layer = Sdf.Layer.FindOrOpen(identifier)
+    if not layer:
+        return identifier, "", []
+    plan, stats = plan_shards(layer, shards)
+    if len(plan) < 2:
+        return _scan_layer_task(identifier, fallback_real_path)
+    if logger is not None:
+        logger.info("shard scan: %s -> %d shards over %d units (%d specs, largest shard %d)",
+                    layer.identifier, stats["shards"], stats["units"], stats["specs"], stats["max_shard_specs"])
+    if shard_stats is not None:
+        shard_stats[layer.identifier] = stats
+    per_unit: List[Tuple[str, List[AssetRef]]] = []
+    for shard_result in pool.map(_scan_shard_task, [identifier] * len(plan), [fallback_real_path] * len(plan), plan):
+        per_unit.extend(shard_result)
+    per_unit.sort(key=lambda item: Sdf.Path(item[0]))
+    asset_refs = sublayer_records(layer, layer.realPath or fallback_real_path)
+    for _path, unit_refs in per_unit:
+        asset_refs.extend(unit_refs)
+    return layer.identifier, layer.realPath or "", asset_refs
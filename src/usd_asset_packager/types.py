@@ -28,6 +28,8 @@ class CopyAction:
     target_path: Optional[str]
     success: bool
     reason: str = ""
+    # copy / cas / hardlink / reflink / symlink / convert；失败时为空
+    method: str = ""
 
 
 @dataclass
@@ -53,6 +55,10 @@ class PackReport:
     stats: Dict[str, int] = field(default_factory=dict)
     mdl_paths: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
+    scan: Dict[str, object] = field(default_factory=dict)
+    mdl_graph: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    copy: Dict[str, object] = field(default_factory=dict)
+    resolver: Dict[str, object] = field(default_factory=dict)
 
     def to_dict(self) -> Dict:
         def _asset_dict(asset: AssetRef) -> Dict:
@@ -74,6 +80,7 @@ class PackReport:
                 "target_path": cp.target_path,
                 "success": cp.success,
                 "reason": cp.reason,
+                "method": cp.method,
             }
 
         def _rewrite_dict(rw: RewriteAction) -> Dict:
@@ -91,6 +98,10 @@ class PackReport:
             "stats": self.stats,
             "mdl_paths": self.mdl_paths,
             "warnings": self.warnings,
+            "scan": self.scan,
+            "mdl_graph": self.mdl_graph,
+            "copy": self.copy,
+            "resolver": self.resolver,
             "assets": [_asset_dict(asset) for asset in self.assets],
             "copies": [_copy_dict(copy) for copy in self.copies],
             "rewrites": [_rewrite_dict(rewrite) for rewrite in self.rewrites],
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import logging
+from typing import List, Optional
+
+from pxr import Usd, UsdUtils
+
+from .mdl_graph import MdlGraph
+from .resolver import resolve_with_layer
+from .scan import _record_asset, expand_mdl_deps, guess_asset_type_for_path
+from .scan_cache import ScanCache
+from .sdf_scan import scan_layer
+from .types import AssetRef
+
+
+def _extract_layer(layer_real: str, layer_id: str) -> List[AssetRef]:
+    """Record the external references of one file-backed layer via UsdUtils.
+
+    `ExtractExternalReferences` does not report where in the layer a path was
+    authored, so records carry prim_path "(layer)" and are rewritten per layer.
+    Attribute asset paths are reported together with references; they are
+    told apart by `attr_name` only where the suffix makes it obvious.
+    """
+
+    asset_refs: List[AssetRef] = []
+    sublayers, references, payloads = UsdUtils.ExtractExternalReferences(layer_real)
+    for sub in sublayers:
+        _record_asset(asset_refs, "usd", sub, resolve_with_layer(layer_real, sub), layer_id,
+                      "(subLayer)", "subLayerPaths")
+    for path in references:
+        asset_type = guess_asset_type_for_path(path)
+        attr_name = "references" if asset_type == "usd" else "(asset)"
+        _record_asset(asset_refs, asset_type, path, resolve_with_layer(layer_real, path), layer_id,
+                      "(layer)", attr_name)
+    for path in payloads:
+        _record_asset(asset_refs, guess_asset_type_for_path(path), path, resolve_with_layer(layer_real, path),
+                      layer_id, "(layer)", "payload")
+    return asset_refs
+
+
+def scan_stage_usdutils(stage: Usd.Stage, logger: logging.Logger, cache: Optional[ScanCache] = None,
+                        mdl_graph: Optional[MdlGraph] = None) -> List[AssetRef]:
+    """Build the asset list with UsdUtils' C++ dependency extraction.
+
+    - `UsdUtils.ComputeAllDependencies` supplies the layer closure of the root layer.
+    - `UsdUtils.ExtractExternalReferences` lists the authored paths of each layer.
+    - Anonymous layers of the root layer stack (e.g. the session layer) have no
+      file to hand to UsdUtils and fall back to the sdf spec scan.
+    """
+
+    root = stage.GetRootLayer()
+    layer_stack_ids = {layer.identifier for layer in stage.GetLayerStack()}
+    asset_refs: List[AssetRef] = []
+
+    for layer in stage.GetLayerStack():
+        if layer.anonymous or not layer.realPath:
+            asset_refs.extend(scan_layer(layer, root.realPath))
+
+    closure = []
+    if root.realPath:
+        closure, _assets, unresolved = UsdUtils.ComputeAllDependencies(root.realPath)
+        for path in unresolved:
+            logger.debug("usdutils scan: unresolved dependency %s", path)
+
+    for layer in closure:
+        real = getattr(layer, "realPath", None)
+        if not real:
+            continue
+        asset_refs.extend(_extract_layer(real, layer.identifier))
+    logger.info("usdutils scan: %d authored asset paths in %d layers", len(asset_refs), len(closure))
+
+    expand_mdl_deps(asset_refs, logger, cache, mdl_graph)
+
+    used_layer_extra: List[AssetRef] = []
+    for layer in sorted(closure, key=lambda layer: layer.identifier):
+        real = getattr(layer, "realPath", None)
+        if not real or layer.identifier in layer_stack_ids:
+            continue
+        _record_asset(used_layer_extra, "usd", real, real, "(usedLayer)", "(usedLayer)", "usedLayer")
+    if used_layer_extra:
+        asset_refs.extend(used_layer_extra)
+        logger.info("scan: added %d used USD layers", len(used_layer_extra))
+
+    logger.info("scan completed: %d assets", len(asset_refs))
+    return asset_refs
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from pxr import Sdf, Usd
+
+from .mdl_graph import MdlGraph
+from .scan import SpecKey, composed_specs, expand_mdl_deps
+from .scan_cache import ScanCache
+from .sdf_scan import scan_layer, scan_unused_layer_closures
+from .types import AssetRef
+
+
+VARIANT_MODES = ("selected", "all")
+
+
+def variant_selections(prim_path: str) -> List[Tuple[str, str, str]]:
+    """(owning prim path, variant set, variant) for every selection in a spec path, outermost first."""
+
+    # Synthetic record paths like `(usedLayer)` would make Sdf.Path print an ill-formed path warning.
+    if "{" not in prim_path:
+        return []
+    try:
+        path = Sdf.Path(prim_path)
+    except Exception:  # noqa: BLE001
+        return []
+    if not path.ContainsPrimVariantSelection():
+        return []
+    out: List[Tuple[str, str, str]] = []
+    while path and path != Sdf.Path.absoluteRootPath:
+        if path.IsPrimVariantSelectionPath():
+            vset, variant = path.GetVariantSelection()
+            out.append((path.GetParentPath().StripAllVariantSelections().pathString, vset, variant))
+        path = path.GetParentPath()
+    out.reverse()
+    return out
+
+
+def scan_unselected_variants(stage: Usd.Stage, asset_refs: List[AssetRef], logger: logging.Logger,
+                             cache: Optional[ScanCache] = None, mdl_graph: Optional[MdlGraph] = None,
+                             specs: Optional[Set[SpecKey]] = None) -> None:
+    """Append the records of every variant the composed stage does not select.
+
+    For the composed scan: every prim spec of every prim stack is checked for
+    variant sets and each unselected variant's spec subtree is walked with
+    `scan_layer`, i.e. enumerated at the Sdf level, never composed. Nested
+    variants inside an unselected variant are covered by the same walk.
+    """
+
+    specs = composed_specs(stage) if specs is None else specs
+    root_real = stage.GetRootLayer().realPath
+    visited: Set[SpecKey] = set()
+    extra: List[AssetRef] = []
+    for prim in stage.TraverseAll():
+        for spec in prim.GetPrimStack():
+            for vset in spec.variantSets.values():
+                for variant in vset.variants.values():
+                    variant_spec = variant.primSpec
+                    key = (spec.layer.identifier, variant_spec.path.pathString)
+                    if key in specs or key in visited:
+                        continue
+                    visited.add(key)
+                    extra.extend(scan_layer(spec.layer, root_real, root=variant_spec.path))
+    expand_mdl_deps(extra, logger, cache, mdl_graph)
+    asset_refs.extend(extra)
+    logger.info("scan: added %d assets from %d unselected variants", len(extra), len(visited))
+
+
+def scan_variant_reference_closures(stage: Usd.Stage, asset_refs: List[AssetRef], logger: logging.Logger,
+                                    jobs: int = 1, cache: Optional[ScanCache] = None,
+                                    mdl_graph: Optional[MdlGraph] = None) -> None:
+    """Scan layers referenced only from unselected variants (not used by the stage)."""
+
+    seeds: List[str] = []
+    for asset in asset_refs:
+        if (asset.asset_type == "usd" and "{" in asset.prim_path and asset.resolved_path
+                and not asset.is_remote and asset.resolved_path not in seeds):
+            seeds.append(asset.resolved_path)
+    scan_unused_layer_closures(stage, seeds, asset_refs, logger, "variant-only", jobs, cache, mdl_graph)
+
+
+def variant_stats(stage: Usd.Stage, asset_refs: List[AssetRef], mode: str) -> Dict[str, object]:
+    """Per-variant-set statistics for `report.json`.
+
+    Sets are keyed `<prim path>:<set>`; spec paths of referenced layers are in
+    that layer's namespace. Per-variant numbers count records authored inside
+    that variant's specs (the composed scan attributes selected-variant
+    opinions to the prim itself, so those are not counted per variant).
+    """
+
+    sets: Dict[str, Dict[str, object]] = {}
+    for prim in stage.TraverseAll():
+        vsets = prim.GetVariantSets()
+        for name in vsets.GetNames():
+            vset = vsets.GetVariantSet(name)
+            sets[f"{prim.GetPath().pathString}:{name}"] = {
+                "selection": vset.GetVariantSelection(),
+                "variants": {v: 0 for v in vset.GetVariantNames()},
+            }
+    for asset in asset_refs:
+        for owner, vset, variant in variant_selections(asset.prim_path):
+            entry = sets.setdefault(f"{owner}:{vset}", {"selection": None, "variants": {}})
+            counts = entry["variants"]
+            counts[variant] = counts.get(variant, 0) + 1
+    return {"mode": mode, "sets": dict(sorted(sets.items()))}
@@ -0,0 +1,32 @@
+import zipfile
+
+from usd_asset_packager.archive import ArchiveCache
+
+
+def _package(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def test_evicted_archive_stays_open_while_a_copy_has_it_pinned(tmp_path):
+    first = _package(tmp_path / "a.usdz", {"tex/a.png": b"a" * 64})
+    second = _package(tmp_path / "b.usdz", {"tex/b.png": b"b" * 64})
+    cache = ArchiveCache(max_open=1)
+
+    with cache._pinned(first) as archive:
+        # another thread opening a second package evicts the first from the LRU
+        cache.get(second)
+        assert first not in cache._archives
+        archive.copy_member("tex/a.png", tmp_path / "a.png")
+        # the lock is not held for the copy, so other lookups are not blocked by it
+        assert cache._lock.acquire(blocking=False)
+        cache._lock.release()
+    assert (tmp_path / "a.png").read_bytes() == b"a" * 64
+    assert archive._mm.closed
+    assert not cache._pins and not cache._retired
+
+    cache.copy_member(f"{second}[tex/b.png]", tmp_path / "b.png")
+    assert (tmp_path / "b.png").read_bytes() == b"b" * 64
+    cache.clear()
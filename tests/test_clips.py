@@ -0,0 +1,50 @@
+import pytest
+from pxr import Usd
+
+from usd_asset_packager.packager import Packager
+
+
+def _clip_scene(root):
+    (root / "clips").mkdir(parents=True)
+    for frame in (1, 2, 3):
+        (root / "clips" / f"clip.{frame:03d}.usda").write_text(
+            f'#usda 1.0\ndef "Clip"\n{{\n    double val.timeSamples = {{ {frame}: {frame * 10} }}\n}}\n')
+    scene = root / "scene.usda"
+    scene.write_text('''#usda 1.0
+(
+    startTimeCode = 1
+    endTimeCode = 3
+)
+
+def Xform "Anim" (
+    clips = {
+        dictionary default = {
+            string primPath = "/Clip"
+            string templateAssetPath = "./clips/clip.###.usda"
+            double templateStartTime = 1
+            double templateEndTime = 3
+            double templateStride = 1
+        }
+    }
+)
+{
+    double val
+}
+''')
+    return scene
+
+
+@pytest.mark.parametrize("collision_strategy", ["keep_tree", "hash_prefix"])
+def test_packed_clip_template_matches_the_copied_clip_files(tmp_path, collision_strategy):
+    scene = _clip_scene(tmp_path / "src")
+    out_dir = tmp_path / "out"
+
+    Packager(input_path=scene, out_dir=out_dir, copy_usd_deps=True, collision_strategy=collision_strategy,
+             log_level="WARNING").run()
+
+    stage = Usd.Stage.Open(str(out_dir / "scene.usda"))
+    prim = stage.GetPrimAtPath("/Anim")
+    resolved = [path.resolvedPath for path in Usd.ClipsAPI(prim).ComputeClipAssetPaths()]
+    assert len(resolved) == 3
+    assert all(path.startswith(str(out_dir)) for path in resolved)
+    assert [prim.GetAttribute("val").Get(frame) for frame in (1, 2, 3)] == [10.0, 20.0, 30.0]
@@ -0,0 +1,46 @@
+from pxr import Usd, UsdGeom, UsdShade
+
+from usd_asset_packager.filters import PrimFilter
+
+
+def _stage() -> Usd.Stage:
+    stage = Usd.Stage.CreateInMemory()
+    UsdGeom.Xform.Define(stage, "/World")
+    render = UsdGeom.Mesh.Define(stage, "/World/Render")
+    render.CreatePurposeAttr(UsdGeom.Tokens.render)
+    UsdGeom.Mesh.Define(stage, "/World/Plain")
+    proxy = UsdGeom.Xform.Define(stage, "/World/Proxy")
+    proxy.CreatePurposeAttr(UsdGeom.Tokens.proxy)
+    UsdGeom.Mesh.Define(stage, "/World/Proxy/Mesh")
+    UsdGeom.Scope.Define(stage, "/World/Looks")
+    UsdShade.Material.Define(stage, "/World/Looks/Mat")
+    return stage
+
+
+def _reason(prim_filter: PrimFilter, stage: Usd.Stage, path: str):
+    return prim_filter.skip_reason(stage.GetPrimAtPath(path))
+
+
+def test_purpose_is_not_inherited_from_default_ancestor():
+    stage = _stage()
+    prim_filter = PrimFilter(stage, purposes=("render",))
+    assert _reason(prim_filter, stage, "/World") is None
+    assert _reason(prim_filter, stage, "/World/Render") is None
+    assert _reason(prim_filter, stage, "/World/Plain") == "purpose"
+    assert _reason(prim_filter, stage, "/World/Proxy") == "purpose"
+    assert _reason(prim_filter, stage, "/World/Proxy/Mesh") == "purpose"
+
+
+def test_material_scopes_are_not_purpose_filtered():
+    stage = _stage()
+    prim_filter = PrimFilter(stage, purposes=("render",))
+    assert _reason(prim_filter, stage, "/World/Looks") is None
+    assert _reason(prim_filter, stage, "/World/Looks/Mat") is None
+
+
+def test_invisible_is_inherited():
+    stage = _stage()
+    UsdGeom.Imageable(stage.GetPrimAtPath("/World/Proxy")).MakeInvisible()
+    prim_filter = PrimFilter(stage, skip_invisible=True)
+    assert _reason(prim_filter, stage, "/World/Proxy/Mesh") == "invisible"
+    assert _reason(prim_filter, stage, "/World/Render") is None
@@ -0,0 +1,28 @@
+import json
+import os
+
+from usd_asset_packager.gltf_deps import rewrite_gltf_uris, sidecar_target
+
+
+def test_escaping_sidecar_uri_is_rewritten_in_the_copied_gltf(tmp_path):
+    out_dir = tmp_path / "out"
+    owner = out_dir / "models" / "thing.gltf"
+    owner.parent.mkdir(parents=True)
+    source = tmp_path / "thing.gltf"
+    source.write_text(json.dumps({
+        "asset": {"version": "2.0"},
+        "buffers": [{"uri": "../../shared/my%20buf.bin", "byteLength": 12}],
+        "images": [{"uri": "near.png"}, {"uri": "data:image/png;base64,AAAA"}],
+    }), encoding="utf-8")
+    # the copy is a hard link to its source: the rewrite must not write through it
+    os.link(source, owner)
+    assert sidecar_target(owner, "../../shared/my buf.bin", out_dir) is None
+
+    changed = rewrite_gltf_uris(owner, {"../../shared/my buf.bin": "my buf.bin"})
+
+    assert changed == 1
+    doc = json.loads(owner.read_text(encoding="utf-8"))
+    assert doc["buffers"][0]["uri"] == "my%20buf.bin"
+    assert [image["uri"] for image in doc["images"]] == ["near.png", "data:image/png;base64,AAAA"]
+    assert json.loads(source.read_text(encoding="utf-8"))["buffers"][0]["uri"] == "../../shared/my%20buf.bin"
+    assert not owner.with_name("thing.gltf.tmp").exists()
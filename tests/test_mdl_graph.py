@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from usd_asset_packager.copy_utils import plan_target_path
+from usd_asset_packager.mdl_graph import MdlGraph
+from usd_asset_packager.types import AssetRef
+
+
+def _write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def _mdl(path: Path) -> AssetRef:
+    return AssetRef(asset_type="mdl", original_path=str(path), resolved_path=str(path),
+                    layer_identifier="", prim_path="/World/Looks/Mat", attr_name="info:mdl:sourceAsset")
+
+
+def test_package_root_covers_whole_import_component(tmp_path):
+    ext = tmp_path / "ext"
+    a = _write(ext / "parent" / "A.mdl", "mdl 1.6;\nimport .::sub::B::*;\n")
+    b = _write(ext / "parent" / "sub" / "B.mdl", "mdl 1.6;\nimport .::leaf::C::*;\n")
+    c = _write(ext / "parent" / "sub" / "leaf" / "C.mdl", "mdl 1.6;\n")
+    graph = MdlGraph()
+    graph.closure([str(a)])
+
+    root = graph.package_root(str(c))
+    assert root == str((ext / "parent").resolve())
+    assert graph.package_root(str(b)) == root == graph.package_root(str(a))
+
+    out = tmp_path / "out"
+    base_root = tmp_path / "scene"
+    targets = {p.name: plan_target_path(_mdl(p), out, "keep_tree", base_root, graph) for p in (a, b, c)}
+    assert targets["B.mdl"].parent == targets["A.mdl"].parent / "sub"
+    assert targets["C.mdl"].parent == targets["B.mdl"].parent / "leaf"
+
+
+def test_unrelated_modules_keep_their_own_root(tmp_path):
+    a = _write(tmp_path / "one" / "A.mdl", "mdl 1.6;\n")
+    b = _write(tmp_path / "two" / "B.mdl", "mdl 1.6;\n")
+    graph = MdlGraph()
+    graph.closure([str(a), str(b)])
+    assert graph.package_root(str(a)) == str(a.resolve().parent)
+    assert graph.package_root(str(b)) == str(b.resolve().parent)
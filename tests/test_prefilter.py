@@ -0,0 +1,33 @@
+from usd_asset_packager.prefilter import may_have_asset_paths
+from usd_asset_packager.scan_cache import ScanCache
+from usd_asset_packager.sdf_scan import scan_layer_closure
+
+
+def test_text_layer_whose_only_dependency_is_a_clip_template_is_scanned(tmp_path):
+    (tmp_path / "clips").mkdir()
+    for frame in (1, 2):
+        (tmp_path / "clips" / f"clip.{frame:03d}.usda").write_text("#usda 1.0\n")
+    layer = tmp_path / "anim.usda"
+    layer.write_text('''#usda 1.0
+def Xform "Anim" (
+    clips = {
+        dictionary default = {
+            string templateAssetPath = "./clips/clip.###.usda"
+            double templateStartTime = 1
+            double templateEndTime = 2
+            double templateStride = 1
+        }
+    }
+)
+{
+}
+''')
+    assert may_have_asset_paths(str(layer))
+    assert not may_have_asset_paths(str(tmp_path / "clips" / "clip.001.usda"))
+
+    cache = ScanCache(tmp_path / "cache.sqlite")
+    asset_refs, _layers = scan_layer_closure([str(layer)], cache=cache)
+    templates = [ref for ref in asset_refs if ref.attr_name == "clips:default:templateAssetPath"]
+    assert sorted(ref.original_path for ref in templates) == ["./clips/clip.001.usda", "./clips/clip.002.usda"]
+    assert cache.get("layer", str(layer))
+    cache.close()
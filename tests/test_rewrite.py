@@ -0,0 +1,72 @@
+import logging
+
+from pxr import Sdf, Usd
+
+from usd_asset_packager.prefilter import may_have_asset_paths
+from usd_asset_packager.rewrite import rewrite_layer_file_asset_paths, rewrite_layers
+from usd_asset_packager.types import AssetRef
+
+
+def test_rewrite_sees_asset_paths_in_dictionary_metadata(tmp_path):
+    path = tmp_path / "meta_only.usdc"
+    stage = Usd.Stage.CreateNew(str(path))
+    prim = stage.DefinePrim("/Root")
+    prim.SetAssetInfoByKey("identifier", Sdf.AssetPath("./old/tex.png"))
+    stage.GetRootLayer().Save()
+    # the prefilter only covers what the sdf scan records
+    assert not may_have_asset_paths(str(path))
+
+    changed = rewrite_layer_file_asset_paths(path, {"./old/tex.png": "./new/tex.png"}, logging.getLogger("test"))
+
+    assert changed == 1
+    layer = Sdf.Layer.OpenAsAnonymous(str(path))
+    assert layer.GetPrimAtPath("/Root").assetInfo["identifier"].path == "./new/tex.png"
+
+
+def test_crate_layers_are_never_proven_free_of_dictionary_asset_paths(tmp_path):
+    path = tmp_path / "geo.usdc"
+    stage = Usd.Stage.CreateNew(str(path))
+    stage.DefinePrim("/Root", "Mesh")
+    stage.GetRootLayer().Save()
+    text = tmp_path / "geo.usda"
+    text.write_text('#usda 1.0\n\ndef Mesh "Root"\n{\n}\n')
+
+    assert not may_have_asset_paths(str(path))
+    assert may_have_asset_paths(str(path), dictionaries=True)
+    assert not may_have_asset_paths(str(text), dictionaries=True)
+
+
+def test_reference_list_ops_keep_their_form_when_rewritten(tmp_path):
+    (tmp_path / "a.usda").write_text('#usda 1.0\ndef "A" {}\n')
+    scene = tmp_path / "scene.usda"
+    scene.write_text('''#usda 1.0
+def "Explicit" (
+    references = @./a.usda@</A>
+)
+{
+}
+
+def "Edited" (
+    delete references = @./old.usda@</A>
+    prepend references = @./a.usda@</A>
+)
+{
+}
+''')
+    stage = Usd.Stage.Open(str(scene))
+    out_dir = tmp_path / "out"
+    root_id = stage.GetRootLayer().identifier
+    assets = [AssetRef("usd", "./a.usda", str(tmp_path / "a.usda"), root_id, prim, "references")
+              for prim in ("/Explicit", "/Edited")]
+    copy_targets = {id(asset): str(out_dir / "assets" / "a.usda") for asset in assets}
+
+    actions = rewrite_layers(stage, assets, copy_targets, {root_id: out_dir / "scene.usda"}, logging.getLogger("test"))
+
+    assert all(action.success for action in actions)
+    layer = Sdf.Layer.OpenAsAnonymous(str(out_dir / "scene.usda"))
+    explicit = layer.GetPrimAtPath("/Explicit").referenceList
+    assert explicit.isExplicit
+    assert [ref.assetPath for ref in explicit.explicitItems] == ["assets/a.usda"]
+    edited = layer.GetPrimAtPath("/Edited").referenceList
+    assert [ref.assetPath for ref in edited.prependedItems] == ["assets/a.usda"]
+    assert [ref.assetPath for ref in edited.deletedItems] == ["./old.usda"]
@@ -0,0 +1,57 @@
+import sqlite3
+
+from usd_asset_packager.mdl_graph import MdlGraph
+from usd_asset_packager.resolver import default_resolver
+from usd_asset_packager.scan_cache import PAYLOAD_VERSIONS, ScanCache
+
+
+def test_entries_of_another_payload_version_miss(tmp_path):
+    layer = tmp_path / "a.usda"
+    layer.write_text("#usda 1.0\n")
+    db = tmp_path / "cache.sqlite"
+    cache = ScanCache(db)
+    cache.put("layer", str(layer), [["texture", "./t.png", "/A", "inputs:file"]])
+    cache.commit()
+    assert cache.get("layer", str(layer)) is not None
+    cache._conn.execute("UPDATE entries SET version = ?", (PAYLOAD_VERSIONS["layer"] - 1,))
+    assert cache.get("layer", str(layer)) is None
+    cache.close()
+
+
+def test_databases_without_version_column_are_migrated(tmp_path):
+    db = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(str(db))
+    conn.execute("CREATE TABLE entries (kind TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, "
+                 "mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL, payload TEXT NOT NULL, nbytes INTEGER NOT NULL, "
+                 "last_used REAL NOT NULL, PRIMARY KEY (kind, path))")
+    layer = tmp_path / "a.usda"
+    layer.write_text("#usda 1.0\n")
+    st = layer.stat()
+    conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, '', '[]', 2, 0)",
+                 ("layer", str(layer.resolve()), st.st_size, st.st_mtime_ns))
+    conn.commit()
+    conn.close()
+
+    cache = ScanCache(db)
+    assert cache.get("layer", str(layer)) is None
+    cache.close()
+
+
+def test_cached_mdl_module_picks_up_dependencies_that_appear_later(tmp_path):
+    mat = tmp_path / "Mat.mdl"
+    mat.write_text('mdl 1.6;\nimport .::Base::*;\nexport material m() = base(tex: texture_2d("./t.png"));\n')
+    db = tmp_path / "cache.sqlite"
+    cache = ScanCache(db)
+    first = MdlGraph(cache=cache).module(str(mat))
+    assert first.imports == [] and first.resources == []
+    assert first.unresolved_imports == [".::Base"]
+    cache.commit()
+
+    (tmp_path / "Base.mdl").write_text("mdl 1.6;\n")
+    (tmp_path / "t.png").write_bytes(b"png")
+    default_resolver().clear()  # a later run starts with an empty resolver cache
+    second = MdlGraph(cache=cache).module(str(mat))
+    assert cache.hits["mdl_module"] == 1
+    assert second.imports == [str((tmp_path / "Base.mdl").resolve())]
+    assert second.resources == [str(tmp_path / "t.png")]
+    cache.close()
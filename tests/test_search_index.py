@@ -0,0 +1,99 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from usd_asset_packager.resolver import Resolver
+from usd_asset_packager.search_index import SearchIndex
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+    return path
+
+
+def _open(tmp_path, root):
+    index = SearchIndex(tmp_path / "index.sqlite", [str(root)], logging.getLogger("test"))
+    index.build()
+    return index
+
+
+def _bump_mtime(directory):
+    # make sure a change within the same mtime tick is still noticed
+    st = os.stat(directory)
+    os.utime(directory, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_longest_suffix_wins(tmp_path):
+    root = tmp_path / "data"
+    chair = _touch(root / "models" / "chair" / "instance.usd")
+    _touch(root / "models" / "table" / "instance.usd")
+    index = _open(tmp_path, root)
+    assert index.lookup("../../models/chair/instance.usd") == str(chair)
+    index.close()
+
+
+def test_ambiguous_match_is_refused(tmp_path):
+    root = tmp_path / "data"
+    _touch(root / "a" / "Materials" / "OmniPBR.mdl")
+    _touch(root / "b" / "Materials" / "OmniPBR.mdl")
+    index = _open(tmp_path, root)
+    assert index.lookup("./Materials/OmniPBR.mdl") is None
+    assert index.counters["ambiguous"] == 1
+    index.close()
+
+
+def test_basename_only_match_is_counted(tmp_path):
+    root = tmp_path / "data"
+    tex = _touch(root / "textures" / "wood.png")
+    index = _open(tmp_path, root)
+    assert index.lookup("../maps/wood.png") == str(tex)
+    assert index.counters["basename_only"] == 1
+    index.close()
+
+
+def test_reopen_picks_up_added_and_deleted_files(tmp_path):
+    root = tmp_path / "data"
+    old = _touch(root / "textures" / "old.png")
+    index = _open(tmp_path, root)
+    assert index.lookup("textures/old.png") == str(old)
+    index.close()
+
+    old.unlink()
+    new = _touch(root / "textures" / "sub" / "new.png")
+    _bump_mtime(root / "textures")
+    index = _open(tmp_path, root)
+    assert index.lookup("textures/old.png") is None
+    assert index.lookup("sub/new.png") == str(new)
+    index.close()
+
+
+def test_deleted_file_is_not_returned_before_refresh(tmp_path):
+    root = tmp_path / "data"
+    tex = _touch(root / "textures" / "gone.png")
+    index = _open(tmp_path, root)
+    tex.unlink()
+    assert index.lookup("textures/gone.png") is None
+    assert index.counters["stale"] >= 1
+    index.close()
+
+
+def test_resolver_looks_up_the_index_outside_its_lock(tmp_path):
+    root = tmp_path / "data"
+    textures = [_touch(root / "models" / f"m{idx}" / "tex.png") for idx in range(8)]
+    index = _open(tmp_path, root)
+    resolver = Resolver()
+    resolver.search_index = index
+    lookup = index.lookup
+
+    def checked_lookup(asset_path):
+        assert not resolver._lock.locked()
+        return lookup(asset_path)
+
+    index.lookup = checked_lookup
+    scene = tmp_path / "scene" / "scene.usda"
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        found = list(pool.map(lambda idx: resolver.resolve(str(scene), f"./models/m{idx}/tex.png"), range(8)))
+    assert found == [str(path) for path in textures]
+    assert index.counters["lookups"] == 8 and index.counters["hits"] == 8
+    index.close()
@@ -0,0 +1,53 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple
+
+from pxr import Sdf
+
+from usd_asset_packager.sdf_scan import _scan_layer_task
+from usd_asset_packager.shard_scan import scan_layer_sharded
+
+
+def _build_layer(path):
+    layer = Sdf.Layer.CreateNew(str(path))
+    layer.subLayerPaths.append("./base.usda")
+    world = Sdf.PrimSpec(layer, "World", Sdf.SpecifierDef, "Xform")
+    for group in range(6):
+        group_spec = Sdf.PrimSpec(world, f"Group{group}", Sdf.SpecifierDef, "Xform")
+        # uneven groups, so the plan splits /World and its heavy children
+        for part in range(40 if group == 0 else 5):
+            prim = Sdf.PrimSpec(group_spec, f"Part{part}", Sdf.SpecifierDef, "Mesh")
+            for idx in range(4):
+                Sdf.AttributeSpec(prim, f"primvars:p{idx}", Sdf.ValueTypeNames.Float)
+            attr = Sdf.AttributeSpec(prim, "inputs:file", Sdf.ValueTypeNames.Asset)
+            attr.default = Sdf.AssetPath(f"./tex/{group}_{part}.png")
+            if part % 4 == 0:
+                prim.referenceList.Prepend(Sdf.Reference(f"./models/part_{part}.usd"))
+            if part % 5 == 0:
+                variant = Sdf.VariantSpec(Sdf.VariantSetSpec(prim, "look"), "red")
+                red = Sdf.AttributeSpec(variant.primSpec, "inputs:file", Sdf.ValueTypeNames.Asset)
+                red.default = Sdf.AssetPath(f"./red/{group}_{part}.png")
+    header = Sdf.AttributeSpec(world, "inputs:env", Sdf.ValueTypeNames.Asset)
+    header.default = Sdf.AssetPath("./env.hdr")
+    layer.SetTimeSample(header.path, 1.0, Sdf.AssetPath("./env_1.hdr"))
+    looks = Sdf.PrimSpec(layer, "Looks", Sdf.SpecifierDef, "Scope")
+    shader = Sdf.PrimSpec(looks, "Shader", Sdf.SpecifierDef, "Shader")
+    mdl = Sdf.AttributeSpec(shader, "info:mdl:sourceAsset", Sdf.ValueTypeNames.Asset)
+    mdl.default = Sdf.AssetPath("./materials/Metal.mdl")
+    layer.Save()
+
+
+def test_sharded_scan_records_match_the_unsharded_scan(tmp_path):
+    path = tmp_path / "big.usda"
+    _build_layer(path)
+    _identifier, _real_path, serial = _scan_layer_task(str(path))
+
+    shard_stats = {}
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        _identifier, _real_path, sharded = scan_layer_sharded(str(path), "", pool, 4, shard_stats=shard_stats)
+
+    assert shard_stats, "the layer was not split into shards"
+    paths = {ref.original_path for ref in serial}
+    assert {"./base.usda", "./env_1.hdr", "./red/0_35.png", "./models/part_36.usd"} <= paths
+    # the merge order may differ from the serial traversal; the records may not
+    assert Counter(astuple(ref) for ref in sharded) == Counter(astuple(ref) for ref in serial)
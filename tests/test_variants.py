@@ -0,0 +1,14 @@
+from usd_asset_packager.variants import variant_selections
+
+
+def test_synthetic_record_paths_have_no_selections_and_print_no_warning(capfd):
+    for prim_path in ("(usedLayer)", "(layer)", "(gltf_image)", "(subLayer)", "/World/Prop"):
+        assert variant_selections(prim_path) == []
+    assert "Ill-formed SdfPath" not in capfd.readouterr().err
+
+
+def test_nested_variant_selections_are_listed_outermost_first():
+    assert variant_selections("/World/Prop{look=red}Body{lod=high}Mesh") == [
+        ("/World/Prop", "look", "red"),
+        ("/World/Prop/Body", "lod", "high"),
+    ]